@@ -0,0 +1,185 @@
+"""
+Local stand-in for the slice of the yfinance Ticker interface we use
+
+Statements are generated deterministically from the symbol, or replayed
+from a FundamentalsCache recorded by a real run. Latency, generic errors
+and rate-limit errors can be injected per remote call.
+"""
+
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from src.siegfried.fundamentals_cache import FundamentalsCache
+
+BALANCE_ROWS = ['Total Assets', 'Cash And Cash Equivalents', 'Current Liabilities',
+                'Common Stock Equity', 'Ordinary Shares Number']
+INCOME_ROWS = ['Operating Income', 'Tax Provision', 'Pretax Income', 'Net Income', 'Diluted EPS']
+
+
+class YFRateLimitError(Exception):
+    """Same name as yfinance's exception so is_rate_limited recognises it"""
+
+    def __init__(self):
+        super().__init__("Too Many Requests. Rate limited. Try after a while.")
+
+
+def synthetic_symbols(n: int) -> List[str]:
+    return [f'S{i:05d}' for i in range(n)]
+
+
+def symbol_rng(symbol: str, salt: str = '') -> np.random.Generator:
+    return np.random.default_rng(zlib.crc32(f'{symbol}:{salt}'.encode()))
+
+
+def synthetic_statements(symbol: str, periods: pd.DatetimeIndex) -> Dict[str, pd.DataFrame]:
+    rng = symbol_rng(symbol, str(len(periods)))
+    # A fresh index per frame, as yfinance returns; pandas builds index lookup
+    # tables lazily and that is not safe on one index shared across threads
+    periods = pd.DatetimeIndex(list(periods))
+    n = len(periods)
+    assets = rng.uniform(1e9, 5e11) * rng.uniform(0.9, 1.1, n)
+    operating_income = assets * rng.uniform(-0.02, 0.25, n)
+    pretax_income = operating_income * rng.uniform(0.8, 1.0, n)
+    shares = rng.uniform(1e8, 5e9)
+    equity = assets * rng.uniform(0.2, 0.6, n)
+    balance_sheet = pd.DataFrame([assets, assets * rng.uniform(0.02, 0.2, n), assets * rng.uniform(0.1, 0.3, n),
+                                  equity, np.full(n, shares)], index=BALANCE_ROWS, columns=periods)
+    financials = pd.DataFrame([operating_income, pretax_income * 0.21, pretax_income, pretax_income * 0.79,
+                               pretax_income * 0.79 / shares], index=INCOME_ROWS, columns=periods)
+    return {'balance_sheet': balance_sheet, 'financials': financials}
+
+
+def synthetic_prices(symbol: str, start: str = '2005-01-03', end: str = '2025-06-30') -> pd.DataFrame:
+    """Daily closes as a geometric random walk, tz-aware like yfinance history"""
+    rng = symbol_rng(symbol, 'prices')
+    dates = pd.bdate_range(start, end, tz='America/New_York')
+    close = rng.uniform(5, 200) * np.exp(np.cumsum(rng.normal(0.0003, 0.02, len(dates))))
+    return pd.DataFrame({'Close': close}, index=dates)
+
+
+def synthetic_info(symbol: str) -> Dict[str, Any]:
+    rng = symbol_rng(symbol, 'info')
+    price = float(rng.uniform(5, 800))
+    book_value = float(price / rng.uniform(0.5, 12))
+    return {
+        'currentPrice': price,
+        'regularMarketPrice': price,
+        'bookValue': book_value,
+        'priceToBook': price / book_value if rng.random() > 0.1 else None,
+        'sharesOutstanding': float(rng.uniform(1e8, 5e9)),
+        'trailingEps': float(book_value * rng.uniform(-0.05, 0.3)),
+        'lastFiscalYearEnd': 1735603200,
+        'sector': ['Technology', 'Healthcare', 'Industrials', 'Energy', 'Financial Services'][int(rng.integers(5))],
+    }
+
+
+class FakeMarket:
+    """
+    Factory for FakeTicker objects sharing injected faults and call counts.
+
+    Args:
+        latency (float): Seconds slept per remote call
+        error_rate (float): Probability a remote call raises a generic error
+        rate_limit_rate (float): Probability a remote call raises YFRateLimitError
+        years (int): Annual periods per synthetic statement
+        recorded (FundamentalsCache): Replay cached payloads when available
+        seed (int): Seed for fault injection
+        splits (Dict[str, pd.Series]): Split ratios by ex-date per symbol;
+            none by default
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 years: int = 4, recorded: Optional[FundamentalsCache] = None, seed: int = 0,
+                 splits: Optional[Dict[str, pd.Series]] = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.recorded = recorded
+        self.splits = splits or {}
+        self.annual = pd.DatetimeIndex([pd.Timestamp(f'{2024 - i}-12-31') for i in range(years)])
+        self.quarterly = pd.DatetimeIndex(['2025-06-30', '2025-03-31', '2024-12-31', '2024-09-30', '2024-06-30'])
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def ticker(self, symbol: str) -> 'FakeTicker':
+        return FakeTicker(symbol, self)
+
+    def remote_call(self, symbol: str, kind: str) -> Any:
+        with self._lock:
+            self.calls[kind] += 1
+            draw = self._random.random()
+        if self.latency:
+            time.sleep(self.latency)
+        if draw < self.rate_limit_rate:
+            raise YFRateLimitError()
+        if draw < self.rate_limit_rate + self.error_rate:
+            raise ConnectionError(f"Injected failure fetching {kind} for {symbol}")
+
+        if self.recorded is not None:
+            try:
+                value = self.recorded.get(symbol, kind)
+            except LookupError:
+                value = None
+            if value is not None:
+                return value
+        if kind == 'info':
+            return synthetic_info(symbol)
+        if kind == 'history':
+            return synthetic_prices(symbol)
+        if kind == 'splits':
+            return self.splits.get(symbol, pd.Series(dtype=float))
+        if kind == 'quarterly_balance_sheet':
+            return synthetic_statements(symbol, self.quarterly)['balance_sheet']
+        if kind == 'quarterly_financials':
+            return synthetic_statements(symbol, self.quarterly)['financials']
+        return synthetic_statements(symbol, self.annual)[kind]
+
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+
+class FakeTicker:
+    def __init__(self, symbol: str, market: FakeMarket):
+        self.symbol = symbol
+        self.market = market
+
+    @property
+    def balance_sheet(self) -> pd.DataFrame:
+        return self.market.remote_call(self.symbol, 'balance_sheet')
+
+    @property
+    def financials(self) -> pd.DataFrame:
+        return self.market.remote_call(self.symbol, 'financials')
+
+    @property
+    def quarterly_balance_sheet(self) -> pd.DataFrame:
+        return self.market.remote_call(self.symbol, 'quarterly_balance_sheet')
+
+    @property
+    def quarterly_financials(self) -> pd.DataFrame:
+        return self.market.remote_call(self.symbol, 'quarterly_financials')
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        return self.market.remote_call(self.symbol, 'info')
+
+    @property
+    def splits(self) -> pd.Series:
+        return self.market.remote_call(self.symbol, 'splits')
+
+    def history(self, start: Optional[str] = None, end: Optional[str] = None, **kwargs: Any) -> pd.DataFrame:
+        prices = self.market.remote_call(self.symbol, 'history')
+        index = prices.index.tz_localize(None)
+        keep = np.ones(len(prices), dtype=bool)
+        if start is not None:
+            keep &= index >= pd.Timestamp(start)
+        if end is not None:
+            keep &= index < pd.Timestamp(end)
+        return prices[keep]
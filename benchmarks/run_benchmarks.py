@@ -0,0 +1,175 @@
+"""
+Offline throughput benchmarks for the screener
+
+Each case runs in a fresh spawned process against FakeMarket, so peak RSS
+is per case and no network is touched. Results are compared with
+benchmarks/baseline.json.
+
+Usage:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --sizes 100 500 --latency 0.05 --workers 8
+    python -m benchmarks.run_benchmarks --save-baseline
+    python -m benchmarks.run_benchmarks --cases import_time
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List
+from unittest.mock import patch
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DEFAULT_SIZES = [100, 500, 5000]
+
+
+def bench_main_roic_analysis(symbols: List[str], options: Dict[str, Any]) -> int:
+    from src.siegfried import find_hidden_cheap_goods_in_rubbish as fhc
+    with patch.object(fhc, 'load_all_symbols', lambda k, *args: symbols[:k]):
+        fhc.main_roic_analysis(len(symbols), workers=options['workers'])
+    return len(symbols)
+
+
+def bench_calculate_roic_multi_year(symbols: List[str], options: Dict[str, Any]) -> int:
+    from src.siegfried.roic_calculator import calculate_roic_multi_year
+    for symbol in symbols:
+        calculate_roic_multi_year(symbol, 4)
+    return len(symbols)
+
+
+def bench_calculate_pb(symbols: List[str], options: Dict[str, Any]) -> int:
+    from src.siegfried.pb_calculator import calculate_pb
+    for symbol in symbols:
+        calculate_pb(symbol)
+    return len(symbols)
+
+
+def bench_compute_geometric_average(symbols: List[str], options: Dict[str, Any]) -> int:
+    import numpy as np
+    from src.siegfried.find_hidden_cheap_goods_in_rubbish import compute_geometric_average
+    values = np.random.default_rng(0).normal(0.1, 0.1, (len(symbols), 4)).tolist()
+    for row in values:
+        compute_geometric_average(row)
+    return len(symbols)
+
+
+CASES: Dict[str, Callable[[List[str], Dict[str, Any]], int]] = {
+    'main_roic_analysis': bench_main_roic_analysis,
+    'calculate_roic_multi_year': bench_calculate_roic_multi_year,
+    'calculate_pb': bench_calculate_pb,
+    'compute_geometric_average': bench_compute_geometric_average,
+}
+
+
+IMPORT_CASE = 'import_time'
+IMPORT_TARGETS = ['src.siegfried.roic_calculator', 'src.siegfried.find_hidden_cheap_goods_in_rubbish',
+                  'src.siegfried.dcf_calculator', 'main']
+IMPORT_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+wall = time.perf_counter() - start
+print(json.dumps({'wall': wall, 'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def measure_import(module: str) -> Dict[str, Any]:
+    """Cold import time of a module in a fresh interpreter"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', IMPORT_PROBE, module], cwd=root,
+                            capture_output=True, text=True, check=True).stdout
+    probe = json.loads(output.strip().splitlines()[-1])
+    return {
+        'case': f'{IMPORT_CASE}:{module}',
+        'n': 1,
+        'wall_s': round(probe['wall'], 4),
+        'tickers_per_s': None,
+        'calls_per_s': 0.0,
+        'remote_calls': 0,
+        'peak_rss_mb': round(probe['rss'] / 1024, 1),
+    }
+
+
+def run_case(name: str, n: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one case in the current process and measure it"""
+    os.environ['TQDM_DISABLE'] = '1'
+    from benchmarks.fake_yfinance import FakeMarket, synthetic_symbols
+    from src.siegfried import find_hidden_cheap_goods_in_rubbish, ticker_snapshot  # noqa: F401, imported before the timer starts
+
+    market = FakeMarket(latency=options['latency'], error_rate=options['error_rate'],
+                        rate_limit_rate=options['rate_limit_rate'])
+    symbols = synthetic_symbols(n)
+    with patch.object(ticker_snapshot, 'make_yf_ticker', market.ticker):
+        start = time.perf_counter()
+        tickers = CASES[name](symbols, options)
+        wall = time.perf_counter() - start
+
+    remote_calls = market.total_calls()
+    return {
+        'case': name,
+        'n': n,
+        'wall_s': round(wall, 4),
+        'tickers_per_s': round(tickers / wall, 1) if wall else None,
+        'calls_per_s': round(remote_calls / wall, 1) if wall else None,
+        'remote_calls': remote_calls,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def run_isolated(name: str, n: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(run_case, name, n, options).result()
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    return f"{result['case']}[{result['n']}]"
+
+
+def compare_with_baseline(results: List[Dict[str, Any]], baseline: Dict[str, Any]) -> List[str]:
+    lines = [f"{'case':<64}{'wall s':>10}{'tickers/s':>12}{'calls/s':>12}{'rss MB':>10}{'vs baseline':>14}"]
+    for result in results:
+        reference = baseline.get(result_key(result))
+        ratio = f"{result['wall_s'] / reference['wall_s']:.2f}x" if reference and reference['wall_s'] else '-'
+        tickers_per_s = f"{result['tickers_per_s']:.1f}" if result.get('tickers_per_s') is not None else '-'
+        lines.append(f"{result_key(result):<64}{result['wall_s']:>10.3f}{tickers_per_s:>12}{result['calls_per_s']:>12.1f}"
+                     f"{result['peak_rss_mb']:>10.1f}{ratio:>14}")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', nargs='+', default=list(CASES) + [IMPORT_CASE], choices=list(CASES) + [IMPORT_CASE])
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds per fake remote call')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    options = {'latency': args.latency, 'error_rate': args.error_rate,
+               'rate_limit_rate': args.rate_limit_rate, 'workers': args.workers}
+    results = [run_isolated(name, n, options) for name in args.cases if name in CASES for n in args.sizes]
+    if IMPORT_CASE in args.cases:
+        results.extend(measure_import(module) for module in IMPORT_TARGETS)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+    print('\n'.join(compare_with_baseline(results, baseline)))
+
+    if args.save_baseline:
+        baseline.update({result_key(result): result for result in results})
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {BASELINE_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,441 @@
+"""
+Command line entry point
+
+    python main.py screen --k 499 --workers 8 --rate 4
+    python main.py screen --universe russell2000 --processes 4 --queue /shared/jobs.sqlite
+    python main.py screen --history src/report/history
+    python main.py history import
+    python main.py history drift --start 2025-01-01 --symbols UNH,DECK
+    python main.py worker --queue /shared/jobs.sqlite
+    python main.py roic UNH --years 4
+    python main.py ingest-sec companyfacts.zip --tickers company_tickers.json
+    python main.py roic UNH --years 10 --sec-store src/cache/sec_companyfacts.npz
+    python main.py pb UNH
+    python main.py pb-history src/report/high_roic_company_20250101.csv --sec-store src/cache/sec_companyfacts.npz
+    python main.py plot DECK --years 4
+    python main.py backtest --sec-store src/cache/sec_companyfacts.npz --universe sp500 --top-n 10 20 --window 4 10
+    python main.py report src/report/high_roic_company_20250101.csv --top 100
+    python main.py simulate UNH,DECK --treasury-yield 4.35 --years 10 --paths 100000
+    python main.py rank src/report/high_roic_company_20250101.csv --order pareto --max-pb 3 --per-sector 5
+    python main.py ttm --k 499 --policy include
+    python main.py serve --port 8765 --interval-hours 12
+    python main.py dcf --eps 5.12 --book-value 23.4 --treasury-yield 4.35
+
+Heavy dependencies are imported inside each command, so cheap commands
+never load matplotlib, and nothing loads yfinance before it fetches.
+"""
+
+import argparse
 import logging
+import os
+from datetime import date
+from typing import List, Optional
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def main():
-    logger.info("Hello from jiaguosuichang!")
+
+def open_cache(args: argparse.Namespace):
+    if args.no_cache:
+        return None
+    from src.siegfried.fundamentals_cache import FundamentalsCache
+    return FundamentalsCache(offline=args.offline)
+
+
+def run_screen(args: argparse.Namespace) -> None:
+    from src.siegfried.checkpoint import default_checkpoint_path
+    from src.siegfried.find_hidden_cheap_goods_in_rubbish import main_roic_analysis
+    from src.siegfried.screen_state import ScreenState
+
+    results_df = main_roic_analysis(
+        args.k,
+        workers=args.workers,
+        calls_per_second=args.rate,
+        cache=open_cache(args),
+        state=ScreenState() if args.incremental else None,
+        universe=args.universe,
+        metrics_dir=args.metrics_dir,
+        checkpoint_path=default_checkpoint_path() if args.checkpoint else None,
+        processes=args.processes,
+        queue_path=args.queue,
+    )
+    logger.info(f"\n{results_df[['Symbol', '4Y_Geometric_Avg_ROIC', 'PB_Ratio', 'Years_Available', 'Status']].head(args.top).to_string()}")
+
+    successful_analysis = results_df[results_df['Status'] == 'Success']
+    output = args.output or "src/report/high_roic_company_{}.csv".format(date.today().strftime("%Y%m%d"))
+    successful_analysis.to_csv(output)
+    logger.info(f"Successfully analyzed: {len(successful_analysis)} out of {len(results_df)} symbols, written to {output}")
+    if args.history:
+        from src.siegfried.report_history import ReportHistory
+        path = ReportHistory(args.history).append(results_df)
+        logger.info(f"Full result table stored in {path}")
+
+
+def run_history(args: argparse.Namespace) -> None:
+    from src.siegfried.report_history import DEFAULT_HISTORY_DIR, ReportHistory, import_csv_reports
+
+    history = ReportHistory(args.root or DEFAULT_HISTORY_DIR)
+    start = date.fromisoformat(args.start) if args.start else None
+    end = date.fromisoformat(args.end) if args.end else None
+    symbols = args.symbols.split(',') if args.symbols else None
+    if args.action == 'import':
+        import_csv_reports(history, args.report_dir, args.overwrite)
+        return
+    if args.action == 'drift':
+        results = history.rank_drift(start, end, symbols)
+    elif args.action == 'top-changes':
+        results = history.top_n_changes(args.top, start, end)
+    else:
+        results = history.scan(('rank', 'roic', 'pb', 'years'), start, end, symbols)
+    logger.info(f"\n{results.to_string()}")
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+
+def run_worker(args: argparse.Namespace) -> None:
+    from src.siegfried.job_queue import run_worker as run_queue_worker
+
+    cache = open_cache(args)
+    completed = run_queue_worker(args.queue, args.workers, args.rate, cache_path=cache.path if cache else None,
+                                 offline=args.offline, lease_seconds=args.lease)
+    logger.info(f"Worker finished after completing {completed} units")
+
+
+def run_roic(args: argparse.Namespace) -> None:
+    from src.siegfried.roic_calculator import calculate_roic_multi_year
+    from src.siegfried.ticker_snapshot import TickerSnapshot
+
+    if args.sec_store:
+        from src.siegfried.sec_facts import SecFactsStore
+        snapshot = SecFactsStore(args.sec_store).snapshot(args.ticker)
+    else:
+        snapshot = TickerSnapshot(args.ticker, open_cache(args))
+    result = calculate_roic_multi_year(args.ticker, args.years, snapshot)
+    if 'error' in result:
+        logger.error(f"Error calculating ROIC for {args.ticker}: {result['error']}")
+        return
+    for data in result['roic_data']:
+        roic_pct = f"{data['roic'] * 100:.2f}%" if data['roic'] is not None else "N/A"
+        logger.info(f"{args.ticker} {data['year'].year}: {roic_pct}")
+
+
+def run_ingest_sec(args: argparse.Namespace) -> None:
+    from src.siegfried.sec_facts import DEFAULT_STORE_PATH, ingest_companyfacts
+
+    ingest_companyfacts(args.zip_path, args.output or DEFAULT_STORE_PATH, args.tickers, args.processes,
+                        as_filed=args.as_filed)
+
+
+def run_pb(args: argparse.Namespace) -> None:
+    from src.siegfried.pb_calculator import calculate_pb
+    from src.siegfried.ticker_snapshot import TickerSnapshot
+
+    logger.info(f"{args.ticker} P/B: {calculate_pb(args.ticker, TickerSnapshot(args.ticker, open_cache(args)))}")
+
+
+def run_pb_history(args: argparse.Namespace) -> None:
+    import pandas as pd
+    from src.siegfried.pb_history import DEFAULT_PRICE_DIR, PriceMatrix, attach_pb_history, build_price_matrix, \
+        load_book_values, pb_history
+
+    results_df = pd.read_csv(args.source, index_col=0)
+    symbols = results_df['Symbol'].tolist()
+    price_dir = args.price_dir or DEFAULT_PRICE_DIR
+    if args.refresh_prices or not os.path.exists(os.path.join(price_dir, 'index.json')):
+        matrix = build_price_matrix(symbols, price_dir, args.years, args.workers)
+    else:
+        matrix = PriceMatrix(price_dir)
+    sec_store = None
+    if args.sec_store:
+        from src.siegfried.sec_facts import SecFactsStore
+        sec_store = SecFactsStore(args.sec_store)
+    book = load_book_values(symbols, args.workers, open_cache(args), sec_store=sec_store)
+    results_df = attach_pb_history(results_df, pb_history(matrix, book, symbols))
+    output = args.output or f"{os.path.splitext(args.source)[0]}_pb_history.csv"
+    results_df.to_csv(output)
+    logger.info(f"\n{results_df[['Symbol', 'PB_Ratio', 'PB_Percentile', 'PB_ZScore', 'PB_First_Date']].head(20).to_string()}")
+    logger.info(f"Written to {output}")
+
+
+def run_plot(args: argparse.Namespace) -> None:
+    from src.siegfried.roic_plot import plot_roic_time_series
+
+    plot_roic_time_series(args.ticker, args.years, cache=open_cache(args))
+
+
+def run_report(args: argparse.Namespace) -> None:
+    import pandas as pd
+    from src.siegfried.roic_report import render_roic_report
+
+    tickers = pd.read_csv(args.source) if args.source.endswith('.csv') else args.source.split(',')
+    render_roic_report(tickers, args.output, args.years, args.top, args.processes, cache=open_cache(args))
+
+
+def run_backtest(args: argparse.Namespace) -> None:
+    from src.siegfried.backtest import parameter_grid, prepare_backtest_data, run_sweep
+    from src.siegfried.pb_history import DEFAULT_PRICE_DIR, PriceMatrix, build_price_matrix, load_book_values
+    from src.siegfried.roic_panel import build_panel
+    from src.siegfried.sec_facts import SecFactsStore
+
+    price_dir = args.price_dir or DEFAULT_PRICE_DIR
+    matrix = PriceMatrix(price_dir)
+    adjusted_dir = args.adjusted_price_dir or os.path.join(price_dir, 'adjusted')
+    if args.refresh_prices or not os.path.exists(os.path.join(adjusted_dir, 'index.json')):
+        build_price_matrix(matrix.symbols, adjusted_dir, workers=args.workers, adjusted=True,
+                           start=matrix.dates[0].date(), end=matrix.dates[-1].date())
+    store = SecFactsStore(args.sec_store)
+    if not store.as_filed:
+        logger.warning(f"{args.sec_store} holds restated values, a look-ahead bias; "
+                       f"ingest with --as-filed for values as first reported")
+    snapshots = {symbol: store.snapshot(symbol) for symbol in matrix.symbols if symbol in store}
+    statements = {symbol: (snapshot.balance_sheet, snapshot.financials) for symbol, snapshot in snapshots.items()}
+    book = load_book_values(matrix.symbols, args.workers, open_cache(args), sec_store=store)
+    data = prepare_backtest_data(matrix, book, build_panel(statements), windows=args.window, freq=args.freq,
+                                 return_matrix=PriceMatrix(adjusted_dir), universe=args.universe)
+    grid = parameter_grid(args.top_n, args.window, args.pb_cutoff or [None], cost_bps=[args.cost_bps])
+    sweep = run_sweep(data, grid, args.processes)
+    logger.info(f"\n{sweep.to_string()}")
+    if args.output:
+        sweep.to_csv(args.output, index=False)
+
+
+def run_simulate(args: argparse.Namespace) -> None:
+    import pandas as pd
+    from src.siegfried.roic_simulation import load_simulation_inputs, simulate_universe
+
+    if args.source.endswith('.csv'):
+        symbols = pd.read_csv(args.source)['Symbol'].head(args.top).tolist()
+    else:
+        symbols = args.source.split(',')
+    snapshots = None
+    if args.sec_store:
+        from src.siegfried.sec_facts import SecFactsStore
+        store = SecFactsStore(args.sec_store)
+        snapshots = {symbol: store.snapshot(symbol) for symbol in symbols if symbol in store}
+    inputs = load_simulation_inputs(symbols, args.years, args.workers, open_cache(args), snapshots)
+    results = simulate_universe(inputs, args.treasury_yield, args.model, args.paths, args.horizon, args.seed)
+    logger.info(f"\n{results.to_string()}")
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+
+def run_rank(args: argparse.Namespace) -> None:
+    import pandas as pd
+    from src.siegfried.ranking import RankingIndex, load_sectors, sector_top_n
+
+    table = pd.read_csv(args.source, index_col=0)
+    index = RankingIndex(table)
+    results = index.query(args.max_pb, args.min_roic, None if args.per_sector else args.top, args.order)
+    if args.per_sector:
+        sectors = load_sectors(results['Symbol'].tolist(), args.workers, open_cache(args))
+        results = results.assign(Sector=results['Symbol'].map(sectors))
+        results = sector_top_n(results, 'Composite_Score', args.per_sector)
+    logger.info(f"\n{results.to_string()}")
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+
+def run_ttm(args: argparse.Namespace) -> None:
+    from src.siegfried.find_hidden_cheap_goods_in_rubbish import load_all_symbols
+    from src.siegfried.rolling_roic import RollingRoicStore, refresh_rolling_roic
+
+    symbols = args.symbols.split(',') if args.symbols else load_all_symbols(args.k, args.universe)
+    store = RollingRoicStore(args.state)
+    results = refresh_rolling_roic(symbols, store, args.workers, open_cache(args), args.window, args.policy)
+    store.close()
+    logger.info(f"\n{results.to_string()}")
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+
+def run_serve(args: argparse.Namespace) -> None:
+    from datetime import timedelta
+    from src.siegfried.screen_service import ScreenService, serve
+
+    service = ScreenService(args.symbols.split(',') if args.symbols else None, args.k, args.universe,
+                            timedelta(hours=args.interval_hours), args.workers, args.rate, cache=open_cache(args))
+    serve(service, args.host, args.port)
+
+
+def run_dcf(args: argparse.Namespace) -> None:
+    from src.siegfried.dcf_calculator import annuity_factor, dcf_value
+
+    pv_factor = float(annuity_factor(args.treasury_yield / 100, args.years))
+    value = float(dcf_value(args.eps, args.book_value, args.treasury_yield, args.years))
+    print("-------------------------")
+    print(f"{args.years}-Year DCF Valuation Result")
+    print("-------------------------")
+    print(f"EPS输入的每股收益: {args.eps}")
+    print(f"每股净资产: {args.book_value}")
+    print(f"国债收益率: {args.treasury_yield}%")
+    print(f"年金现值因子: {pv_factor:.10f}")
+    print(f"折现后的DCF价值: {value:.2f}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='jiaguosuichang', description='Value investing screens and calculators')
+    parser.add_argument('--no-cache', action='store_true', help='always fetch from yfinance')
+    parser.add_argument('--offline', action='store_true', help='serve only from the on-disk cache')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    screen = commands.add_parser('screen', help='rank the universe by P/B and 4Y geometric ROIC')
+    screen.add_argument('--k', type=int, default=499, help='number of symbols to screen')
+    screen.add_argument('--universe', default='sp500')
+    screen.add_argument('--workers', type=int, default=8)
+    screen.add_argument('--rate', type=float, default=4, help='max remote calls per second')
+    screen.add_argument('--incremental', action='store_true', help='refetch only tickers with new filings')
+    screen.add_argument('--checkpoint', action='store_true', help='stream rows to a resumable checkpoint')
+    screen.add_argument('--processes', type=int, default=1, help='worker processes for a sharded screen')
+    screen.add_argument('--queue', help='job queue file for a sharded screen; other hosts can join with worker')
+    screen.add_argument('--metrics-dir', help='write run metrics (JSON and Prometheus) here; '
+                                              'covers local --processes but not separate worker commands')
+    screen.add_argument('--top', type=int, default=20, help='rows to log')
+    screen.add_argument('--output', help='CSV path for successful rows')
+    screen.add_argument('--history', nargs='?', const=os.path.join('src', 'report', 'history'),
+                        help='also append the full result table to this date-partitioned history')
+    screen.set_defaults(func=run_screen)
+
+    history = commands.add_parser('history', help='query or import the date-partitioned screen history')
+    history.add_argument('action', choices=['import', 'scan', 'drift', 'top-changes'])
+    history.add_argument('--root', help='history directory')
+    history.add_argument('--report-dir', default=os.path.join('src', 'report'), help='CSV reports to import')
+    history.add_argument('--overwrite', action='store_true', help='re-import dates already stored')
+    history.add_argument('--start', help='first date, YYYY-MM-DD')
+    history.add_argument('--end', help='last date, YYYY-MM-DD')
+    history.add_argument('--symbols', help='comma-separated symbols')
+    history.add_argument('--top', type=int, default=20, help='N for top-changes')
+    history.add_argument('--output', help='CSV path')
+    history.set_defaults(func=run_history)
+
+    worker = commands.add_parser('worker', help='screen units from a sharded screen\'s job queue')
+    worker.add_argument('--queue', required=True, help='job queue file shared with the screen')
+    worker.add_argument('--workers', type=int, default=8)
+    worker.add_argument('--rate', type=float, help='max remote calls per second for this worker')
+    worker.add_argument('--lease', type=float, default=600.0, help='lease length in seconds')
+    worker.set_defaults(func=run_worker)
+
+    roic = commands.add_parser('roic', help='multi-year ROIC for one ticker')
+    roic.add_argument('ticker')
+    roic.add_argument('--years', type=int, default=4)
+    roic.add_argument('--sec-store', help='read statements from an ingested SEC companyfacts store')
+    roic.set_defaults(func=run_roic)
+
+    ingest_sec = commands.add_parser('ingest-sec', help='build a fundamentals store from SEC companyfacts.zip')
+    ingest_sec.add_argument('zip_path')
+    ingest_sec.add_argument('--tickers', help='SEC company_tickers.json for CIK to ticker mapping')
+    ingest_sec.add_argument('--processes', type=int, help='parser processes, defaults to the CPU count')
+    ingest_sec.add_argument('--output', help='.npz store path')
+    ingest_sec.add_argument('--as-filed', action='store_true',
+                            help='keep values as first filed instead of restated, for backtests')
+    ingest_sec.set_defaults(func=run_ingest_sec)
+
+    pb = commands.add_parser('pb', help='current price-to-book for one ticker')
+    pb.add_argument('ticker')
+    pb.set_defaults(func=run_pb)
+
+    pb_hist = commands.add_parser('pb-history', help='P/B percentile and z-score within each ticker\'s history')
+    pb_hist.add_argument('source', help='screen result CSV with Symbol and PB_Ratio columns')
+    pb_hist.add_argument('--price-dir', help='memory-mapped price matrix directory')
+    pb_hist.add_argument('--refresh-prices', action='store_true', help='download prices again')
+    pb_hist.add_argument('--years', type=int, default=20)
+    pb_hist.add_argument('--workers', type=int, default=8)
+    pb_hist.add_argument('--sec-store', help='ingested SEC companyfacts store for annual book values before '
+                                             'the ~5 quarters yfinance returns')
+    pb_hist.add_argument('--output', help='CSV path, defaults to <source>_pb_history.csv')
+    pb_hist.set_defaults(func=run_pb_history)
+
+    plot = commands.add_parser('plot', help='ROIC time series chart for one ticker')
+    plot.add_argument('ticker')
+    plot.add_argument('--years', type=int, default=4)
+    plot.set_defaults(func=run_plot)
+
+    report = commands.add_parser('report', help='HTML report of ROIC charts for many tickers')
+    report.add_argument('source', help='screen result CSV, or comma-separated tickers')
+    report.add_argument('--years', type=int, default=4)
+    report.add_argument('--top', type=int, default=100, help='rows charted from a CSV')
+    report.add_argument('--processes', type=int, help='render processes, defaults to the CPU count')
+    report.add_argument('--output', help='HTML path')
+    report.set_defaults(func=run_report)
+
+    backtest = commands.add_parser('backtest', help='point-in-time backtest and parameter sweep of the screen')
+    backtest.add_argument('--sec-store', required=True,
+                          help='ingested SEC companyfacts store for ROIC and book value history')
+    backtest.add_argument('--price-dir', help='memory-mapped price matrix directory')
+    backtest.add_argument('--adjusted-price-dir',
+                          help='adjusted closes for returns, defaults to <price-dir>/adjusted, downloaded if missing')
+    backtest.add_argument('--refresh-prices', action='store_true', help='download adjusted prices again')
+    backtest.add_argument('--universe', help='universe whose dated snapshots limit each date to its constituents')
+    backtest.add_argument('--top-n', type=int, nargs='+', default=[20])
+    backtest.add_argument('--window', type=int, nargs='+', default=[4], help='ROIC geometric mean years')
+    backtest.add_argument('--pb-cutoff', type=float, nargs='+', help='maximum P/B to hold')
+    backtest.add_argument('--cost-bps', type=float, default=0.0, help='cost per unit traded, in basis points')
+    backtest.add_argument('--freq', choices=['M', 'Q'], default='M', help='rebalance monthly or quarterly')
+    backtest.add_argument('--workers', type=int, default=8)
+    backtest.add_argument('--processes', type=int, help='sweep processes, defaults to the CPU count')
+    backtest.add_argument('--output', help='CSV path for the sweep summary')
+    backtest.set_defaults(func=run_backtest)
+
+    simulate = commands.add_parser('simulate', help='Monte Carlo ROIC paths and value distributions')
+    simulate.add_argument('source', help='screen result CSV, or comma-separated tickers')
+    simulate.add_argument('--treasury-yield', type=float, required=True, help='discount rate in percent')
+    simulate.add_argument('--model', choices=['ar1', 'bootstrap'], default='ar1')
+    simulate.add_argument('--years', type=int, default=10, help='ROIC history years to fit on')
+    simulate.add_argument('--paths', type=int, default=100_000)
+    simulate.add_argument('--horizon', type=int, default=30)
+    simulate.add_argument('--seed', type=int, default=0)
+    simulate.add_argument('--top', type=int, default=50, help='rows simulated from a CSV')
+    simulate.add_argument('--sec-store', help='take ROIC history from an ingested SEC companyfacts store')
+    simulate.add_argument('--workers', type=int, default=8)
+    simulate.add_argument('--output', help='CSV path for the distributions')
+    simulate.set_defaults(func=run_simulate)
+
+    rank = commands.add_parser('rank', help='Pareto layers, composite scores and threshold queries on a screen')
+    rank.add_argument('source', help='screen result CSV')
+    rank.add_argument('--order', choices=['pb', 'roic', 'pareto', 'score'], default='pareto')
+    rank.add_argument('--max-pb', type=float)
+    rank.add_argument('--min-roic', type=float, help='as a fraction, e.g. 0.15')
+    rank.add_argument('--top', type=int, default=20)
+    rank.add_argument('--per-sector', type=int, help='best N per sector by composite score')
+    rank.add_argument('--workers', type=int, default=8)
+    rank.add_argument('--output', help='CSV path')
+    rank.set_defaults(func=run_rank)
+
+    ttm = commands.add_parser('ttm', help='apply new quarterly filings to rolling TTM ROIC states; with yfinance\'s '
+                                          '~5 quarters a new state needs two years of filings before it has a mean')
+    ttm.add_argument('--k', type=int, default=499, help='number of universe symbols')
+    ttm.add_argument('--universe', default='sp500')
+    ttm.add_argument('--symbols', help='comma-separated symbols instead of a universe')
+    ttm.add_argument('--window', type=int, default=4, help='years in the geometric mean')
+    ttm.add_argument('--policy', choices=['skip', 'include', 'reject'], default='skip',
+                     help='how non-positive years enter the mean')
+    ttm.add_argument('--state', help='SQLite path of the rolling states')
+    ttm.add_argument('--workers', type=int, default=8)
+    ttm.add_argument('--output', help='CSV path')
+    ttm.set_defaults(func=run_ttm)
+
+    serve = commands.add_parser('serve', help='keep the screen in memory and answer a JSON API')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--k', type=int, default=499, help='number of universe symbols')
+    serve.add_argument('--universe', default='sp500')
+    serve.add_argument('--symbols', help='comma-separated symbols instead of a universe')
+    serve.add_argument('--interval-hours', type=float, default=12, help='time between background refreshes')
+    serve.add_argument('--workers', type=int, default=8)
+    serve.add_argument('--rate', type=float, default=4, help='max remote calls per second')
+    serve.set_defaults(func=run_serve)
+
+    dcf = commands.add_parser('dcf', help='book value plus discounted EPS valuation')
+    dcf.add_argument('--eps', type=float, required=True, help='earnings per share')
+    dcf.add_argument('--book-value', type=float, required=True, help='book value per share')
+    dcf.add_argument('--treasury-yield', type=float, required=True, help='1-year US Treasury yield in percent')
+    dcf.add_argument('--years', type=int, default=30)
+    dcf.set_defaults(func=run_dcf)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    args.func(args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,377 @@
+"""
+Point-in-time backtest of the low P/B, high ROIC screen
+
+The screen is replayed on every rebalance date using only what was known
+on that date. A fiscal year's ROIC counts once its report would have been
+filed (a lag after the fiscal year end), and book value per share once its
+quarterly report would have been public. Prices come from the on-disk
+PriceMatrix of pb_history: raw closes for P/B, and a split and dividend
+adjusted matrix for returns.
+
+Book values from yfinance reach back only ~5 quarters, so over a long
+window P/B is NaN, and nothing is held, until they start. Pass book
+values that include the SEC store (load_book_values(sec_store=...));
+prepare_backtest_data warns when early rebalance dates lack them.
+
+Everything is preloaded into rebalance-date x ticker arrays:
+
+    prices   closes on each rebalance date
+    pb       P/B from the as-of book value per share
+    roic     geometric mean ROIC over the window, per ROIC window
+    returns  return from each rebalance date to the next
+
+Two biases remain unless the inputs remove them:
+
+    survivorship  the PriceMatrix holds the symbols it was built from,
+                  usually today's constituents. Pass a universe with dated
+                  snapshots (universe.import_universe_file) so each date
+                  only ranks that date's constituents; names that have
+                  since been delisted are still missing unless the matrix
+                  was built with them.
+    look-ahead    an SEC store keeps restated values by default. Ingest it
+                  with as_filed for the values as first reported.
+
+prepare_backtest_data and the backtest command warn about both.
+
+Ranking, portfolio weights, returns, turnover and drawdowns are then array
+operations across all dates at once, so one backtest is milliseconds and a
+parameter sweep over top N, ROIC window and P/B cutoff is farmed out to a
+process pool that receives the arrays once per worker.
+"""
+
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from src.siegfried.pb_history import BLOCK_TICKERS, BookValueIndex, PriceMatrix, day_numbers, pb_block
+from src.siegfried.roic_panel import compute_roic_panel, rolling_geometric_mean
+from src.siegfried.universe import constituents_as_of
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ANNUAL_REPORT_LAG = timedelta(days=90)
+PERIODS_PER_YEAR = {'M': 12, 'Q': 4}
+MIN_BOOK_COVERAGE = 0.5
+
+
+class BacktestData(NamedTuple):
+    """Rebalance-date x ticker arrays shared by every backtest run"""
+    symbols: List[str]
+    dates: pd.DatetimeIndex
+    prices: np.ndarray
+    pb: np.ndarray
+    roic: Dict[int, np.ndarray]
+    returns: np.ndarray
+    periods_per_year: int
+
+
+class BacktestResult(NamedTuple):
+    params: Dict[str, Any]
+    weights: np.ndarray
+    returns: pd.Series
+    turnover: pd.Series
+    equity: pd.Series
+    drawdown: pd.Series
+    summary: Dict[str, float]
+
+
+def rebalance_positions(dates: pd.DatetimeIndex, freq: str = 'M',
+                        traded: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Positions of the last business day of each month ('M') or quarter ('Q').
+
+    Args:
+        traded (np.ndarray): Per date, whether any close exists. Only those
+            days are candidates, so a period ending on a market holiday
+            rebalances on its last trading day
+    """
+    candidates = np.arange(len(dates)) if traded is None else np.flatnonzero(traded)
+    periods = dates[candidates].to_period(freq)
+    is_last = np.append(periods[1:] != periods[:-1], True)
+    return candidates[is_last]
+
+
+def point_in_time_roic(panel: pd.DataFrame, symbols: List[str], dates: pd.DatetimeIndex,
+                       window: int, lag: timedelta = ANNUAL_REPORT_LAG) -> np.ndarray:
+    """
+    Geometric mean ROIC over the latest window fiscal years known on each
+    date, NaN where fewer than two years are known or the mean is
+    undefined, matching the screen's 'Success' rows.
+
+    Args:
+        panel (pd.DataFrame): Raw panel from roic_panel.build_panel
+        symbols (List[str]): Column order of the result
+        dates (pd.DatetimeIndex): Row order of the result
+        window (int): Years in the geometric mean
+        lag (timedelta): Fiscal year end to filing
+
+    Returns:
+        np.ndarray: Shape (len(dates), len(symbols))
+    """
+    rolled = rolling_geometric_mean(compute_roic_panel(panel), window)
+    rows = pd.Series(range(len(symbols)), index=symbols).reindex(rolled['ticker']).to_numpy()
+    known = ~np.isnan(rows)
+    geo = np.where(rolled['years_available'].to_numpy() >= 2,
+                   rolled['geometric_avg_roic'].to_numpy(dtype=float), np.nan)[known]
+    rows = rows[known].astype(np.int64)
+    available = day_numbers(pd.DatetimeIndex(rolled['year']) + lag)[known]
+
+    if not len(rows):
+        return np.full((len(dates), len(symbols)), np.nan)
+    date_days = day_numbers(dates)
+    first_day = min(available.min(), date_days[0])
+    stride = int(max(available.max(), date_days[-1]) - first_day + 1)
+    keys = rows * stride + (available - first_day)
+    order = np.argsort(keys, kind='stable')
+    keys, rows, geo = keys[order], rows[order], geo[order]
+
+    cell_rows = np.arange(len(symbols), dtype=np.int64)
+    cell_keys = (cell_rows[None, :] * stride + (date_days - first_day)[:, None]).ravel()
+    match = np.searchsorted(keys, cell_keys, side='right') - 1
+    safe = np.clip(match, 0, None)
+    same_ticker = (match >= 0) & (rows[safe] == np.tile(cell_rows, len(date_days)))
+    return np.where(same_ticker, geo[safe], np.nan).reshape(len(date_days), len(symbols))
+
+
+def check_book_coverage(dates: pd.DatetimeIndex, prices: np.ndarray, pb: np.ndarray,
+                        min_coverage: float = MIN_BOOK_COVERAGE) -> Optional[pd.Timestamp]:
+    """
+    First rebalance date on which at least min_coverage of the priced names
+    have a P/B, with a warning when that is later than the first date.
+
+    Returns:
+        pd.Timestamp: None when no date reaches min_coverage
+    """
+    priced = np.isfinite(prices).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        coverage = np.where(priced > 0, np.isfinite(pb).sum(axis=1) / priced, 0.0)
+    covered = np.flatnonzero(coverage >= min_coverage)
+    first = dates[covered[0]] if len(covered) else None
+    if first is None:
+        logger.warning(f"No rebalance date has book values for {min_coverage:.0%} of priced names; "
+                       f"load book values from the SEC store")
+    elif covered[0] > 0:
+        logger.warning(f"Book values cover {min_coverage:.0%} of priced names only from {first.date()}, "
+                       f"{covered[0]} of {len(dates)} rebalance dates hold little or nothing")
+    return first
+
+
+def universe_membership(universe: str, symbols: List[str], dates: pd.DatetimeIndex,
+                        root: Optional[str] = None) -> np.ndarray:
+    """
+    Whether each symbol was a constituent of universe on each date, from
+    its stored snapshots. Dates before the first snapshot have no members.
+
+    Returns:
+        np.ndarray: Bool array of shape (len(dates), len(symbols))
+    """
+    columns = {symbol: column for column, symbol in enumerate(symbols)}
+    members = np.zeros((len(dates), len(symbols)), dtype=bool)
+    missing = set()
+    for row, rebalance_date in enumerate(dates):
+        try:
+            constituents = constituents_as_of(universe, rebalance_date.date(), root)
+        except LookupError:
+            continue
+        members[row, [columns[symbol] for symbol in constituents if symbol in columns]] = True
+        missing.update(symbol for symbol in constituents if symbol not in columns)
+    unlisted = int((~members.any(axis=1)).sum())
+    if unlisted:
+        logger.warning(f"{unlisted} of {len(dates)} rebalance dates precede the first {universe} snapshot "
+                       f"or have no priced constituents and hold nothing")
+    if missing:
+        logger.warning(f"{len(missing)} past {universe} constituents have no prices in the matrix, "
+                       f"so survivorship bias remains for them")
+    return members
+
+
+def prepare_backtest_data(matrix: PriceMatrix, book: pd.DataFrame, panel: pd.DataFrame,
+                          windows: Iterable[int] = (4,), freq: str = 'M',
+                          return_matrix: Optional[PriceMatrix] = None, universe: Optional[str] = None,
+                          universe_root: Optional[str] = None) -> BacktestData:
+    """
+    Preload everything the backtest reads into rebalance-date x ticker arrays.
+
+    Args:
+        matrix (PriceMatrix): Unadjusted daily closes, for P/B
+        book (pd.DataFrame): Symbol, Available_Date, Book_Value_Per_Share
+        panel (pd.DataFrame): Raw ROIC panel from roic_panel.build_panel
+        windows: ROIC windows that runs may ask for
+        freq (str): 'M' for monthly or 'Q' for quarterly rebalancing
+        return_matrix (PriceMatrix): Split and dividend adjusted closes for
+            returns, with the same symbols and dates; defaults to matrix,
+            which misses dividends and breaks at splits
+        universe (str): Universe whose dated snapshots decide which names
+            are eligible on each date; without it every symbol in matrix is
+            eligible throughout, a survivorship bias
+        universe_root (str): Directory of the universe snapshots
+
+    Raises:
+        ValueError: If return_matrix has other symbols or dates
+    """
+    traded = np.zeros(len(matrix.dates), dtype=bool)
+    for first in range(0, len(matrix.symbols), BLOCK_TICKERS):
+        traded |= np.isfinite(matrix.values[first:first + BLOCK_TICKERS]).any(axis=0)
+    positions = rebalance_positions(matrix.dates, freq, traded)
+    dates = matrix.dates[positions]
+    prices = np.asarray(matrix.values[:, positions]).T
+    book_per_share = BookValueIndex(book, matrix.symbols, dates).asof(0, len(matrix.symbols)).T
+
+    if return_matrix is None:
+        logger.warning("No adjusted price matrix, returns use raw closes without dividends or split adjustment")
+        total_return = prices
+    elif list(return_matrix.symbols) != list(matrix.symbols) or not return_matrix.dates.equals(matrix.dates):
+        raise ValueError("return_matrix must have the same symbols and dates as matrix")
+    else:
+        total_return = np.asarray(return_matrix.values[:, positions]).T
+    returns = np.full(total_return.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[:-1] = total_return[1:] / total_return[:-1] - 1
+
+    pb = pb_block(prices, book_per_share)
+    check_book_coverage(dates, prices, pb)
+    if universe is None:
+        logger.warning("No universe snapshots, every symbol in the price matrix is eligible on every date "
+                       "(survivorship bias)")
+    else:
+        pb = np.where(universe_membership(universe, matrix.symbols, dates, universe_root), pb, np.nan)
+    roic = {window: point_in_time_roic(panel, matrix.symbols, dates, window) for window in windows}
+    return BacktestData(list(matrix.symbols), dates, prices, pb, roic, returns, PERIODS_PER_YEAR[freq])
+
+
+def select_portfolios(pb: np.ndarray, roic: np.ndarray, top_n: int, pb_cutoff: Optional[float] = None,
+                      min_roic: float = 0.0) -> np.ndarray:
+    """
+    Equal weights on the top_n names per date, ranked like
+    sort_by_pb_and_roic: lowest P/B first, highest ROIC breaking ties.
+    Only names with a P/B and a ROIC of at least min_roic are eligible.
+
+    Returns:
+        np.ndarray: Weights of shape pb.shape, rows summing to 1 or 0
+    """
+    eligible = np.isfinite(pb) & np.isfinite(roic) & (roic >= min_roic)
+    if pb_cutoff is not None:
+        eligible &= pb <= pb_cutoff
+    pb_key = np.where(eligible, pb, np.inf)
+    roic_key = np.where(eligible, -roic, np.inf)
+    order = np.lexsort((roic_key, pb_key), axis=-1)[:, :top_n]
+    chosen = np.take_along_axis(eligible, order, axis=1)
+
+    weights = np.zeros(pb.shape)
+    counts = chosen.sum(axis=1, keepdims=True)
+    np.put_along_axis(weights, order, np.where(chosen, 1.0, 0.0) / np.maximum(counts, 1), axis=1)
+    return weights
+
+
+def portfolio_turnover(weights: np.ndarray, returns: np.ndarray) -> np.ndarray:
+    """
+    One-way turnover per rebalance against the previous weights after they
+    drifted with that period's returns, i.e. half the value traded.
+    """
+    drifted = np.zeros(weights.shape)
+    grown = weights[:-1] * (1 + np.nan_to_num(returns[:-1]))
+    totals = grown.sum(axis=1, keepdims=True)
+    drifted[1:] = np.divide(grown, totals, out=np.zeros(grown.shape), where=totals > 0)
+    return 0.5 * np.abs(weights - drifted).sum(axis=1)
+
+
+def equity_curve(period_returns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Growth of 1 and the drawdown from its running peak"""
+    equity = np.cumprod(1 + period_returns)
+    peak = np.maximum.accumulate(equity) if len(equity) else equity
+    return equity, equity / peak - 1
+
+
+def summarize(period_returns: np.ndarray, turnover: np.ndarray, holdings: np.ndarray,
+              periods_per_year: int) -> Dict[str, float]:
+    equity, drawdown = equity_curve(period_returns)
+    years = len(period_returns) / periods_per_year
+    volatility = period_returns.std(ddof=1) * np.sqrt(periods_per_year) if len(period_returns) > 1 else np.nan
+    mean = period_returns.mean() * periods_per_year if len(period_returns) else np.nan
+    return {
+        'total_return': float(equity[-1] - 1) if len(equity) else np.nan,
+        'cagr': float(equity[-1] ** (1 / years) - 1) if len(equity) else np.nan,
+        'volatility': float(volatility),
+        'sharpe': float(mean / volatility) if volatility else np.nan,
+        'max_drawdown': float(drawdown.min()) if len(drawdown) else np.nan,
+        'avg_turnover': float(turnover.mean()) if len(turnover) else np.nan,
+        'avg_holdings': float(holdings.mean()) if len(holdings) else np.nan,
+    }
+
+
+def run_backtest(data: BacktestData, top_n: int = 20, window: int = 4, pb_cutoff: Optional[float] = None,
+                 min_roic: float = 0.0, cost_bps: float = 0.0) -> BacktestResult:
+    """
+    Replay the screen on every rebalance date and hold the top_n names
+    equally weighted until the next one.
+
+    A name without a price at the next rebalance (delisted or halted) is
+    counted at a zero return for that period. Costs are charged at
+    cost_bps on the value traded, buys and sells both.
+    """
+    weights = select_portfolios(data.pb, data.roic[window], top_n, pb_cutoff, min_roic)
+    gross = (weights * np.nan_to_num(data.returns)).sum(axis=1)
+    turnover = portfolio_turnover(weights, data.returns)
+    net = gross - 2 * turnover * cost_bps / 10000
+
+    # The last rebalance date has no following period to earn a return in
+    periods = slice(0, len(data.dates) - 1)
+    index = data.dates[1:]
+    period_returns = net[periods]
+    equity, drawdown = equity_curve(period_returns)
+    params = {'top_n': top_n, 'window': window, 'pb_cutoff': pb_cutoff, 'min_roic': min_roic, 'cost_bps': cost_bps}
+    return BacktestResult(
+        params=params,
+        weights=weights,
+        returns=pd.Series(period_returns, index=index, name='return'),
+        turnover=pd.Series(turnover[periods], index=data.dates[periods], name='turnover'),
+        equity=pd.Series(equity, index=index, name='equity'),
+        drawdown=pd.Series(drawdown, index=index, name='drawdown'),
+        summary=summarize(period_returns, turnover[periods], (weights[periods] > 0).sum(axis=1),
+                          data.periods_per_year),
+    )
+
+
+def parameter_grid(top_n: Sequence[int] = (20,), window: Sequence[int] = (4,),
+                   pb_cutoff: Sequence[Optional[float]] = (None,), min_roic: Sequence[float] = (0.0,),
+                   cost_bps: Sequence[float] = (0.0,)) -> List[Dict[str, Any]]:
+    """Every combination of the given parameter values"""
+    names = ['top_n', 'window', 'pb_cutoff', 'min_roic', 'cost_bps']
+    return [dict(zip(names, values)) for values in itertools.product(top_n, window, pb_cutoff, min_roic, cost_bps)]
+
+
+_worker_data: Optional[BacktestData] = None
+
+
+def _init_worker(data: BacktestData) -> None:
+    global _worker_data
+    _worker_data = data
+
+
+def _run_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {**params, **run_backtest(_worker_data, **params).summary}
+
+
+def run_sweep(data: BacktestData, grid: List[Dict[str, Any]], processes: Optional[int] = None) -> pd.DataFrame:
+    """
+    Summary statistics for every parameter set, one row each, in grid order.
+    Each worker process receives the preloaded arrays once.
+
+    Raises:
+        KeyError: If a parameter set asks for a ROIC window not preloaded
+    """
+    missing = {params['window'] for params in grid} - set(data.roic)
+    if missing:
+        raise KeyError(f"ROIC windows {sorted(missing)} were not preloaded")
+    if processes == 1:
+        _init_worker(data)
+        rows = [_run_params(params) for params in grid]
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(data,)) as pool:
+            rows = list(pool.map(_run_params, grid))
+    return pd.DataFrame(rows)
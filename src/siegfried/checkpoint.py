@@ -0,0 +1,84 @@
+"""
+Append-only CSV checkpoint for screen results
+
+Each ticker's row is appended and flushed as soon as it is computed, so a
+crash or throttling storm late in a run loses at most the row in flight.
+A rerun for the same date skips the symbols already done, retries those
+whose last row is an error, and reads the final ranked table back from the
+checkpoint, where the newest row per symbol wins.
+"""
+
+import csv
+import os
+from datetime import date
+from typing import Any, Dict, List, Optional, Set
+
+import pandas as pd
+
+CHECKPOINT_COLUMNS = ['Symbol', '4Y_Geometric_Avg_ROIC', 'Status', 'Years_Available', 'PB_Ratio']
+NUMERIC_COLUMNS = ['4Y_Geometric_Avg_ROIC', 'Years_Available', 'PB_Ratio']
+
+
+def default_checkpoint_path(run_date: Optional[date] = None, directory: str = os.path.join('src', 'report')) -> str:
+    run_date = run_date or date.today()
+    return os.path.join(directory, f"checkpoint_{run_date.strftime('%Y%m%d')}.csv")
+
+
+class ScreenCheckpoint:
+    """Streaming sink and resume point for one screening run"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._drop_partial_line()
+        self._file = None
+        self._writer = None
+
+    def _drop_partial_line(self) -> None:
+        """Truncate a last line left unterminated by a crash mid-write"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            content = f.read()
+            if content and not content.endswith(b'\n'):
+                f.truncate(content.rfind(b'\n') + 1)
+
+    def completed_symbols(self) -> Set[str]:
+        """Symbols whose last row is not an error; failed ones are retried on resume"""
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, newline='') as f:
+            last_status = {row['Symbol']: row['Status'] for row in csv.DictReader(f)}
+        return {symbol for symbol, status in last_status.items() if not status.startswith('Error')}
+
+    def append(self, row: Dict[str, Any]) -> None:
+        if self._writer is None:
+            is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            self._file = open(self.path, 'a', newline='')
+            self._writer = csv.DictWriter(self._file, fieldnames=CHECKPOINT_COLUMNS, extrasaction='ignore')
+            if is_new:
+                self._writer.writeheader()
+        self._writer.writerow({column: row.get(column) for column in CHECKPOINT_COLUMNS})
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    def read(self, symbols: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Load the checkpoint as a typed result table.
+
+        Args:
+            symbols (List[str]): Restrict to and order by these symbols; the
+                last row wins if a symbol was written twice
+        """
+        df = pd.read_csv(self.path, dtype={'Symbol': str, 'Status': str})
+        for column in NUMERIC_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+        df = df.drop_duplicates('Symbol', keep='last')
+        if symbols is not None:
+            df = pd.DataFrame({'Symbol': symbols}).merge(df, on='Symbol', how='inner')
+        return df.reset_index(drop=True)
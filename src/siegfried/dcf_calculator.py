@@ -0,0 +1,125 @@
+"""
+Book value plus discounted EPS valuation (the calculatedcf.sh model)
+
+    value = book_value + eps * sum_{t=1..n} 1 / (1 + r)^t
+          = book_value + eps * (1 - (1 + r)^-n) / r
+
+The annuity factor is computed in closed form and broadcast with NumPy, so
+a whole universe can be valued across many yield scenarios and horizons in
+one call. EPS and book value per share come from the yfinance info payload
+the screener already fetches (trailingEps, bookValue). pandas and the fetch
+layer are imported inside the universe functions so `main.py dcf` starts
+with NumPy alone.
+"""
+
+import logging
+from typing import TYPE_CHECKING, List, Optional, Sequence, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from src.siegfried.fundamentals_cache import FundamentalsCache
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_HORIZON = 30
+
+ArrayLike = Union[float, Sequence[float], np.ndarray]
+
+
+def annuity_factor(rate: ArrayLike, horizon: ArrayLike = DEFAULT_HORIZON) -> np.ndarray:
+    """
+    Present value of 1 paid at the end of each year for horizon years.
+
+    Args:
+        rate: Discount rate as a decimal (0.045 for 4.5%), broadcastable
+        horizon: Number of years, broadcastable against rate
+    """
+    rate = np.asarray(rate, dtype=float)
+    horizon = np.asarray(horizon, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = (1 - (1 + rate) ** -horizon) / rate
+    return np.where(rate == 0, horizon * np.ones_like(rate), factor)
+
+
+def discount_factors(rate: float, horizon: int = DEFAULT_HORIZON) -> np.ndarray:
+    """1 / (1 + rate)^t for t = 1..horizon; sums to annuity_factor(rate, horizon)"""
+    return (1 + rate) ** -np.arange(1, horizon + 1, dtype=float)
+
+
+def dcf_value(eps: ArrayLike, book_value: ArrayLike, treasury_yield_pct: ArrayLike,
+              horizon: ArrayLike = DEFAULT_HORIZON) -> np.ndarray:
+    """Book value plus EPS discounted over horizon years, broadcast elementwise"""
+    rate = np.asarray(treasury_yield_pct, dtype=float) / 100
+    return np.asarray(book_value, dtype=float) + np.asarray(eps, dtype=float) * annuity_factor(rate, horizon)
+
+
+def dcf_grid(eps: ArrayLike, book_value: ArrayLike, treasury_yields_pct: ArrayLike,
+             horizons: ArrayLike = (DEFAULT_HORIZON,)) -> np.ndarray:
+    """
+    Value every ticker under every yield and horizon scenario.
+
+    Args:
+        eps: Shape (n_tickers,)
+        book_value: Shape (n_tickers,)
+        treasury_yields_pct: Shape (n_yields,), in percent
+        horizons: Shape (n_horizons,), in years
+
+    Returns:
+        np.ndarray: Shape (n_tickers, n_yields, n_horizons)
+    """
+    eps = np.asarray(eps, dtype=float)[:, None, None]
+    book_value = np.asarray(book_value, dtype=float)[:, None, None]
+    rates = np.asarray(treasury_yields_pct, dtype=float)[None, :, None] / 100
+    horizons = np.asarray(horizons, dtype=float)[None, None, :]
+    return book_value + eps * annuity_factor(rates, horizons)
+
+
+def load_dcf_inputs(symbols: List[str], workers: int = 1,
+                    cache: Optional['FundamentalsCache'] = None) -> 'pd.DataFrame':
+    """EPS and book value per share from each symbol's info payload"""
+    import pandas as pd
+    from src.siegfried.fetch_engine import map_ordered
+    from src.siegfried.ticker_snapshot import TickerSnapshot
+
+    def fetch(symbol):
+        try:
+            info = TickerSnapshot(symbol, cache).info
+        except Exception as e:
+            logger.warning(f"Failed to load DCF inputs for {symbol}: {e}")
+            info = {}
+        return {'Symbol': symbol, 'EPS': info.get('trailingEps'), 'Book_Value': info.get('bookValue')}
+
+    df = pd.DataFrame(map_ordered(fetch, symbols, workers), columns=['Symbol', 'EPS', 'Book_Value'])
+    df[['EPS', 'Book_Value']] = df[['EPS', 'Book_Value']].apply(pd.to_numeric, errors='coerce')
+    return df
+
+
+def value_universe(inputs: 'pd.DataFrame', treasury_yields_pct: ArrayLike,
+                   horizons: ArrayLike = (DEFAULT_HORIZON,)) -> 'pd.DataFrame':
+    """
+    Long table of DCF values for every symbol, yield and horizon.
+
+    Args:
+        inputs (pd.DataFrame): Symbol, EPS and Book_Value columns
+        treasury_yields_pct: Yield scenarios in percent
+        horizons: Horizons in years
+
+    Returns:
+        pd.DataFrame: Symbol, Treasury_Yield_Pct, Horizon, DCF_Value
+    """
+    import pandas as pd
+
+    yields = np.asarray(treasury_yields_pct, dtype=float)
+    horizons = np.asarray(horizons, dtype=float)
+    values = dcf_grid(inputs['EPS'].to_numpy(dtype=float), inputs['Book_Value'].to_numpy(dtype=float),
+                      yields, horizons)
+    n, m, h = values.shape
+    return pd.DataFrame({
+        'Symbol': np.repeat(inputs['Symbol'].to_numpy(), m * h),
+        'Treasury_Yield_Pct': np.tile(np.repeat(yields, h), n),
+        'Horizon': np.tile(horizons, n * m).astype(int),
+        'DCF_Value': values.ravel(),
+    })
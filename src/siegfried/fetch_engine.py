@@ -0,0 +1,116 @@
+"""
+Bounded thread-pool engine for per-ticker fetches
+
+yfinance calls are dominated by network round trips, so the screen is
+I/O-wait bound. This module runs a per-ticker function across a small
+thread pool while keeping results in input order, throttles the global
+call rate and retries calls that were rejected for rate limiting.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_MARKERS = ('too many requests', 'rate limit')
+
+
+class RateLimiter:
+    """Token bucket shared by all worker threads"""
+
+    def __init__(self, calls_per_second: Optional[float] = None, burst: int = 1):
+        self.calls_per_second = calls_per_second
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.calls_per_second:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.calls_per_second)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.calls_per_second
+            time.sleep(wait)
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether an exception means the remote side throttled us"""
+    if type(error).__name__ == 'YFRateLimitError':
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+def compute_backoff(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_retry(func: Callable[..., Any], *args: Any,
+                    limiter: Optional[RateLimiter] = None,
+                    retries: int = 3,
+                    base_delay: float = 1.0,
+                    max_delay: float = 30.0) -> Any:
+    """
+    Call func(*args) under the rate limiter, retrying throttled calls.
+
+    Only rate-limit errors are retried; any other exception, or a throttle
+    that outlives all retries, is raised to the caller unchanged. Pass a
+    limiter only when func makes a single remote call; TickerSnapshot
+    meters its own fetches.
+    """
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return func(*args)
+        except Exception as e:
+            if not is_rate_limited(e) or attempt >= retries:
+                raise
+            delay = compute_backoff(attempt, base_delay, max_delay)
+            logger.warning(f"Rate limited on {args}, retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+            time.sleep(delay)
+            attempt += 1
+
+
+def imap_ordered(func: Callable[[Any], Any], items: Iterable[Any], workers: int = 1,
+                 max_in_flight: Optional[int] = None) -> Iterator[Any]:
+    """
+    Yield func(item) for every item, in input order.
+
+    With workers <= 1 this is a plain serial loop. Otherwise at most
+    max_in_flight calls (default 4 per worker) are queued at once, so
+    results never pile up in memory faster than the caller consumes them.
+    """
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    max_in_flight = max_in_flight or workers * 4
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def map_ordered(func: Callable[[Any], Any], items: Iterable[Any], workers: int = 1) -> List[Any]:
+    return list(imap_ordered(func, items, workers))
@@ -10,32 +10,43 @@ TODO: The BRKB's calculation is not correct and needs to modify
 """
 
 import pandas as pd
-import requests
 import logging
+import time
 from datetime import date
-from typing import List, Dict, Any
+from functools import partial
+from typing import List, Dict, Any, Optional, Tuple
 from tqdm import tqdm
+from src.siegfried import metrics
+from src.siegfried.fetch_engine import RateLimiter, call_with_retry, imap_ordered
 from src.siegfried.roic_calculator import calculate_roic_multi_year
 from src.siegfried.pb_calculator import calculate_pb
+from src.siegfried.ticker_snapshot import TickerSnapshot
+from src.siegfried.fundamentals_cache import FundamentalsCache
+from src.siegfried.checkpoint import ScreenCheckpoint, default_checkpoint_path
+from src.siegfried.screen_state import ScreenState, latest_fiscal_period
+from src.siegfried.universe import constituents_as_of, load_universe, scrape_sp500
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def get_top_k_companies(k=100):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
-    response = requests.get(url, headers=headers)
-    sp500 = pd.read_html(response.content)[0]
-    tickers = sp500['Symbol'].tolist()[:k]
-    return [ticker.replace('.', '-') for ticker in tickers]
+    return scrape_sp500()[:k]
+
+def load_all_symbols(k=100, universe: str = 'sp500', as_of: Optional[date] = None) -> List[str]:
+    """
+    First k symbols of a stored universe, reusing a fresh on-disk snapshot.
 
-def load_all_symbols(k=100) -> List[str]:
-    return get_top_k_companies(k)
+    Args:
+        k (int): Number of symbols to keep
+        universe (str): Universe name, 'sp500' or any imported list
+        as_of (date): Use the constituents stored for this date instead
+    """
+    if as_of is not None:
+        return constituents_as_of(universe, as_of)[:k]
+    return load_universe(universe)[:k]
 
-def calculate_four_year_rolling_roic(ticker: str) -> Dict[str, Any]:
-    return calculate_roic_multi_year(ticker, years=4)
+def calculate_four_year_rolling_roic(ticker: str, snapshot: Optional[TickerSnapshot] = None) -> Dict[str, Any]:
+    return calculate_roic_multi_year(ticker, years=4, snapshot=snapshot)
 
 def validate_input_values(values: List[float]) -> bool:
     if not values or any(v is None for v in values):
@@ -63,91 +74,278 @@ def compute_geometric_average(values: List[float]) -> float:
     
     return calculate_geometric_mean(valid_values)
 
-def append_geometric_mean_roic_results(results, ticker, roic_values):
+def build_geometric_mean_roic_row(ticker: str, roic_values: List[float]) -> Dict[str, Any]:
     if len(roic_values) >= 2:
         geo_avg_roic = compute_geometric_average(roic_values)
-        results.append({
-                        'Symbol': ticker,
-                        '4Y_Geometric_Avg_ROIC': geo_avg_roic,
-                        'Status': 'Success',
-                        'Years_Available': len(roic_values)
-                    })
-    else:
-        results.append({
-                        'Symbol': ticker,
-                        '4Y_Geometric_Avg_ROIC': None,
-                        'Status': f'Insufficient Data ({len(roic_values)} years)'
-                    })
-        
-def process_all_symbols_and_build_table(symbols: List[str]) -> pd.DataFrame:
-    results = []
-    
-    for ticker in tqdm(symbols, desc="Analyzing symbols", unit="symbol"):
-        try:
-            roic_data = calculate_four_year_rolling_roic(ticker)
-            if 'error' in roic_data or not roic_data.get('roic_data'):
-                results.append({
-                    'Symbol': ticker,
-                    '4Y_Geometric_Avg_ROIC': None,
-                    'Status': 'Error/No Data'
-                })
-            else:
-                roic_values = [d['roic'] for d in roic_data['roic_data'] if d['roic'] is not None]
-                append_geometric_mean_roic_results(results, ticker, roic_values)
-                
-        except Exception as e:
-            results.append({
+        return {
+            'Symbol': ticker,
+            '4Y_Geometric_Avg_ROIC': geo_avg_roic,
+            'Status': 'Success',
+            'Years_Available': len(roic_values)
+        }
+    return {
+        'Symbol': ticker,
+        '4Y_Geometric_Avg_ROIC': None,
+        'Status': f'Insufficient Data ({len(roic_values)} years)'
+    }
+
+def append_geometric_mean_roic_results(results, ticker, roic_values):
+    results.append(build_geometric_mean_roic_row(ticker, roic_values))
+
+def analyze_symbol_roic_with_series(ticker: str, limiter: Optional[RateLimiter] = None, retries: int = 3,
+                                    snapshot: Optional[TickerSnapshot] = None) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    ROIC row and the yearly roic_data behind it. The limiter meters the remote
+    calls of a snapshot created here; a snapshot passed in carries its own.
+    """
+    snapshot = snapshot or TickerSnapshot(ticker, limiter=limiter)
+    try:
+        roic_data = call_with_retry(calculate_four_year_rolling_roic, ticker, snapshot, retries=retries)
+        if 'error' in roic_data or not roic_data.get('roic_data'):
+            return {
                 'Symbol': ticker,
                 '4Y_Geometric_Avg_ROIC': None,
-                'Status': f'Error: {str(e)}'
-            })
-    
+                'Status': 'Error/No Data'
+            }, []
+        roic_values = [d['roic'] for d in roic_data['roic_data'] if d['roic'] is not None]
+        return build_geometric_mean_roic_row(ticker, roic_values), roic_data['roic_data']
+
+    except Exception as e:
+        return {
+            'Symbol': ticker,
+            '4Y_Geometric_Avg_ROIC': None,
+            'Status': f'Error: {str(e)}'
+        }, []
+
+def analyze_symbol_roic_with_inputs(ticker: str, limiter: Optional[RateLimiter] = None, retries: int = 3,
+                                    snapshot: Optional[TickerSnapshot] = None) -> Tuple[Dict[str, Any], List[float]]:
+    row, series = analyze_symbol_roic_with_series(ticker, limiter, retries, snapshot)
+    return row, [d['roic'] for d in series if d['roic'] is not None]
+
+def analyze_symbol_roic(ticker: str, limiter: Optional[RateLimiter] = None, retries: int = 3,
+                        snapshot: Optional[TickerSnapshot] = None) -> Dict[str, Any]:
+    return analyze_symbol_roic_with_inputs(ticker, limiter, retries, snapshot)[0]
+
+def process_all_symbols_and_build_table(symbols: List[str], workers: int = 1,
+                                        limiter: Optional[RateLimiter] = None,
+                                        retries: int = 3) -> pd.DataFrame:
+    """
+    Compute the 4-year geometric average ROIC for every symbol.
+
+    Args:
+        symbols (List[str]): Ticker symbols to analyze
+        workers (int): Number of fetch threads, 1 keeps the serial path
+        limiter (RateLimiter): Optional global rate limiter shared by all threads
+        retries (int): Retries with backoff for rate-limited calls
+
+    Returns:
+        pd.DataFrame: One row per symbol, in the order of symbols
+    """
+    analyze = partial(analyze_symbol_roic, limiter=limiter, retries=retries)
+    results = list(tqdm(imap_ordered(analyze, symbols, workers),
+                        total=len(symbols), desc="Analyzing symbols", unit="symbol"))
     return pd.DataFrame(results)
 
-def apply_pb_calculator_to_all_symbols(result_df: pd.DataFrame) -> pd.DataFrame:
+def calculate_pb_or_none(symbol: str, limiter: Optional[RateLimiter] = None, retries: int = 3,
+                         snapshot: Optional[TickerSnapshot] = None) -> Optional[float]:
+    snapshot = snapshot or TickerSnapshot(symbol, limiter=limiter)
+    try:
+        return call_with_retry(calculate_pb, symbol, snapshot, retries=retries)
+    except Exception as e:
+        logger.warning(f"Failed to calculate P/B ratio for {symbol}: {e}")
+        return None
+
+def apply_pb_calculator_to_all_symbols(result_df: pd.DataFrame, workers: int = 1,
+                                       limiter: Optional[RateLimiter] = None,
+                                       retries: int = 3) -> pd.DataFrame:
     """
     Apply pb_calculator's calculate_pb function to all symbols in result_df.
     
     Args:
         result_df (pd.DataFrame): DataFrame containing symbols with ROIC analysis results
+        workers (int): Number of fetch threads, 1 keeps the serial path
+        limiter (RateLimiter): Optional global rate limiter shared by all threads
+        retries (int): Retries with backoff for rate-limited calls
         
     Returns:
         pd.DataFrame: DataFrame with added P/B ratio column
     """
-    pb_ratios = []
-    
-    for symbol in tqdm(result_df['Symbol'], desc="Calculating P/B ratios", unit="symbol"):
-        try:
-            pb_ratio = calculate_pb(symbol)
-            pb_ratios.append(pb_ratio)
-        except Exception as e:
-            logger.warning(f"Failed to calculate P/B ratio for {symbol}: {e}")
-            pb_ratios.append(None)
+    symbols = result_df['Symbol'].tolist()
+    pb = partial(calculate_pb_or_none, limiter=limiter, retries=retries)
+    pb_ratios = list(tqdm(imap_ordered(pb, symbols, workers),
+                          total=len(symbols), desc="Calculating P/B ratios", unit="symbol"))
     
     result_df['PB_Ratio'] = pb_ratios
     return result_df
 
-def main_roic_analysis(k=100) -> pd.DataFrame:
-    def format_geometric_mean_roic_to_percentage(df):
-        df['4Y_Geometric_Avg_ROIC_Pct'] = df['4Y_Geometric_Avg_ROIC'].apply(lambda x: f"{x*100:.2f}%" if x is not None else "N/A")
+def analyze_symbol(ticker: str, limiter: Optional[RateLimiter] = None, retries: int = 3,
+                   cache: Optional[FundamentalsCache] = None) -> Tuple[Dict[str, Any], Optional[float]]:
+    """Run the ROIC and P/B stages for one symbol off a single shared snapshot"""
+    start = time.perf_counter()
+    snapshot = TickerSnapshot(ticker, cache, limiter)
+    row = analyze_symbol_roic(ticker, limiter, retries, snapshot)
+    pb_ratio = calculate_pb_or_none(ticker, limiter, retries, snapshot)
+    metrics.observe('ticker_seconds', time.perf_counter() - start, mode='full')
+    return row, pb_ratio
+
+def analyze_symbol_incrementally(ticker: str, state: ScreenState, limiter: Optional[RateLimiter] = None,
+                                 retries: int = 3, cache: Optional[FundamentalsCache] = None
+                                 ) -> Tuple[Dict[str, Any], Optional[float]]:
+    """
+    Reuse the stored ROIC row unless the ticker's statements need a refetch.
+
+    The info payload is always fetched: it carries the latest fiscal period
+    used to detect new filings and the price needed for P/B.
+    """
+    start = time.perf_counter()
+    snapshot = TickerSnapshot(ticker, cache, limiter)
+    try:
+        latest_period = latest_fiscal_period(call_with_retry(getattr, snapshot, 'info', retries=retries))
+    except Exception as e:
+        logger.warning(f"Failed to fetch info for {ticker}: {e}")
+        latest_period = None
+
+    entry = state.get(ticker)
+    if state.needs_refetch(entry, latest_period):
+        if cache is not None and entry is not None and latest_period not in (None, entry.latest_period):
+            cache.invalidate(ticker, ['balance_sheet', 'financials'])
+        row, roic_values = analyze_symbol_roic_with_inputs(ticker, limiter, retries, snapshot)
+        state.put(ticker, latest_period, roic_values, row)
+        mode = 'refetched'
+    else:
+        row = entry.row
+        mode = 'reused'
+
+    pb_ratio = calculate_pb_or_none(ticker, limiter, retries, snapshot)
+    metrics.observe('ticker_seconds', time.perf_counter() - start, mode=mode)
+    return row, pb_ratio
+
+def screen_symbols(symbols: List[str], workers: int = 1,
+                   limiter: Optional[RateLimiter] = None,
+                   retries: int = 3,
+                   cache: Optional[FundamentalsCache] = None,
+                   state: Optional[ScreenState] = None,
+                   checkpoint: Optional[ScreenCheckpoint] = None) -> pd.DataFrame:
+    """
+    Build the ROIC table with its P/B column, fetching each symbol only once.
+
+    Args:
+        symbols (List[str]): Ticker symbols to analyze
+        workers (int): Number of fetch threads, 1 keeps the serial path
+        limiter (RateLimiter): Optional global rate limiter shared by all threads
+        retries (int): Retries with backoff for rate-limited calls
+        cache (FundamentalsCache): Optional on-disk cache for statements and info
+        state (ScreenState): Previous run's results; when given, statements are
+            only re-fetched for symbols with new filings or stale entries
+        checkpoint (ScreenCheckpoint): Stream each row to disk as it finishes,
+            skip symbols already checkpointed and read the table back from it
+
+    Returns:
+        pd.DataFrame: Same table as process_all_symbols_and_build_table followed
+        by apply_pb_calculator_to_all_symbols
+    """
+    if state is not None:
+        analyze = partial(analyze_symbol_incrementally, state=state, limiter=limiter,
+                          retries=retries, cache=cache)
+    else:
+        analyze = partial(analyze_symbol, limiter=limiter, retries=retries, cache=cache)
+
+    pending = symbols
+    if checkpoint is not None:
+        completed = checkpoint.completed_symbols()
+        pending = [symbol for symbol in symbols if symbol not in completed]
+        if len(pending) < len(symbols):
+            logger.info(f"Resuming from {checkpoint.path}: {len(symbols) - len(pending)} symbols already done")
+
+    results = tqdm(imap_ordered(analyze, pending, workers),
+                   total=len(pending), desc="Analyzing symbols", unit="symbol")
+    if checkpoint is None:
+        results = list(results)
+        df = pd.DataFrame([row for row, _ in results])
+        df['PB_Ratio'] = [pb_ratio for _, pb_ratio in results]
+        for row, _ in results:
+            metrics.increment('ticker_status_total', status=status_category(row['Status']))
         return df
-    
-    def sort_by_pb_and_roic(df):
-        df_sorted = df.sort_values(['PB_Ratio', '4Y_Geometric_Avg_ROIC'], 
-                                 ascending=[True, False], na_position='last')
-        return df_sorted
-    
-    symbols = load_all_symbols(k)
-    logger.info(f"Analyzing {len(symbols)} symbols for 4-year rolling geometric average ROIC...")
-    
-    df = process_all_symbols_and_build_table(symbols)
-    df = apply_pb_calculator_to_all_symbols(df)
-    df = format_geometric_mean_roic_to_percentage(df)
-    df = sort_by_pb_and_roic(df)
+
+    try:
+        for row, pb_ratio in results:
+            checkpoint.append(dict(row, PB_Ratio=pb_ratio))
+            metrics.increment('ticker_status_total', status=status_category(row['Status']))
+    finally:
+        checkpoint.close()
+    return checkpoint.read(symbols)
+
+def status_category(status: str) -> str:
+    """Collapse a Status value to Success, Insufficient Data or Error"""
+    if status.startswith('Insufficient'):
+        return 'Insufficient Data'
+    return 'Success' if status == 'Success' else 'Error'
+
+def format_geometric_mean_roic_to_percentage(df: pd.DataFrame) -> pd.DataFrame:
+    df['4Y_Geometric_Avg_ROIC_Pct'] = df['4Y_Geometric_Avg_ROIC'].apply(lambda x: f"{x*100:.2f}%" if x is not None else "N/A")
     return df
 
+def sort_by_pb_and_roic(df: pd.DataFrame) -> pd.DataFrame:
+    df_sorted = df.sort_values(['PB_Ratio', '4Y_Geometric_Avg_ROIC'], 
+                             ascending=[True, False], na_position='last')
+    return df_sorted
+
+def main_roic_analysis(k=100, workers: int = 1, calls_per_second: Optional[float] = None,
+                       retries: int = 3, cache: Optional[FundamentalsCache] = None,
+                       state: Optional[ScreenState] = None,
+                       universe: str = 'sp500',
+                       metrics_dir: Optional[str] = None,
+                       checkpoint_path: Optional[str] = None,
+                       processes: int = 1,
+                       queue_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    Screen the universe and rank it by P/B and ROIC.
+
+    Raises:
+        ValueError: If state or checkpoint_path is combined with a sharded
+            screen (processes > 1 or queue_path), which resumes from its
+            job queue instead
+    """
+    sharded = processes > 1 or queue_path is not None
+    if sharded and (state is not None or checkpoint_path is not None):
+        raise ValueError("Incremental state and checkpoints apply to single-process screens; "
+                         "a sharded screen resumes from its job queue")
+    if metrics_dir is not None:
+        metrics.reset()
+        metrics.enable()
+    try:
+        with metrics.timer('universe'):
+            symbols = load_all_symbols(k, universe)
+        logger.info(f"Analyzing {len(symbols)} symbols for 4-year rolling geometric average ROIC...")
+    
+        limiter = RateLimiter(calls_per_second, burst=workers)
+        checkpoint = ScreenCheckpoint(checkpoint_path) if checkpoint_path else None
+        with metrics.timer('fetch_and_compute'):
+            if sharded:
+                from src.siegfried.job_queue import run_sharded_screen
+                df = run_sharded_screen(symbols, processes, queue_path, workers=workers,
+                                        calls_per_second=calls_per_second, retries=retries, cache=cache)
+            else:
+                df = screen_symbols(symbols, workers, limiter, retries, cache, state, checkpoint)
+        if cache is not None:
+            with metrics.timer('cache_eviction'):
+                cache.evict()
+        with metrics.timer('post_processing'):
+            df = format_geometric_mean_roic_to_percentage(df)
+            df = sort_by_pb_and_roic(df)
+
+        if metrics_dir is not None:
+            json_path, prom_path = metrics.dump(metrics_dir, f"metrics_{date.today().strftime('%Y%m%d')}")
+            logger.info(f"Run metrics written to {json_path} and {prom_path}")
+        return df
+    finally:
+        if metrics_dir is not None:
+            metrics.disable()
+
 if __name__ == "__main__":
-    results_df = main_roic_analysis(499)
+    results_df = main_roic_analysis(499, workers=8, calls_per_second=4, cache=FundamentalsCache(),
+                                    state=ScreenState(), metrics_dir="src/report",
+                                    checkpoint_path=default_checkpoint_path())
     logger.info("\n4-Year Rolling Geometric Average ROIC Analysis")
     logger.info("=" * 60)
     #logger.info(f"\n{results_df[['Symbol', '4Y_Geometric_Avg_ROIC_Pct', 'Years_Available', 'Status']].head(20).to_string()}")
@@ -155,4 +353,6 @@ if __name__ == "__main__":
     
     successful_analysis = results_df[results_df['Status'] == 'Success']
     successful_analysis.to_csv("src/report/high_roic_company_{}.csv".format(date.today().strftime("%Y%m%d")))
+    from src.siegfried.report_history import ReportHistory
+    ReportHistory().append(results_df)
     logger.info(f"Successfully analyzed: {len(successful_analysis)} out of {len(results_df)} symbols")
\ No newline at end of file
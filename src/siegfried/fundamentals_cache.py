@@ -0,0 +1,203 @@
+"""
+On-disk SQLite cache for yfinance statements, info and splits
+
+Entries are keyed by ticker, statement type and period (one row per
+statement column, period '' for info). Each statement type has its own TTL
+because annual statements change a few times a year while info carries the
+current price. An empty statement is usually a transient upstream failure,
+so it is kept only for a short negative TTL. In offline mode only cached
+data is served, however old.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from src.siegfried import metrics
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join('src', 'cache')
+
+DEFAULT_TTL = {
+    'balance_sheet': timedelta(days=30),
+    'financials': timedelta(days=30),
+    'quarterly_balance_sheet': timedelta(days=7),
+    'quarterly_financials': timedelta(days=7),
+    'info': timedelta(hours=12),
+    'splits': timedelta(days=7),
+}
+
+DEFAULT_NEGATIVE_TTL = timedelta(hours=1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    ticker TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    period TEXT NOT NULL,
+    payload TEXT,
+    fetched_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (ticker, kind, period)
+)
+"""
+
+
+class OfflineCacheMiss(LookupError):
+    """Raised in offline mode when the cache has no entry for a request"""
+
+
+def encode_value(kind: str, value: Any) -> Dict[str, Optional[str]]:
+    """Split a statement into one JSON payload per period"""
+    if kind == 'info':
+        return {'': json.dumps(value, default=str)}
+    if kind == 'splits':
+        return {'': json.dumps({str(day.date()): float(ratio) for day, ratio in value.items()})}
+    if value is None or value.empty:
+        return {'': None}
+    return {
+        column.isoformat(): json.dumps({'index': list(value.index), 'values': value[column].tolist()})
+        for column in value.columns
+    }
+
+
+def decode_value(kind: str, rows: Dict[str, Optional[str]]) -> Any:
+    import pandas as pd
+    if kind == 'info':
+        return json.loads(rows[''])
+    if kind == 'splits':
+        splits = json.loads(rows[''])
+        return pd.Series(list(splits.values()), index=pd.DatetimeIndex(list(splits)), dtype=float)
+    if '' in rows:
+        return pd.DataFrame()
+    columns = {}
+    for period in sorted(rows, reverse=True):
+        payload = json.loads(rows[period])
+        columns[pd.Timestamp(period)] = pd.Series(payload['values'], index=payload['index'], dtype=float)
+    return pd.DataFrame(columns)
+
+
+class FundamentalsCache:
+    """
+    Persistent fundamentals cache shared by every TickerSnapshot in a run.
+
+    Args:
+        path (str): SQLite file, defaults to src/cache/fundamentals.sqlite
+        ttl (Dict[str, timedelta]): Per statement type TTL overrides
+        offline (bool): Serve only from the cache and never call fetch
+        max_age (timedelta): Entries older than this are dropped by evict()
+        max_bytes (int): evict() drops the oldest entries beyond this size
+        negative_ttl (timedelta): TTL for empty statements
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[Dict[str, timedelta]] = None,
+                 offline: bool = False, max_age: Optional[timedelta] = None,
+                 max_bytes: Optional[int] = None, negative_ttl: timedelta = DEFAULT_NEGATIVE_TTL):
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, 'fundamentals.sqlite')
+        self.ttl = dict(DEFAULT_TTL, **(ttl or {}))
+        self.negative_ttl = negative_ttl
+        self.offline = offline
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _read(self, ticker: str, kind: str):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT period, payload, fetched_at FROM entries WHERE ticker = ? AND kind = ?",
+                (ticker, kind)).fetchall()
+        if not rows:
+            return None, None
+        fetched_at = min(row[2] for row in rows)
+        return {row[0]: row[1] for row in rows}, fetched_at
+
+    def is_fresh(self, kind: str, fetched_at: float, empty: bool = False) -> bool:
+        ttl = self.ttl.get(kind)
+        if empty and (ttl is None or self.negative_ttl < ttl):
+            ttl = self.negative_ttl
+        return ttl is None or time.time() - fetched_at < ttl.total_seconds()
+
+    def get(self, ticker: str, kind: str) -> Any:
+        """Return the cached value, or None when missing or past its TTL"""
+        rows, fetched_at = self._read(ticker, kind)
+        if rows is None:
+            if self.offline:
+                raise OfflineCacheMiss(f"No cached {kind} for {ticker}")
+            return None
+        empty = kind not in ('info', 'splits') and rows.get('', '') is None
+        if not self.offline and not self.is_fresh(kind, fetched_at, empty):
+            return None
+        return decode_value(kind, rows)
+
+    def put(self, ticker: str, kind: str, value: Any) -> None:
+        now = time.time()
+        records = [(ticker, kind, period, payload, now, len(payload or ''))
+                   for period, payload in encode_value(kind, value).items()]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE ticker = ? AND kind = ?", (ticker, kind))
+            self._conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)", records)
+
+    def get_or_fetch(self, ticker: str, kind: str, fetch: Callable[[], Any]) -> Any:
+        value = self.get(ticker, kind)
+        if value is None:
+            metrics.increment('cache_requests_total', kind=kind, result='miss')
+            value = fetch()
+            self.put(ticker, kind, value)
+        else:
+            metrics.increment('cache_requests_total', kind=kind, result='hit')
+        return value
+
+    def invalidate(self, ticker: str, kinds: Optional[Iterable[str]] = None) -> None:
+        with self._lock, self._conn:
+            if kinds is None:
+                self._conn.execute("DELETE FROM entries WHERE ticker = ?", (ticker,))
+            else:
+                self._conn.executemany("DELETE FROM entries WHERE ticker = ? AND kind = ?",
+                                       [(ticker, kind) for kind in kinds])
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self, max_age: Optional[timedelta] = None, max_bytes: Optional[int] = None) -> int:
+        """
+        Drop entries older than max_age, then the oldest entries until the
+        cache fits in max_bytes. Defaults come from the constructor.
+
+        Returns:
+            int: Number of (ticker, statement type) entries removed
+        """
+        max_age = max_age or self.max_age
+        max_bytes = max_bytes if max_bytes is not None else self.max_bytes
+        with self._lock, self._conn:
+            groups = self._conn.execute(
+                "SELECT ticker, kind, MIN(fetched_at), SUM(size) FROM entries "
+                "GROUP BY ticker, kind ORDER BY MIN(fetched_at)").fetchall()
+            total = sum(group[3] for group in groups)
+            cutoff = time.time() - max_age.total_seconds() if max_age else None
+            doomed = []
+            for ticker, kind, fetched_at, size in groups:
+                too_old = cutoff is not None and fetched_at < cutoff
+                too_big = max_bytes is not None and total > max_bytes
+                if not (too_old or too_big):
+                    break
+                doomed.append((ticker, kind))
+                total -= size
+            self._conn.executemany("DELETE FROM entries WHERE ticker = ? AND kind = ?", doomed)
+        if doomed:
+            logger.info(f"Evicted {len(doomed)} cache entries from {self.path}")
+        return len(doomed)
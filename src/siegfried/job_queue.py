@@ -0,0 +1,366 @@
+"""
+Sharded screening over a durable SQLite job queue
+
+The symbol list is split into work units stored in one SQLite file. Any
+number of worker processes, on this host or on others that share the
+filesystem, claim a unit under a time-limited lease, screen it with the
+usual threaded screen_symbols, and write the rows back to the same file.
+A heartbeat keeps the lease alive while a unit runs. The lease lapses if
+its worker dies, and the unit is handed to another worker until it has
+been attempted max_attempts times. A unit whose rows include per-ticker
+errors, such as a throttled fetch, goes back to pending under the same
+attempt limit, and a retry never replaces a good row with an error. The
+merged rows form the same table as screen_symbols, which
+main_roic_analysis then ranks as usual.
+
+Run metrics from local worker processes are merged into the parent's.
+Workers started elsewhere with `main.py worker` keep their own metrics,
+so --metrics-dir does not cover them.
+
+A queue file belongs to one symbol list. Rerunning with the same list
+resumes it; enqueueing a different list raises, and the default path
+carries a hash of the list so a same-day rerun with another universe or
+--k gets a fresh queue.
+
+SQLite's file locking is what makes claims exclusive. That holds on local
+disks and on network filesystems with working POSIX locks. Hosts should
+keep their clocks in sync, because lease expiry is compared against each
+host's wall clock.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+from src.siegfried import metrics
+from src.siegfried.fetch_engine import RateLimiter
+from src.siegfried.find_hidden_cheap_goods_in_rubbish import screen_symbols, status_category
+from src.siegfried.fundamentals_cache import FundamentalsCache
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_UNIT_SIZE = 50
+DEFAULT_LEASE_SECONDS = 600.0
+DEFAULT_MAX_ATTEMPTS = 3
+POLL_SECONDS = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY,
+    symbols TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_expires REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    symbol TEXT PRIMARY KEY,
+    unit_id INTEGER NOT NULL,
+    row TEXT NOT NULL
+);
+"""
+
+
+def default_queue_path(run_date: Optional[date] = None, directory: str = os.path.join('src', 'report'),
+                       symbols: Optional[List[str]] = None) -> str:
+    """src/report/jobs_YYYYMMDD.sqlite, or jobs_YYYYMMDD_<hash>.sqlite for a symbol list"""
+    run_date = run_date or date.today()
+    suffix = ''
+    if symbols is not None:
+        suffix = '_' + hashlib.sha1(json.dumps(list(symbols)).encode()).hexdigest()[:10]
+    return os.path.join(directory, f"jobs_{run_date.strftime('%Y%m%d')}{suffix}.sqlite")
+
+
+def default_owner() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def is_error_row(row: Dict[str, Any]) -> bool:
+    return status_category(row['Status']) == 'Error'
+
+
+class WorkUnit(NamedTuple):
+    id: int
+    symbols: List[str]
+    attempts: int
+
+
+class JobQueue:
+    """
+    Work units and their results in one SQLite file.
+
+    Args:
+        path (str): Queue file, on a filesystem every worker can reach
+        lease_seconds (float): How long a claim lasts without a renewal
+        max_attempts (int): Claims per unit before it is marked failed
+    """
+
+    def __init__(self, path: Optional[str] = None, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = path or default_queue_path()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """An immediate transaction: holds SQLite's write lock from the start"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def enqueue(self, symbols: List[str], unit_size: int = DEFAULT_UNIT_SIZE) -> int:
+        """
+        Split symbols into units. A queue that already holds units for the
+        same symbols is left as is, so rerunning a sharded screen resumes it
+        instead of starting over.
+
+        Returns:
+            int: Number of units added
+
+        Raises:
+            ValueError: If the queue holds units for a different symbol list
+        """
+        units = [(json.dumps(symbols[i:i + unit_size]),) for i in range(0, len(symbols), unit_size)]
+        with self._write() as conn:
+            queued = [symbol for record in conn.execute("SELECT symbols FROM units ORDER BY id")
+                      for symbol in json.loads(record[0])]
+            if queued == list(symbols):
+                return 0
+            if queued:
+                raise ValueError(f"Queue {self.path} holds a different list of {len(queued)} symbols; "
+                                 f"use another queue file for these {len(symbols)}")
+            conn.executemany("INSERT INTO units (symbols) VALUES (?)", units)
+        return len(units)
+
+    def claim(self, owner: str) -> Optional[WorkUnit]:
+        """Lease the next pending unit, or one whose lease lapsed"""
+        now = time.time()
+        with self._write() as conn:
+            conn.execute("UPDATE units SET status = 'failed', error = 'lease expired' "
+                         "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?", (now, self.max_attempts))
+            record = conn.execute("SELECT id, symbols, attempts FROM units "
+                                  "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                                  "ORDER BY id LIMIT 1", (now,)).fetchone()
+            if record is None:
+                return None
+            conn.execute("UPDATE units SET status = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                         "WHERE id = ?", (owner, now + self.lease_seconds, record[0]))
+        return WorkUnit(record[0], json.loads(record[1]), record[2] + 1)
+
+    def renew(self, unit_id: int, owner: str) -> bool:
+        """Extend a lease still held by owner"""
+        with self._write() as conn:
+            cursor = conn.execute("UPDATE units SET lease_expires = ? WHERE id = ? AND owner = ? AND status = 'leased'",
+                                  (time.time() + self.lease_seconds, unit_id, owner))
+        return cursor.rowcount == 1
+
+    def complete(self, unit_id: int, rows: List[Dict[str, Any]]) -> None:
+        """
+        Store a unit's rows and mark it done, or pending again when some rows
+        are errors and the unit has attempts left. Rows are keyed by symbol,
+        so a unit finished twice stores each row once, and an error row never
+        replaces a row that was not an error.
+        """
+        errors = [row['Symbol'] for row in rows if is_error_row(row)]
+        with self._write() as conn:
+            stored = {symbol: json.loads(row) for symbol, row in conn.execute(
+                "SELECT symbol, row FROM results WHERE unit_id = ?", (unit_id,))}
+            rows = [row for row in rows
+                    if not (is_error_row(row) and row['Symbol'] in stored and not is_error_row(stored[row['Symbol']]))]
+            conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                             [(row['Symbol'], unit_id, json.dumps(row)) for row in rows])
+            if errors:
+                conn.execute("UPDATE units SET status = CASE WHEN attempts >= ? THEN 'done' ELSE 'pending' END, "
+                             "owner = NULL, lease_expires = NULL, error = ? WHERE id = ?",
+                             (self.max_attempts, f"{len(errors)} tickers errored: {', '.join(errors[:5])}", unit_id))
+            else:
+                conn.execute("UPDATE units SET status = 'done', owner = NULL, lease_expires = NULL, error = NULL "
+                             "WHERE id = ?", (unit_id,))
+
+    def fail(self, unit_id: int, owner: str, error: str) -> None:
+        """Release a unit for retry, or mark it failed once out of attempts"""
+        with self._write() as conn:
+            conn.execute("UPDATE units SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                         "owner = NULL, lease_expires = NULL, error = ? WHERE id = ? AND owner = ?",
+                         (self.max_attempts, error, unit_id, owner))
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            records = self._conn.execute("SELECT status, COUNT(*) FROM units GROUP BY status").fetchall()
+        return {status: count for status, count in records}
+
+    def is_finished(self) -> bool:
+        counts = self.counts()
+        return not counts.get('pending') and not counts.get('leased')
+
+    def results(self, symbols: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Merged rows of every finished unit.
+
+        Args:
+            symbols (List[str]): Order the table by these symbols; symbols
+                whose unit failed get an 'Error/No Data' row
+        """
+        with self._lock:
+            records = self._conn.execute("SELECT symbol, row FROM results").fetchall()
+        rows = {symbol: json.loads(row) for symbol, row in records}
+        if symbols is not None:
+            rows = {symbol: rows.get(symbol, {'Symbol': symbol, '4Y_Geometric_Avg_ROIC': None,
+                                              'Status': 'Error/No Data', 'PB_Ratio': None})
+                    for symbol in symbols}
+        return pd.DataFrame(list(rows.values()))
+
+
+class LeaseHeartbeat:
+    """Renew a unit's lease in the background while the unit is screened"""
+
+    def __init__(self, queue: JobQueue, unit_id: int, owner: str):
+        self.queue = queue
+        self.unit_id = unit_id
+        self.owner = owner
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            if not self.queue.renew(self.unit_id, self.owner):
+                logger.warning(f"Lost the lease on unit {self.unit_id}")
+                return
+
+    def __enter__(self) -> 'LeaseHeartbeat':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(queue_path: str, workers: int = 8, calls_per_second: Optional[float] = None,
+               retries: int = 3, cache_path: Optional[str] = None, offline: bool = False,
+               lease_seconds: float = DEFAULT_LEASE_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+               owner: Optional[str] = None, poll_seconds: float = POLL_SECONDS) -> int:
+    """
+    Claim and screen units until none are pending or leased.
+
+    While other workers still hold leases this worker keeps polling, so it
+    can pick up a unit whose worker died. Takes paths rather than open
+    objects so it can run in a fresh process or on another host.
+
+    Returns:
+        int: Number of units this worker completed
+    """
+    owner = owner or default_owner()
+    queue = JobQueue(queue_path, lease_seconds, max_attempts)
+    cache = FundamentalsCache(cache_path, offline=offline) if cache_path else None
+    limiter = RateLimiter(calls_per_second, burst=workers)
+    completed = 0
+    try:
+        while True:
+            unit = queue.claim(owner)
+            if unit is None:
+                if queue.is_finished():
+                    return completed
+                time.sleep(poll_seconds)
+                continue
+            logger.info(f"{owner} screening unit {unit.id} ({len(unit.symbols)} symbols, attempt {unit.attempts})")
+            try:
+                with LeaseHeartbeat(queue, unit.id, owner):
+                    df = screen_symbols(unit.symbols, workers, limiter, retries, cache)
+            except Exception as e:
+                logger.warning(f"Unit {unit.id} failed on {owner}: {e}")
+                queue.fail(unit.id, owner, str(e))
+                continue
+            queue.complete(unit.id, df.astype(object).where(df.notna(), None).to_dict('records'))
+            completed += 1
+    finally:
+        queue.close()
+        if cache is not None:
+            cache.close()
+
+
+def run_local_worker(*args: Any) -> Tuple[int, metrics.MetricsState]:
+    """run_worker in a pool process, returning its metrics for the parent to merge"""
+    metrics.reset()
+    metrics.enable()
+    return run_worker(*args), metrics.export_state()
+
+
+def run_sharded_screen(symbols: List[str], processes: int = 4, queue_path: Optional[str] = None,
+                       unit_size: int = DEFAULT_UNIT_SIZE, workers: int = 8,
+                       calls_per_second: Optional[float] = None, retries: int = 3,
+                       cache: Optional[FundamentalsCache] = None,
+                       lease_seconds: float = DEFAULT_LEASE_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                       poll_seconds: float = POLL_SECONDS) -> pd.DataFrame:
+    """
+    Screen symbols across local worker processes and merge their rows.
+
+    Args:
+        symbols (List[str]): Ticker symbols to analyze
+        processes (int): Local worker processes; 0 only enqueues and waits
+            for workers started elsewhere with `main.py worker`
+        queue_path (str): Queue file, defaults to
+            src/report/jobs_YYYYMMDD_<hash of symbols>.sqlite
+        unit_size (int): Symbols per work unit
+        workers (int): Fetch threads per process
+        calls_per_second (float): Remote call budget for this host, split
+            evenly across its processes
+        cache (FundamentalsCache): Each process opens its own connection to
+            this cache's file
+
+    Returns:
+        pd.DataFrame: Same table as screen_symbols, in symbols order
+    """
+    queue = JobQueue(queue_path or default_queue_path(symbols=symbols), lease_seconds, max_attempts)
+    added = queue.enqueue(symbols, unit_size)
+    logger.info(f"Queue {queue.path}: {added} units added, status {queue.counts()}")
+
+    per_process_rate = calls_per_second / processes if calls_per_second and processes else calls_per_second
+    cache_path = cache.path if cache is not None else None
+    offline = cache.offline if cache is not None else False
+    if processes:
+        target = run_local_worker if metrics.is_enabled() else run_worker
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(target, queue.path, workers, per_process_rate, retries, cache_path, offline,
+                                   lease_seconds, max_attempts, f'{default_owner()}/{i}', poll_seconds)
+                       for i in range(processes)]
+            completed = [future.result() for future in futures]
+        if target is run_local_worker:
+            for _, state in completed:
+                metrics.merge_state(state)
+            completed = [count for count, _ in completed]
+        logger.info(f"Units completed per process: {completed}")
+    while not queue.is_finished():
+        time.sleep(poll_seconds)
+
+    counts = queue.counts()
+    if counts.get('failed'):
+        logger.warning(f"{counts['failed']} units failed after {max_attempts} attempts")
+    df = queue.results(symbols)
+    queue.close()
+    return df
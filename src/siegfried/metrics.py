@@ -0,0 +1,199 @@
+"""
+Run instrumentation: stage timers, counters and latency histograms
+
+Instrumentation is off by default and every hook returns immediately, so
+the pipeline pays one flag check per call. Once enabled, counters and
+histograms are kept in process and dumped at the end of a run as a JSON
+summary and a Prometheus text exposition file.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+PREFIX = 'siegfried'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+MetricsState = Tuple[Dict[str, Dict[LabelKey, float]], Dict[str, List[float]], Dict[str, Dict[LabelKey, List[float]]]]
+
+_enabled = False
+_lock = threading.Lock()
+_counters: Dict[str, Dict[LabelKey, float]] = {}
+_stages: Dict[str, List[float]] = {}
+_histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+_NULL_TIMER = nullcontext()
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _stages.clear()
+        _histograms.clear()
+
+
+def export_state() -> MetricsState:
+    """Picklable copy of the raw counters, stage timers and histograms"""
+    with _lock:
+        return ({name: dict(series) for name, series in _counters.items()},
+                {stage: list(totals) for stage, totals in _stages.items()},
+                {name: {key: list(buckets) for key, buckets in series.items()} for name, series in _histograms.items()})
+
+
+def merge_state(state: MetricsState) -> None:
+    """Add another process's export_state() into this one's metrics"""
+    counters, stages, histograms = state
+    with _lock:
+        for name, series in counters.items():
+            merged = _counters.setdefault(name, {})
+            for key, value in series.items():
+                merged[key] = merged.get(key, 0) + value
+        for stage, (total, count) in stages.items():
+            totals = _stages.setdefault(stage, [0.0, 0])
+            totals[0] += total
+            totals[1] += count
+        for name, series in histograms.items():
+            merged = _histograms.setdefault(name, {})
+            for key, buckets in series.items():
+                current = merged.setdefault(key, [0.0] * len(buckets))
+                merged[key] = [a + b for a, b in zip(current, buckets)]
+
+
+def label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def increment(name: str, value: float = 1, **labels: Any) -> None:
+    """Add to a counter, e.g. increment('remote_calls_total', kind='info')"""
+    if not _enabled:
+        return
+    key = label_key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    """Record one sample in a latency histogram"""
+    if not _enabled:
+        return
+    key = label_key(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        buckets = series.setdefault(key, [0.0] * (len(LATENCY_BUCKETS) + 3))
+        buckets[bisect_left(LATENCY_BUCKETS, value)] += 1
+        buckets[-2] += value
+        buckets[-1] += 1
+
+
+@contextmanager
+def _timed_stage(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            totals = _stages.setdefault(stage, [0.0, 0])
+            totals[0] += elapsed
+            totals[1] += 1
+
+
+def timer(stage: str):
+    """Context manager accumulating wall time for a pipeline stage"""
+    if not _enabled:
+        return _NULL_TIMER
+    return _timed_stage(stage)
+
+
+def format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(key) + sorted((extra or {}).items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+def cache_hit_ratio() -> Optional[float]:
+    series = _counters.get('cache_requests_total', {})
+    hits = sum(v for k, v in series.items() if ('result', 'hit') in k)
+    total = sum(series.values())
+    return hits / total if total else None
+
+
+def summary() -> Dict[str, Any]:
+    """JSON-ready snapshot of everything recorded so far"""
+    with _lock:
+        histograms = {}
+        for name, series in _histograms.items():
+            histograms[name] = [{
+                'labels': dict(key),
+                'count': int(buckets[-1]),
+                'sum': buckets[-2],
+                'mean': buckets[-2] / buckets[-1] if buckets[-1] else None,
+                'buckets': {str(le): int(sum(buckets[:i + 1])) for i, le in enumerate(LATENCY_BUCKETS)},
+            } for key, buckets in series.items()]
+        return {
+            'stages': {stage: {'seconds': total, 'count': int(count)} for stage, (total, count) in _stages.items()},
+            'counters': {name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                         for name, series in _counters.items()},
+            'histograms': histograms,
+            'cache_hit_ratio': cache_hit_ratio(),
+        }
+
+
+def to_prometheus() -> str:
+    """Prometheus text exposition of all metrics"""
+    lines = []
+    with _lock:
+        lines.append(f'# TYPE {PREFIX}_stage_seconds_total counter')
+        for stage, (total, _) in _stages.items():
+            lines.append(f'{PREFIX}_stage_seconds_total{{stage="{stage}"}} {total}')
+        for name, series in _counters.items():
+            lines.append(f'# TYPE {PREFIX}_{name} counter')
+            for key, value in series.items():
+                lines.append(f'{PREFIX}_{name}{format_labels(key)} {value}')
+        for name, series in _histograms.items():
+            lines.append(f'# TYPE {PREFIX}_{name} histogram')
+            for key, buckets in series.items():
+                cumulative = 0
+                for i, le in enumerate(LATENCY_BUCKETS):
+                    cumulative += buckets[i]
+                    lines.append(f'{PREFIX}_{name}_bucket{format_labels(key, {"le": str(le)})} {int(cumulative)}')
+                lines.append(f'{PREFIX}_{name}_bucket{format_labels(key, {"le": "+Inf"})} {int(buckets[-1])}')
+                lines.append(f'{PREFIX}_{name}_sum{format_labels(key)} {buckets[-2]}')
+                lines.append(f'{PREFIX}_{name}_count{format_labels(key)} {int(buckets[-1])}')
+    ratio = cache_hit_ratio()
+    if ratio is not None:
+        lines.append(f'# TYPE {PREFIX}_cache_hit_ratio gauge')
+        lines.append(f'{PREFIX}_cache_hit_ratio {ratio}')
+    return '\n'.join(lines) + '\n'
+
+
+def dump(directory: str, name: str = 'metrics') -> Tuple[str, str]:
+    """Write <name>.json and <name>.prom into directory"""
+    os.makedirs(directory, exist_ok=True)
+    json_path = os.path.join(directory, f'{name}.json')
+    prom_path = os.path.join(directory, f'{name}.prom')
+    with open(json_path, 'w') as f:
+        json.dump(summary(), f, indent=2)
+    with open(prom_path, 'w') as f:
+        f.write(to_prometheus())
+    return json_path, prom_path
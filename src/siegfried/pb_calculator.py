@@ -1,4 +1,7 @@
-import yfinance as yf
+from typing import Optional
+from src.siegfried import metrics
+from src.siegfried.fetch_engine import is_rate_limited
+from src.siegfried.ticker_snapshot import TickerSnapshot
 
 def calculate_manually_using_bookvalue(info, cr_prc):
     book_value = info.get('bookValue')
@@ -11,28 +14,31 @@ def calculate_manually_using_bookvalue(info, cr_prc):
     else:
         return None    
 
-def calculate_pb(symbol):
+def calculate_pb(symbol, snapshot: Optional[TickerSnapshot] = None):
     """
     Calculate the price-to-book ratio for a given stock symbol.
     
     Args:
         symbol (str): Stock ticker symbol
+        snapshot (TickerSnapshot): Optional snapshot shared with the ROIC stage
         
     Returns:
         float: Price-to-book ratio
         None: If data cannot be retrieved
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = snapshot or TickerSnapshot(symbol)
         info = ticker.info
         
         # Get current stock price
         current_price = info.get('currentPrice') or info.get('regularMarketPrice')
         if not current_price:
+            metrics.increment('pb_path_total', path='no_price')
             return None
             
         pb_ratio = info.get('priceToBook')
         if pb_ratio and pb_ratio > 0.01:
+            metrics.increment('pb_path_total', path='info')
             return pb_ratio
         
         # Fallback: Calculate from balance sheet data
@@ -47,13 +53,17 @@ def calculate_pb(symbol):
                     if latest_equity and shares_outstanding and shares_outstanding > 0:
                         book_value_per_share = latest_equity / shares_outstanding
                         if book_value_per_share > 0:
+                            metrics.increment('pb_path_total', path='quarterly_balance_sheet')
                             return current_price / book_value_per_share
         except Exception:
             pass  # Continue to next fallback
         
         pb_ratio = calculate_manually_using_bookvalue(info, current_price)
+        metrics.increment('pb_path_total', path='none')
         return None
             
     except Exception as e:
+        if is_rate_limited(e):
+            raise
         print(f"Error calculating P/B ratio for {symbol}: {e}")
         return None
\ No newline at end of file
@@ -0,0 +1,346 @@
+"""
+Daily price-to-book history for a whole universe
+
+Closing prices live in a ticker x business-day float64 matrix on disk that
+is opened as a numpy memmap, so 500+ tickers x 20 years stay out of the
+Python heap and are read a block of tickers at a time. Book value per
+share becomes usable a reporting lag after each period end. yfinance's
+quarterly balance sheets reach back only about five quarters, so on their
+own the history covers roughly the last 15 months whatever the length of
+the price matrix; pass an ingested SecFactsStore to add annual book values
+from the 10-K filings as far back as they go. PB_First_Date reports the
+coverage each ticker actually got. Each price is matched to the latest
+book value available on its date by one searchsorted over combined
+(ticker, day) keys, giving a daily P/B series per ticker without a Python
+loop over tickers or dates.
+
+Where today's P/B sits within that history (percentile and z-score) is the
+"cheap goods" signal, and is merged onto the screen result next to
+PB_Ratio.
+"""
+
+import json
+import logging
+import os
+from datetime import date, timedelta
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from src.siegfried.fetch_engine import RateLimiter, call_with_retry, imap_ordered, map_ordered
+from src.siegfried.fundamentals_cache import DEFAULT_CACHE_DIR, FundamentalsCache
+from src.siegfried.ticker_snapshot import TickerSnapshot
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRICE_DIR = os.path.join(DEFAULT_CACHE_DIR, 'prices')
+DEFAULT_YEARS = 20
+REPORTING_LAG = timedelta(days=45)
+ANNUAL_REPORTING_LAG = timedelta(days=90)
+BLOCK_TICKERS = 64
+
+EQUITY_ROWS = ('Common Stock Equity', 'Stockholders Equity')
+SHARE_ROWS = ('Ordinary Shares Number', 'Share Issued')
+
+PB_HISTORY_COLUMNS = ['Symbol', 'PB_Latest', 'PB_Percentile', 'PB_ZScore', 'PB_Median', 'PB_Observations',
+                      'PB_First_Date']
+
+
+class PriceMatrix:
+    """
+    Memory-mapped closing prices, one row per ticker, one column per
+    business day. Missing days are NaN.
+
+    Layout in directory: prices.f64 (raw row-major float64) and index.json
+    (symbols and the first and last business day).
+    """
+
+    def __init__(self, directory: str = DEFAULT_PRICE_DIR, mode: str = 'r'):
+        self.directory = directory
+        with open(os.path.join(directory, 'index.json')) as f:
+            index = json.load(f)
+        self.symbols: List[str] = index['symbols']
+        self.dates = pd.bdate_range(index['start'], index['end'])
+        self._rows = {symbol: row for row, symbol in enumerate(self.symbols)}
+        self.values = np.memmap(os.path.join(directory, 'prices.f64'), dtype=np.float64, mode=mode,
+                                shape=(len(self.symbols), len(self.dates)))
+
+    @classmethod
+    def create(cls, directory: str, symbols: List[str], start: date, end: date) -> 'PriceMatrix':
+        """Allocate an all-NaN matrix on disk and open it for writing"""
+        os.makedirs(directory, exist_ok=True)
+        dates = pd.bdate_range(start, end)
+        with open(os.path.join(directory, 'index.json'), 'w') as f:
+            json.dump({'symbols': list(symbols), 'start': dates[0].date().isoformat(),
+                       'end': dates[-1].date().isoformat()}, f)
+        values = np.memmap(os.path.join(directory, 'prices.f64'), dtype=np.float64, mode='w+',
+                           shape=(len(symbols), len(dates)))
+        values[:] = np.nan
+        values.flush()
+        del values
+        return cls(directory, mode='r+')
+
+    def row(self, symbol: str) -> int:
+        return self._rows[symbol]
+
+    def write(self, symbol: str, closes: pd.Series) -> None:
+        """Store one ticker's closes, aligned to the business-day axis"""
+        index = pd.DatetimeIndex(closes.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        aligned = pd.Series(closes.to_numpy(dtype=float), index=index.normalize()).reindex(self.dates)
+        self.values[self._rows[symbol]] = aligned.to_numpy()
+
+    def flush(self) -> None:
+        self.values.flush()
+
+
+def fetch_closes(symbol: str, start: date, adjusted: bool = False) -> pd.Series:
+    """
+    Daily closes. yfinance's Close is split-adjusted even without
+    auto_adjust, so these closes are on today's share count and only
+    dividend adjustment depends on adjusted; load_book_values restates book
+    value per share onto the same share count. Adjusted closes give total
+    returns.
+    """
+    history = TickerSnapshot(symbol).ticker.history(start=start.isoformat(), auto_adjust=adjusted)
+    return history['Close']
+
+
+def build_price_matrix(symbols: List[str], directory: str = DEFAULT_PRICE_DIR, years: int = DEFAULT_YEARS,
+                       workers: int = 1, limiter: Optional[RateLimiter] = None, retries: int = 3,
+                       adjusted: bool = False, start: Optional[date] = None, end: Optional[date] = None) -> PriceMatrix:
+    """
+    Download daily closes for every symbol into a new on-disk PriceMatrix.
+    Rows are written as each download completes, so at most the in-flight
+    tickers' series are held in memory.
+
+    Args:
+        adjusted (bool): Split and dividend adjusted closes instead of raw ones
+        start, end (date): Explicit span, e.g. to match another matrix;
+            defaults to the last years up to today
+    """
+    end = end or date.today()
+    start = start or end - timedelta(days=365 * years)
+    matrix = PriceMatrix.create(directory, symbols, start, end)
+
+    def fetch(symbol):
+        try:
+            return symbol, call_with_retry(fetch_closes, symbol, start, adjusted, limiter=limiter, retries=retries)
+        except Exception as e:
+            logger.warning(f"Failed to fetch price history for {symbol}: {e}")
+            return symbol, None
+
+    for symbol, closes in imap_ordered(fetch, symbols, workers):
+        if closes is not None and len(closes):
+            matrix.write(symbol, closes)
+    matrix.flush()
+    return matrix
+
+
+def split_factors(splits: Optional[pd.Series], periods: Sequence) -> np.ndarray:
+    """Product of the split ratios with an ex-date after each period, 1 where none"""
+    if splits is None or not len(splits):
+        return np.ones(len(periods))
+    days = pd.DatetimeIndex(splits.index)
+    if days.tz is not None:
+        days = days.tz_localize(None)
+    ratios = splits.to_numpy(dtype=float)
+    valid = ratios > 0
+    order = np.argsort(days[valid].values)
+    days, ratios = days[valid].values[order], ratios[valid][order]
+    after = np.append(np.cumprod(ratios[::-1])[::-1], 1.0)
+    return after[np.searchsorted(days, pd.DatetimeIndex(periods).values, side='right')]
+
+
+def book_value_rows(symbol: str, balance_sheet: pd.DataFrame, lag: timedelta = REPORTING_LAG,
+                    splits: Optional[pd.Series] = None) -> List[dict]:
+    """
+    Book value per share per quarter, dated when it became public. Shares
+    as reported then are restated for later splits, matching yfinance's
+    split-adjusted closes.
+    """
+    equity_row = next((row for row in EQUITY_ROWS if row in balance_sheet.index), None)
+    share_row = next((row for row in SHARE_ROWS if row in balance_sheet.index), None)
+    if balance_sheet.empty or equity_row is None or share_row is None:
+        return []
+    equity = balance_sheet.loc[equity_row].to_numpy(dtype=float)
+    shares = balance_sheet.loc[share_row].to_numpy(dtype=float) * split_factors(splits, balance_sheet.columns)
+    return [{'Symbol': symbol, 'Available_Date': pd.Timestamp(period) + lag, 'Book_Value_Per_Share': e / n}
+            for period, e, n in zip(balance_sheet.columns, equity, shares)
+            if not np.isnan(e) and n > 0]
+
+
+def load_book_values(symbols: List[str], workers: int = 1, cache: Optional[FundamentalsCache] = None,
+                     lag: timedelta = REPORTING_LAG, sec_store: Optional[Any] = None,
+                     annual_lag: timedelta = ANNUAL_REPORTING_LAG) -> pd.DataFrame:
+    """
+    Book value per share for every symbol as one long table.
+
+    Args:
+        sec_store (SecFactsStore): Optional; adds annual book values from
+            10-K filings, dated annual_lag after the fiscal year end.
+            Without it only yfinance's last ~5 quarters are available.
+
+    Book values per share are restated for splits after each period, so
+    they divide yfinance's split-adjusted closes.
+
+    Returns:
+        pd.DataFrame: Symbol, Available_Date, Book_Value_Per_Share, oldest
+        first per symbol
+    """
+    def fetch(symbol):
+        snapshot = TickerSnapshot(symbol, cache)
+        try:
+            splits = snapshot.splits
+        except Exception as e:
+            logger.warning(f"Failed to load splits for {symbol}, book values are not split-adjusted: {e}")
+            splits = None
+        rows = []
+        if sec_store is not None and symbol in sec_store:
+            rows += book_value_rows(symbol, sec_store.snapshot(symbol).balance_sheet, annual_lag, splits)
+        try:
+            rows += book_value_rows(symbol, snapshot.quarterly_balance_sheet, lag, splits)
+        except Exception as e:
+            logger.warning(f"Failed to load quarterly book value for {symbol}: {e}")
+        return rows
+
+    rows = [row for rows in map_ordered(fetch, symbols, workers) for row in rows]
+    book = pd.DataFrame(rows, columns=['Symbol', 'Available_Date', 'Book_Value_Per_Share'])
+    return book.sort_values(['Symbol', 'Available_Date'], kind='stable').reset_index(drop=True)
+
+
+def day_numbers(values) -> np.ndarray:
+    """Dates as integer days since the epoch"""
+    return pd.DatetimeIndex(values).values.astype('datetime64[D]').astype(np.int64)
+
+
+class BookValueIndex:
+    """
+    Book values sorted by the combined key ticker_row * stride + day, so
+    the as-of lookup for any block of (ticker, day) cells is a single
+    searchsorted.
+    """
+
+    def __init__(self, book: pd.DataFrame, symbols: List[str], dates: pd.DatetimeIndex):
+        rows = pd.Series(range(len(symbols)), index=symbols).reindex(book['Symbol']).to_numpy()
+        known = ~np.isnan(rows)
+        rows = rows[known].astype(np.int64)
+        book_days = day_numbers(book['Available_Date'])[known]
+        price_days = day_numbers(dates)
+        first_day = min(price_days[0], book_days.min()) if len(book_days) else price_days[0]
+        last_day = max(price_days[-1], book_days.max()) if len(book_days) else price_days[-1]
+        self.stride = int(last_day - first_day + 1)
+
+        keys = rows * self.stride + (book_days - first_day)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.rows = rows[order]
+        self.values = book['Book_Value_Per_Share'].to_numpy(dtype=float)[known][order]
+        self.days = price_days - first_day
+
+    def asof(self, first_row: int, last_row: int) -> np.ndarray:
+        """Latest book value per share known on each day, for a block of tickers"""
+        block_rows = np.arange(first_row, last_row, dtype=np.int64)
+        if not len(self.keys):
+            return np.full((len(block_rows), len(self.days)), np.nan)
+        cell_keys = (block_rows[:, None] * self.stride + self.days[None, :]).ravel()
+        match = np.searchsorted(self.keys, cell_keys, side='right') - 1
+        safe = np.clip(match, 0, None)
+        same_ticker = (match >= 0) & (self.rows[safe] == np.repeat(block_rows, len(self.days)))
+        result = np.where(same_ticker, self.values[safe], np.nan)
+        return result.reshape(len(block_rows), len(self.days))
+
+
+def pb_block(prices: np.ndarray, book_per_share: np.ndarray) -> np.ndarray:
+    """Daily P/B; days without a price or with non-positive book value are NaN"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(book_per_share > 0, prices / book_per_share, np.nan)
+
+
+def history_stats(pb: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """
+    Per-row latest P/B and where it sits within the row's own history.
+
+    Returns:
+        latest, percentile (0-100, share of days at or below latest),
+        z-score, median, observation count and the position of the first
+        observation; NaN where a row has no data
+    """
+    present = ~np.isnan(pb)
+    counts = present.sum(axis=1)
+    first = np.where(counts > 0, np.argmax(present, axis=1), np.nan)
+    last = pb.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)
+    latest = np.where(counts > 0, pb[np.arange(len(pb)), last], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentile = 100.0 * (pb <= latest[:, None]).sum(axis=1) / counts
+        filled = np.where(present, pb, 0.0)
+        mean = filled.sum(axis=1) / counts
+        std = np.sqrt(np.where(present, (pb - mean[:, None]) ** 2, 0.0).sum(axis=1) / counts)
+        zscore = np.where(std > 0, (latest - mean) / std, np.nan)
+    median = np.full(len(pb), np.nan)
+    has_data = counts > 0
+    if has_data.any():
+        median[has_data] = np.nanmedian(pb[has_data], axis=1)
+    return latest, np.where(counts > 0, percentile, np.nan), zscore, median, counts, first
+
+
+def pb_history(matrix: PriceMatrix, book: pd.DataFrame, symbols: Optional[List[str]] = None,
+               block: int = BLOCK_TICKERS) -> pd.DataFrame:
+    """
+    P/B history statistics for every ticker in the price matrix.
+
+    Args:
+        matrix (PriceMatrix): Daily closes
+        book (pd.DataFrame): Symbol, Available_Date, Book_Value_Per_Share
+        symbols (List[str]): Restrict and order the output; defaults to all
+        block (int): Tickers per block read from the memmap
+
+    Returns:
+        pd.DataFrame: PB_HISTORY_COLUMNS, one row per symbol. The statistics
+        cover PB_First_Date onwards, which is bounded by the oldest book
+        value, not by the price history
+    """
+    index = BookValueIndex(book, matrix.symbols, matrix.dates)
+    parts = []
+    for first_row in range(0, len(matrix.symbols), block):
+        last_row = min(first_row + block, len(matrix.symbols))
+        pb = pb_block(np.asarray(matrix.values[first_row:last_row]), index.asof(first_row, last_row))
+        parts.append(np.column_stack(history_stats(pb)))
+
+    stats = np.vstack(parts) if parts else np.empty((0, len(PB_HISTORY_COLUMNS) - 1))
+    result = pd.DataFrame(stats, columns=PB_HISTORY_COLUMNS[1:])
+    result.insert(0, 'Symbol', matrix.symbols)
+    result['PB_Observations'] = result['PB_Observations'].astype(int)
+    first = result['PB_First_Date'].to_numpy()
+    result['PB_First_Date'] = pd.NaT
+    has_data = ~np.isnan(first)
+    result.loc[has_data, 'PB_First_Date'] = matrix.dates[first[has_data].astype(np.int64)]
+    result['PB_First_Date'] = pd.to_datetime(result['PB_First_Date'])
+    covered = result['PB_First_Date'].dropna()
+    if len(covered):
+        years = ((matrix.dates[-1] - covered).dt.days / 365.25).median()
+        if years < 2:
+            logger.warning(f"P/B history covers a median of {years:.1f} years per ticker; book values reach "
+                           f"back only that far (pass an SEC store for annual book values)")
+    if symbols is not None:
+        result = pd.DataFrame({'Symbol': symbols}).merge(result, on='Symbol', how='left')
+    return result
+
+
+def daily_pb(matrix: PriceMatrix, book: pd.DataFrame, symbol: str) -> pd.Series:
+    """The full daily P/B series for one ticker"""
+    index = BookValueIndex(book, matrix.symbols, matrix.dates)
+    row = matrix.row(symbol)
+    pb = pb_block(np.asarray(matrix.values[row:row + 1]), index.asof(row, row + 1))[0]
+    return pd.Series(pb, index=matrix.dates, name=symbol).dropna()
+
+
+def attach_pb_history(results_df: pd.DataFrame, history: pd.DataFrame) -> pd.DataFrame:
+    """Add the P/B history columns next to PB_Ratio, keeping row order"""
+    merged = results_df.merge(history, on='Symbol', how='left')
+    columns = list(results_df.columns)
+    insert_at = columns.index('PB_Ratio') + 1 if 'PB_Ratio' in columns else len(columns)
+    new_columns = [column for column in PB_HISTORY_COLUMNS[1:] if column not in columns]
+    return merged[columns[:insert_at] + new_columns + columns[insert_at:]]
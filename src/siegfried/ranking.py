@@ -0,0 +1,203 @@
+"""
+Pareto layers, composite scores and top-N selection over a screen table
+
+sort_by_pb_and_roic orders by P/B and only uses ROIC to break exact P/B
+ties, which almost never happen. The functions here rank on both at once:
+
+    pareto_layers    layer 0 holds the names no other name beats on both
+                     low P/B and high ROIC; layer 1 is the frontier once
+                     layer 0 is removed, and so on. One sort plus a binary
+                     search per name, O(n log n).
+    composite_score  weighted sum of percentile ranks; a negative weight
+                     means lower is better
+    top_n            argpartition selection, O(n + k log k)
+    sector_top_n     top n within each sector by heap selection
+
+RankingIndex sorts a table once per ordering and then answers threshold
+queries (max P/B, min ROIC, top n) from prefixes of those orderings
+without sorting again.
+"""
+
+import logging
+from bisect import bisect_right
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from src.siegfried.fetch_engine import map_ordered
+from src.siegfried.fundamentals_cache import FundamentalsCache
+from src.siegfried.ticker_snapshot import TickerSnapshot
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PB_COLUMN = 'PB_Ratio'
+ROIC_COLUMN = '4Y_Geometric_Avg_ROIC'
+DEFAULT_WEIGHTS = {PB_COLUMN: -1.0, ROIC_COLUMN: 1.0}
+UNKNOWN_SECTOR = 'Unknown'
+ORDERS = ('pb', 'roic', 'pareto', 'score')
+
+
+def pareto_layers(pb: np.ndarray, roic: np.ndarray) -> np.ndarray:
+    """
+    Skyline layer of every name for low P/B and high ROIC.
+
+    Names are visited by P/B ascending, ROIC descending. Within a layer,
+    ROIC rises with P/B, so each layer is summarised by its last ROIC, and
+    those tails fall from one layer to the next. A name joins the first
+    layer whose tail it beats, found by binary search. Identical points
+    share a layer.
+
+    Returns:
+        np.ndarray: Layer per name, 0 for the frontier, -1 where P/B or
+        ROIC is missing
+    """
+    pb = np.asarray(pb, dtype=float)
+    roic = np.asarray(roic, dtype=float)
+    layers = np.full(len(pb), -1, dtype=np.int64)
+    valid = np.flatnonzero(np.isfinite(pb) & np.isfinite(roic))
+    order = valid[np.lexsort((-roic[valid], pb[valid]))]
+
+    negated_tails: List[float] = []
+    tail_points: List[tuple] = []
+    for i in order:
+        point = (pb[i], roic[i])
+        layer = bisect_right(negated_tails, -roic[i])
+        if layer > 0 and tail_points[layer - 1] == point:
+            layer -= 1
+        elif layer == len(negated_tails):
+            negated_tails.append(-roic[i])
+            tail_points.append(point)
+        else:
+            negated_tails[layer] = -roic[i]
+            tail_points[layer] = point
+        layers[i] = layer
+    return layers
+
+
+def composite_score(df: pd.DataFrame, weights: Optional[Dict[str, float]] = None) -> pd.Series:
+    """
+    Weighted sum of percentile ranks, normalised by the total weight.
+
+    Args:
+        weights (Dict[str, float]): Column -> weight. Negative weights rank
+            the column ascending (lower is better)
+
+    Returns:
+        pd.Series: Score in [0, 1] with ranks taken among the rows that have
+        every weighted column, NaN for the others
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    total = sum(abs(weight) for weight in weights.values())
+    values = df[list(weights)].apply(pd.to_numeric, errors='coerce')
+    complete = values.notna().all(axis=1)
+    score = pd.Series(0.0, index=df.index[complete])
+    for column, weight in weights.items():
+        score += abs(weight) * values.loc[complete, column].rank(pct=True, ascending=weight > 0)
+    return (score / total).reindex(df.index)
+
+
+def top_n(values: np.ndarray, n: int, ascending: bool = False) -> np.ndarray:
+    """Positions of the n best finite values, best first"""
+    values = np.asarray(values, dtype=float)
+    finite = np.flatnonzero(np.isfinite(values))
+    keys = values[finite] if ascending else -values[finite]
+    if n < len(finite):
+        chosen = np.argpartition(keys, n)[:n]
+        finite, keys = finite[chosen], keys[chosen]
+    return finite[np.argsort(keys, kind='stable')]
+
+
+def sector_top_n(df: pd.DataFrame, column: str, n: int, sector_column: str = 'Sector',
+                 ascending: bool = False) -> pd.DataFrame:
+    """The n best rows per sector on column, sectors in name order"""
+    values = pd.to_numeric(df[column], errors='coerce')
+    grouped = values.groupby(df[sector_column].fillna(UNKNOWN_SECTOR), sort=True)
+    chosen = grouped.nsmallest(n) if ascending else grouped.nlargest(n)
+    return df.loc[chosen.index.get_level_values(-1)]
+
+
+def load_sectors(symbols: List[str], workers: int = 1, cache: Optional[FundamentalsCache] = None) -> Dict[str, str]:
+    """Sector per symbol from info['sector']"""
+    def fetch(symbol):
+        try:
+            return symbol, TickerSnapshot(symbol, cache).info.get('sector') or UNKNOWN_SECTOR
+        except Exception as e:
+            logger.warning(f"Failed to load sector for {symbol}: {e}")
+            return symbol, UNKNOWN_SECTOR
+
+    return dict(map_ordered(fetch, symbols, workers))
+
+
+def add_rankings(df: pd.DataFrame, weights: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """Copy of df with Pareto_Layer and Composite_Score columns"""
+    ranked = df.copy()
+    ranked['Pareto_Layer'] = pareto_layers(pd.to_numeric(df[PB_COLUMN], errors='coerce').to_numpy(),
+                                           pd.to_numeric(df[ROIC_COLUMN], errors='coerce').to_numpy())
+    ranked['Composite_Score'] = composite_score(df, weights)
+    return ranked
+
+
+class RankingIndex:
+    """
+    A screen table sorted once per ordering for repeated threshold queries.
+
+    Orders:
+        pb      P/B ascending, then ROIC descending (sort_by_pb_and_roic)
+        roic    ROIC descending, then P/B ascending
+        pareto  Pareto layer, then P/B ascending
+        score   composite score descending
+    """
+
+    def __init__(self, df: pd.DataFrame, weights: Optional[Dict[str, float]] = None):
+        self.df = add_rankings(df.reset_index(drop=True), weights)
+        self.pb = pd.to_numeric(self.df[PB_COLUMN], errors='coerce').to_numpy()
+        self.roic = pd.to_numeric(self.df[ROIC_COLUMN], errors='coerce').to_numpy()
+        layers = self.df['Pareto_Layer'].to_numpy()
+        score = self.df['Composite_Score'].to_numpy()
+        self.orders = {
+            'pb': np.lexsort((-self.roic, self.pb)),
+            'roic': np.lexsort((self.pb, -self.roic)),
+            'pareto': np.lexsort((self.pb, np.where(layers < 0, np.iinfo(np.int64).max, layers))),
+            'score': np.lexsort((-score,)),
+        }
+        # Sorted keys for the prefix searches; NaN sorts last in both
+        self.sorted_pb = self.pb[self.orders['pb']]
+        self.sorted_negated_roic = -self.roic[self.orders['roic']]
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def positions(self, max_pb: Optional[float] = None, min_roic: Optional[float] = None,
+                  n: Optional[int] = None, order: str = 'pb') -> np.ndarray:
+        """
+        Row positions meeting P/B <= max_pb and ROIC > min_roic, in order.
+
+        Raises:
+            ValueError: For an unknown order
+        """
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order {order!r}, expected one of {ORDERS}")
+        positions = self.orders[order]
+        if order == 'pb' and max_pb is not None:
+            positions = positions[:np.searchsorted(self.sorted_pb, max_pb, side='right')]
+            max_pb = None
+        elif order == 'roic' and min_roic is not None:
+            positions = positions[:np.searchsorted(self.sorted_negated_roic, -min_roic, side='left')]
+            min_roic = None
+        mask = np.ones(len(positions), dtype=bool)
+        if max_pb is not None:
+            mask &= self.pb[positions] <= max_pb
+        if min_roic is not None:
+            mask &= self.roic[positions] > min_roic
+        positions = positions[mask] if not mask.all() else positions
+        return positions[:n] if n is not None else positions
+
+    def query(self, max_pb: Optional[float] = None, min_roic: Optional[float] = None,
+              n: Optional[int] = None, order: str = 'pb') -> pd.DataFrame:
+        return self.df.iloc[self.positions(max_pb, min_roic, n, order)]
+
+    def frontier(self, layer: int = 0) -> pd.DataFrame:
+        """Names on one Pareto layer, by P/B ascending"""
+        positions = self.orders['pareto']
+        return self.df.iloc[positions[self.df['Pareto_Layer'].to_numpy()[positions] == layer]]
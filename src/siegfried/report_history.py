@@ -0,0 +1,331 @@
+"""
+Date-partitioned columnar history of daily screen results
+
+Every screen writes one high_roic_company_YYYYMMDD.csv with ROIC also as a
+formatted percentage string, so questions across dates mean parsing every
+CSV again. This store keeps each run's typed table as one partition per
+date, with one .npy file per column:
+
+    history/
+        dictionary.json            symbols and statuses, append-only
+        date=2025-01-02/
+            symbol.npy             int32 codes into the symbol dictionary
+            status.npy             int32 codes into the status dictionary
+            category.npy           int8 codes into STATUS_CATEGORIES
+            rank.npy               int32 position in the P/B, ROIC ranking, 0 if unranked
+            roic.npy  pb.npy  years.npy    float32
+
+Error statuses carry the exception text, so their number grows without
+bound. The status dictionary is capped at max_statuses entries; past the
+cap a new status is stored as its category (Success, Insufficient Data or
+Error), which category.npy holds for every row anyway.
+
+Queries prune partitions by their directory date and load only the columns
+they project, memory-mapped, filtering symbols on the integer codes before
+decoding. A partition is written to a temporary directory and renamed into
+place, so readers never see half a day. There is one writer at a time.
+"""
+
+import glob
+import json
+import logging
+import os
+import re
+import shutil
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from src.siegfried.find_hidden_cheap_goods_in_rubbish import sort_by_pb_and_roic, status_category
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_DIR = os.path.join('src', 'report', 'history')
+# Table column -> (stored column, dtype)
+METRIC_COLUMNS = {'4Y_Geometric_Avg_ROIC': ('roic', np.float32), 'PB_Ratio': ('pb', np.float32),
+                  'Years_Available': ('years', np.float32)}
+OUTPUT_NAMES = {'status': 'Status', 'category': 'Status_Category', 'rank': 'Rank', 'roic': '4Y_Geometric_Avg_ROIC', 'pb': 'PB_Ratio',
+                'years': 'Years_Available'}
+STATUS_CATEGORIES = ['Success', 'Insufficient Data', 'Error']
+MAX_STATUSES = 4096
+PARTITION_PREFIX = 'date='
+REPORT_PATTERN = re.compile(r'high_roic_company_(\d{8})\.csv$')
+
+
+def parse_pct(value: Any) -> float:
+    """'12.34%' -> 0.1234; 'N/A', 'nan%', blanks and None -> NaN"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return np.nan
+    text = str(value).strip().rstrip('%')
+    try:
+        return float(text) / 100
+    except ValueError:
+        return np.nan
+
+
+def ranks(table: pd.DataFrame) -> np.ndarray:
+    """1-based rank of successful rows in sort_by_pb_and_roic order, 0 for the rest"""
+    result = np.zeros(len(table), dtype=np.int32)
+    success = table.reset_index(drop=True)
+    success = success[success['Status'] == 'Success']
+    order = sort_by_pb_and_roic(success).index.to_numpy()
+    result[order] = np.arange(1, len(order) + 1, dtype=np.int32)
+    return result
+
+
+class ReportHistory:
+    """
+    The partitioned history under one root directory.
+
+    Args:
+        max_statuses (int): Distinct statuses kept verbatim; later ones are
+            stored as their category
+    """
+
+    def __init__(self, root: str = DEFAULT_HISTORY_DIR, max_statuses: int = MAX_STATUSES):
+        self.root = root
+        self.max_statuses = max_statuses
+        os.makedirs(root, exist_ok=True)
+        self._dictionary_path = os.path.join(root, 'dictionary.json')
+        self._load_dictionary()
+
+    def _load_dictionary(self) -> None:
+        if os.path.exists(self._dictionary_path):
+            with open(self._dictionary_path) as f:
+                dictionary = json.load(f)
+        else:
+            dictionary = {'symbols': [], 'statuses': []}
+        self.symbols: List[str] = dictionary['symbols']
+        self.statuses: List[str] = dictionary['statuses']
+        self._symbol_codes = {symbol: code for code, symbol in enumerate(self.symbols)}
+        self._status_codes = {status: code for code, status in enumerate(self.statuses)}
+
+    def _encode(self, values: Sequence[str], entries: List[str], codes: Dict[str, int]) -> List[int]:
+        for value in values:
+            if value not in codes:
+                codes[value] = len(entries)
+                entries.append(value)
+        return [codes[value] for value in values]
+
+    def _encode_statuses(self, statuses: List[str]) -> np.ndarray:
+        """Codes into the status dictionary, new statuses past the cap as their category"""
+        codes = []
+        collapsed = set()
+        for status in statuses:
+            if status not in self._status_codes and len(self.statuses) >= self.max_statuses:
+                collapsed.add(status)
+                status = status_category(status)
+            codes.extend(self._encode([status], self.statuses, self._status_codes))
+        if collapsed:
+            logger.warning(f"Status dictionary is full at {self.max_statuses} entries, "
+                           f"{len(collapsed)} new statuses stored as their category")
+        return np.array(codes, dtype=np.int32)
+
+    def _status_categories(self) -> np.ndarray:
+        """Category code of every status dictionary entry"""
+        return np.array([STATUS_CATEGORIES.index(status_category(status)) for status in self.statuses],
+                        dtype=np.int8)
+
+    def _save_dictionary(self) -> None:
+        tmp_path = f"{self._dictionary_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'symbols': self.symbols, 'statuses': self.statuses}, f)
+        os.replace(tmp_path, self._dictionary_path)
+
+    def partition_path(self, run_date: date) -> str:
+        return os.path.join(self.root, f"{PARTITION_PREFIX}{run_date.isoformat()}")
+
+    def dates(self) -> List[date]:
+        """Dates with a partition, oldest first"""
+        names = [name[len(PARTITION_PREFIX):] for name in os.listdir(self.root) if name.startswith(PARTITION_PREFIX)]
+        return sorted(date.fromisoformat(name) for name in names if not name.endswith('.tmp'))
+
+    def append(self, table: pd.DataFrame, run_date: Optional[date] = None) -> str:
+        """
+        Store one run's result table as the partition for run_date,
+        replacing a partition already there.
+
+        Args:
+            table (pd.DataFrame): Symbol, Status, 4Y_Geometric_Avg_ROIC,
+                PB_Ratio, Years_Available, as main_roic_analysis returns
+
+        Returns:
+            str: Partition directory
+        """
+        run_date = run_date or date.today()
+        table = table.reset_index(drop=True)
+        columns = {
+            'symbol': np.array(self._encode(table['Symbol'].astype(str).tolist(), self.symbols, self._symbol_codes),
+                               dtype=np.int32),
+            'status': self._encode_statuses(table['Status'].astype(str).tolist()),
+            'category': np.array([STATUS_CATEGORIES.index(status_category(status))
+                                  for status in table['Status'].astype(str)], dtype=np.int8),
+            'rank': ranks(table),
+        }
+        for column, (name, dtype) in METRIC_COLUMNS.items():
+            columns[name] = pd.to_numeric(table[column], errors='coerce').to_numpy(dtype=dtype)
+        self._save_dictionary()
+
+        path = self.partition_path(run_date)
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name, values in columns.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        return path
+
+    def _partitions(self, start: Optional[date], end: Optional[date]) -> List[date]:
+        return [d for d in self.dates() if (start is None or d >= start) and (end is None or d <= end)]
+
+    def _load(self, run_date: date, name: str) -> np.ndarray:
+        path = os.path.join(self.partition_path(run_date), f"{name}.npy")
+        if name == 'category' and not os.path.exists(path):
+            # Partitions written before categories were stored
+            return self._status_categories()[np.asarray(self._load(run_date, 'status'), dtype=np.int32)]
+        return np.load(path, mmap_mode='r')
+
+    def scan(self, columns: Sequence[str] = ('rank', 'roic', 'pb'), start: Optional[date] = None,
+             end: Optional[date] = None, symbols: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Rows of every partition between start and end, inclusive.
+
+        Args:
+            columns: Stored columns to project, from status, category, rank,
+                roic, pb, years
+            symbols: Only these symbols
+
+        Returns:
+            pd.DataFrame: Date, Symbol (categorical) and the projected
+            columns under their table names; Rank is NaN for unranked rows
+        """
+        unknown = set(columns) - set(OUTPUT_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown columns {sorted(unknown)}, expected some of {tuple(OUTPUT_NAMES)}")
+        wanted = None
+        if symbols is not None:
+            wanted = np.array([self._symbol_codes[s] for s in symbols if s in self._symbol_codes], dtype=np.int32)
+
+        pieces: Dict[str, List[np.ndarray]] = {name: [] for name in ('date', 'symbol', *columns)}
+        for run_date in self._partitions(start, end):
+            codes = self._load(run_date, 'symbol')
+            rows = np.isin(codes, wanted) if wanted is not None else slice(None)
+            selected = np.asarray(codes[rows])
+            pieces['symbol'].append(selected)
+            pieces['date'].append(np.full(len(selected), np.datetime64(run_date, 'D')))
+            for name in columns:
+                pieces[name].append(np.asarray(self._load(run_date, name)[rows]))
+
+        merged = {name: (np.concatenate(parts) if parts else np.array([], dtype=np.int32))
+                  for name, parts in pieces.items()}
+        result = pd.DataFrame({
+            'Date': merged['date'].astype('datetime64[ns]'),
+            'Symbol': pd.Categorical.from_codes(merged['symbol'], categories=self.symbols),
+        })
+        for name in columns:
+            values = merged[name]
+            if name == 'status':
+                values = pd.Categorical.from_codes(values.astype(np.int32), categories=self.statuses)
+            elif name == 'category':
+                values = pd.Categorical.from_codes(values.astype(np.int8), categories=STATUS_CATEGORIES)
+            elif name == 'rank':
+                values = np.where(values > 0, values, np.nan).astype(np.float32)
+            result[OUTPUT_NAMES[name]] = values
+        return result
+
+    def series(self, symbol: str, columns: Sequence[str] = ('rank', 'roic', 'pb'),
+               start: Optional[date] = None, end: Optional[date] = None) -> pd.DataFrame:
+        """One symbol's history, indexed by date"""
+        return self.scan(columns, start, end, [symbol]).set_index('Date').drop(columns='Symbol')
+
+    def rank_drift(self, start: Optional[date] = None, end: Optional[date] = None,
+                   symbols: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        First and last ranked observation per symbol in the range.
+
+        Returns:
+            pd.DataFrame: Symbol, First_Date, First_Rank, Last_Date,
+            Last_Rank, Rank_Change (negative means moved up), ROIC_Change,
+            PB_Change, Best_Rank, Worst_Rank; sorted by Rank_Change
+        """
+        rows = self.scan(('rank', 'roic', 'pb'), start, end, symbols).dropna(subset=['Rank'])
+        rows['Symbol'] = rows['Symbol'].astype(str)
+        first = rows.drop_duplicates('Symbol', keep='first').set_index('Symbol')
+        last = rows.drop_duplicates('Symbol', keep='last').set_index('Symbol').loc[first.index]
+        grouped = rows.groupby('Symbol')['Rank']
+        drift = pd.DataFrame({
+            'First_Date': first['Date'], 'First_Rank': first['Rank'],
+            'Last_Date': last['Date'], 'Last_Rank': last['Rank'],
+            'Rank_Change': last['Rank'] - first['Rank'],
+            'ROIC_Change': last['4Y_Geometric_Avg_ROIC'] - first['4Y_Geometric_Avg_ROIC'],
+            'PB_Change': last['PB_Ratio'] - first['PB_Ratio'],
+            'Best_Rank': grouped.min(), 'Worst_Rank': grouped.max(),
+        })
+        return drift.rename_axis('Symbol').reset_index().sort_values('Rank_Change', kind='stable')
+
+    def top_n_changes(self, n: int, start: Optional[date] = None, end: Optional[date] = None) -> pd.DataFrame:
+        """
+        Names entering or leaving the top n between consecutive partitions.
+
+        Returns:
+            pd.DataFrame: Date, Symbol, Event ('entered' or 'exited') and
+            Rank on that date (NaN if the name was not ranked)
+        """
+        events: List[Dict[str, Any]] = []
+        previous = None
+        for run_date in self._partitions(start, end):
+            codes = np.asarray(self._load(run_date, 'symbol'))
+            rank = np.asarray(self._load(run_date, 'rank'))
+            current = set(codes[(rank > 0) & (rank <= n)].tolist())
+            if previous is not None:
+                rank_of = dict(zip(codes.tolist(), rank.tolist()))
+                for code, event in [(c, 'entered') for c in sorted(current - previous)] + \
+                                   [(c, 'exited') for c in sorted(previous - current)]:
+                    rank_on_date = rank_of.get(code, 0)
+                    events.append({'Date': pd.Timestamp(run_date), 'Symbol': self.symbols[code], 'Event': event,
+                                   'Rank': float(rank_on_date) if rank_on_date > 0 else np.nan})
+            previous = current
+        return pd.DataFrame(events, columns=['Date', 'Symbol', 'Event', 'Rank'])
+
+
+def read_report_csv(path: str) -> pd.DataFrame:
+    """A high_roic_company CSV as a typed result table"""
+    table = pd.read_csv(path, index_col=0)
+    roic = pd.Series(np.nan, index=table.index)
+    if '4Y_Geometric_Avg_ROIC' in table:
+        roic = pd.to_numeric(table['4Y_Geometric_Avg_ROIC'], errors='coerce')
+    if '4Y_Geometric_Avg_ROIC_Pct' in table:
+        roic = roic.fillna(table['4Y_Geometric_Avg_ROIC_Pct'].map(parse_pct))
+    table['4Y_Geometric_Avg_ROIC'] = roic
+    if 'Status' not in table:
+        table['Status'] = 'Success'
+    for column in ('PB_Ratio', 'Years_Available'):
+        table[column] = pd.to_numeric(table[column], errors='coerce') if column in table else np.nan
+    return table
+
+
+def import_csv_reports(history: ReportHistory, directory: str = os.path.join('src', 'report'),
+                       overwrite: bool = False) -> List[date]:
+    """
+    Load every high_roic_company_YYYYMMDD.csv under directory into the
+    history, skipping dates already stored unless overwrite.
+
+    Returns:
+        List[date]: Dates imported
+    """
+    existing = set(history.dates())
+    imported = []
+    for path in sorted(glob.glob(os.path.join(directory, 'high_roic_company_*.csv'))):
+        match = REPORT_PATTERN.search(os.path.basename(path))
+        if not match:
+            continue
+        run_date = datetime.strptime(match.group(1), '%Y%m%d').date()
+        if run_date in existing and not overwrite:
+            continue
+        history.append(read_report_csv(path), run_date)
+        imported.append(run_date)
+    logger.info(f"Imported {len(imported)} reports into {history.root}")
+    return imported
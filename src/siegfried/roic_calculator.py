@@ -1,14 +1,24 @@
-import yfinance as yf
-import matplotlib.pyplot as plt
-import numpy as np
 import logging
-from typing import Tuple, Dict, Any, List
+from typing import Tuple, Dict, Any, List, Optional
+from src.siegfried import metrics
+from src.siegfried.fetch_engine import is_rate_limited
+from src.siegfried.ticker_snapshot import TickerSnapshot
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def get_financial_statements(ticker: str) -> Tuple[Any, Any]:
-    stock = yf.Ticker(ticker)
+PLOT_FUNCTIONS = ('prepare_plot_data', 'create_main_plot', 'add_trend_line', 'create_statistical_subplot',
+                  'add_statistical_lines', 'log_summary_statistics', 'plot_roic_time_series')
+
+def __getattr__(name: str) -> Any:
+    """Plotting lives in roic_plot; load it (and matplotlib) only when asked for"""
+    if name in PLOT_FUNCTIONS:
+        from src.siegfried import roic_plot
+        return getattr(roic_plot, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def get_financial_statements(ticker: str, snapshot: Optional[TickerSnapshot] = None) -> Tuple[Any, Any]:
+    stock = snapshot or TickerSnapshot(ticker)
     balance_sheet = stock.balance_sheet
     income_statement = stock.financials
     return balance_sheet, income_statement
@@ -69,9 +79,9 @@ def derive_roic(nopat: float, invested_capital: float) -> float:
     else:
         return None
 
-def calculate_roic(ticker: str) -> dict:
+def calculate_roic(ticker: str, snapshot: Optional[TickerSnapshot] = None) -> dict:
     try:
-        balance_sheet, income_statement = get_financial_statements(ticker)
+        balance_sheet, income_statement = get_financial_statements(ticker, snapshot)
         
         if balance_sheet.empty or income_statement.empty:
             return {"ticker": ticker, "roic": None, "error": "No financial data available"}
@@ -98,77 +108,17 @@ def calculate_roic(ticker: str) -> dict:
         }
         
     except Exception as e:
+        if is_rate_limited(e):
+            raise
         return {"ticker": ticker, "roic": None, "error": str(e)}
 
-def prepare_plot_data(result: Dict[str, Any]) -> Tuple[List[int], List[float]]:
-    """Prepare and filter data for plotting"""
-    if 'error' in result or not result['roic_data']:
-        return [], []
-    
-    data = result['roic_data']
-    years_list = [d['year'].year for d in data]
-    roic_values = [d['roic'] * 100 if d['roic'] is not None else None for d in data]
-    
-    filtered_data = [(y, r) for y, r in zip(years_list, roic_values) if r is not None]
-    if not filtered_data:
-        return [], []
-    
-    years_clean, roic_clean = zip(*filtered_data)
-    return list(years_clean), list(roic_clean)
-
-def create_main_plot(ticker: str, years_clean: List[int], roic_clean: List[float]) -> None:
-    """Create the main ROIC time series plot"""
-    plt.subplot(2, 1, 1)
-    plt.plot(years_clean, roic_clean, 'bo-', linewidth=2, markersize=8, label='ROIC')
-    plt.title(f'{ticker} - Return on Invested Capital (ROIC) Time Series', fontsize=14, fontweight='bold')
-    plt.xlabel('Year')
-    plt.ylabel('ROIC (%)')
-    plt.grid(True, alpha=0.3)
-    plt.legend()
-
-def add_trend_line(years_clean: List[int], roic_clean: List[float]) -> None:
-    """Add trend line to the main plot"""
-    if len(years_clean) > 1:
-        z = np.polyfit(years_clean, roic_clean, 1)
-        p = np.poly1d(z)
-        plt.plot(years_clean, p(years_clean), "r--", alpha=0.7, label='Trend')
-        plt.legend()
-
-def create_statistical_subplot(years_clean: List[int], roic_clean: List[float]) -> None:
-    """Create the statistical analysis subplot"""
-    plt.subplot(2, 1, 2)
-    plt.bar(range(len(roic_clean)), roic_clean, alpha=0.7, color='skyblue')
-    plt.title('ROIC Distribution', fontsize=12)
-    plt.xlabel('Period')
-    plt.ylabel('ROIC (%)')
-    plt.xticks(range(len(years_clean)), years_clean)
-
-def add_statistical_lines(roic_clean: List[float]) -> Tuple[float, float]:
-    """Add statistical reference lines and return mean and std"""
-    mean_roic = np.mean(roic_clean)
-    std_roic = np.std(roic_clean)
-    plt.axhline(y=mean_roic, color='red', linestyle='--', alpha=0.7, label=f'Mean: {mean_roic:.2f}%')
-    plt.axhline(y=mean_roic + std_roic, color='orange', linestyle=':', alpha=0.5, label=f'+1σ: {mean_roic + std_roic:.2f}%')
-    plt.axhline(y=mean_roic - std_roic, color='orange', linestyle=':', alpha=0.5, label=f'-1σ: {mean_roic - std_roic:.2f}%')
-    plt.legend()
-    return mean_roic, std_roic
-
-def log_summary_statistics(ticker: str, roic_clean: List[float], mean_roic: float, std_roic: float) -> None:
-    """Log summary statistics for ROIC data"""
-    logger.info(f"\n{ticker} ROIC Summary Statistics:")
-    logger.info(f"Mean ROIC: {mean_roic:.2f}%")
-    logger.info(f"Standard Deviation: {std_roic:.2f}%")
-    logger.info(f"Volatility (CV): {(std_roic/abs(mean_roic)*100):.2f}%")
-    logger.info(f"Min ROIC: {min(roic_clean):.2f}%")
-    logger.info(f"Max ROIC: {max(roic_clean):.2f}%")
-    logger.info(f"Range: {max(roic_clean) - min(roic_clean):.2f}%")
-
-def calculate_roic_multi_year(ticker: str, years: int = 4) -> Dict[str, Any]:
+def calculate_roic_multi_year(ticker: str, years: int = 4, snapshot: Optional[TickerSnapshot] = None) -> Dict[str, Any]:
     """Calculate ROIC for multiple years"""
     try:
-        balance_sheet, income_statement = get_financial_statements(ticker)
+        balance_sheet, income_statement = get_financial_statements(ticker, snapshot)
         
         if balance_sheet.empty or income_statement.empty:
+            metrics.increment('roic_results_total', result='no_data')
             return {"ticker": ticker, "roic_data": [], "error": "No financial data available"}
         
         yearly_data = extract_financial_variables_multi_year(balance_sheet, income_statement)
@@ -197,37 +147,18 @@ def calculate_roic_multi_year(ticker: str, years: int = 4) -> Dict[str, Any]:
                 'invested_capital': invested_capital
             })
         
+        metrics.increment('roic_results_total', result='ok')
         return {
             "ticker": ticker,
             "roic_data": sorted(roic_results, key=lambda x: x['year'])
         }
         
     except Exception as e:
+        if is_rate_limited(e):
+            raise
+        metrics.increment('roic_results_total', result='error')
         return {"ticker": ticker, "roic_data": [], "error": str(e)}
 
-def plot_roic_time_series(ticker: str, years: int = 4, save_plot: bool = False) -> None:
-    """Plot ROIC as a time series to visualize as stochastic process"""
-    result = calculate_roic_multi_year(ticker, years)
-    
-    years_clean, roic_clean = prepare_plot_data(result)
-    
-    if not years_clean:
-        error_msg = result.get('error', 'No data available') if 'error' in result else 'No valid ROIC data found'
-        logger.error(f"Error calculating ROIC for {ticker}: {error_msg}")
-        return
-    
-    plt.figure(figsize=(12, 8))
-    
-    create_main_plot(ticker, years_clean, roic_clean)
-    add_trend_line(years_clean, roic_clean)
-    
-    create_statistical_subplot(years_clean, roic_clean)
-    mean_roic, std_roic = add_statistical_lines(roic_clean)
-    
-    plt.savefig(f'src/report/{ticker}_roic_analysis.png', dpi=300, bbox_inches='tight')
-    logger.info(f"Plot saved as {ticker}_roic_analysis.png")
-    log_summary_statistics(ticker, roic_clean, mean_roic, std_roic)
-
 if __name__ == "__main__":
     logger.info("Single year ROIC calculation:")
     logger.info(calculate_roic("UNH"))
@@ -238,4 +169,5 @@ if __name__ == "__main__":
     #     roic_pct = data['roic'] * 100 if data['roic'] is not None else None
     #     print(f"{data['year'].year}: {roic_pct:.2f}%" if roic_pct else f"{data['year'].year}: N/A")
     # print("\nGenerating ROIC visualization...")
+    # from src.siegfried.roic_plot import plot_roic_time_series
     # plot_roic_time_series("UNH", 4)
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+ROIC charts
+
+Kept apart from roic_calculator so that matplotlib and numpy are only
+imported by callers that actually draw. Charts are drawn on explicit
+Figure objects rather than global pyplot state.
+"""
+
+import logging
+from typing import Tuple, Dict, Any, List, Optional
+
+import numpy as np
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
+from src.siegfried.fundamentals_cache import FundamentalsCache
+from src.siegfried.roic_calculator import calculate_roic_multi_year
+from src.siegfried.ticker_snapshot import TickerSnapshot
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def prepare_plot_data(result: Dict[str, Any]) -> Tuple[List[int], List[float]]:
+    """Prepare and filter data for plotting"""
+    if 'error' in result or not result['roic_data']:
+        return [], []
+    
+    data = result['roic_data']
+    years_list = [d['year'].year for d in data]
+    roic_values = [d['roic'] * 100 if d['roic'] is not None else None for d in data]
+    
+    filtered_data = [(y, r) for y, r in zip(years_list, roic_values) if r is not None]
+    if not filtered_data:
+        return [], []
+    
+    years_clean, roic_clean = zip(*filtered_data)
+    return list(years_clean), list(roic_clean)
+
+def create_main_plot(ax: Axes, ticker: str, years_clean: List[int], roic_clean: List[float]) -> None:
+    """Create the main ROIC time series plot"""
+    ax.plot(years_clean, roic_clean, 'bo-', linewidth=2, markersize=8, label='ROIC')
+    ax.set_title(f'{ticker} - Return on Invested Capital (ROIC) Time Series', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Year')
+    ax.set_ylabel('ROIC (%)')
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+
+def add_trend_line(ax: Axes, years_clean: List[int], roic_clean: List[float]) -> None:
+    """Add trend line to the main plot"""
+    if len(years_clean) > 1:
+        z = np.polyfit(years_clean, roic_clean, 1)
+        p = np.poly1d(z)
+        ax.plot(years_clean, p(years_clean), "r--", alpha=0.7, label='Trend')
+        ax.legend()
+
+def create_statistical_subplot(ax: Axes, years_clean: List[int], roic_clean: List[float]) -> None:
+    """Create the statistical analysis subplot"""
+    ax.bar(range(len(roic_clean)), roic_clean, alpha=0.7, color='skyblue')
+    ax.set_title('ROIC Distribution', fontsize=12)
+    ax.set_xlabel('Period')
+    ax.set_ylabel('ROIC (%)')
+    ax.set_xticks(range(len(years_clean)))
+    ax.set_xticklabels(years_clean)
+
+def add_statistical_lines(ax: Axes, roic_clean: List[float]) -> Tuple[float, float]:
+    """Add statistical reference lines and return mean and std"""
+    mean_roic = np.mean(roic_clean)
+    std_roic = np.std(roic_clean)
+    ax.axhline(y=mean_roic, color='red', linestyle='--', alpha=0.7, label=f'Mean: {mean_roic:.2f}%')
+    ax.axhline(y=mean_roic + std_roic, color='orange', linestyle=':', alpha=0.5, label=f'+1σ: {mean_roic + std_roic:.2f}%')
+    ax.axhline(y=mean_roic - std_roic, color='orange', linestyle=':', alpha=0.5, label=f'-1σ: {mean_roic - std_roic:.2f}%')
+    ax.legend()
+    return mean_roic, std_roic
+
+def draw_roic_figure(ticker: str, years_clean: List[int], roic_clean: List[float]) -> Tuple[Figure, float, float]:
+    """
+    Draw the two-panel ROIC chart on a new Figure.
+
+    The Figure is not registered with pyplot, so it is freed as soon as the
+    caller drops it and can be drawn from any thread or process.
+    """
+    fig = Figure(figsize=(12, 8))
+    main_ax, stats_ax = fig.subplots(2, 1)
+
+    create_main_plot(main_ax, ticker, years_clean, roic_clean)
+    add_trend_line(main_ax, years_clean, roic_clean)
+
+    create_statistical_subplot(stats_ax, years_clean, roic_clean)
+    mean_roic, std_roic = add_statistical_lines(stats_ax, roic_clean)
+    return fig, mean_roic, std_roic
+
+def log_summary_statistics(ticker: str, roic_clean: List[float], mean_roic: float, std_roic: float) -> None:
+    """Log summary statistics for ROIC data"""
+    logger.info(f"\n{ticker} ROIC Summary Statistics:")
+    logger.info(f"Mean ROIC: {mean_roic:.2f}%")
+    logger.info(f"Standard Deviation: {std_roic:.2f}%")
+    logger.info(f"Volatility (CV): {(std_roic/abs(mean_roic)*100):.2f}%")
+    logger.info(f"Min ROIC: {min(roic_clean):.2f}%")
+    logger.info(f"Max ROIC: {max(roic_clean):.2f}%")
+    logger.info(f"Range: {max(roic_clean) - min(roic_clean):.2f}%")
+
+def plot_roic_time_series(ticker: str, years: int = 4, save_plot: bool = False,
+                          cache: Optional[FundamentalsCache] = None) -> None:
+    """Plot ROIC as a time series to visualize as stochastic process"""
+    result = calculate_roic_multi_year(ticker, years, TickerSnapshot(ticker, cache))
+    
+    years_clean, roic_clean = prepare_plot_data(result)
+    
+    if not years_clean:
+        error_msg = result.get('error', 'No data available') if 'error' in result else 'No valid ROIC data found'
+        logger.error(f"Error calculating ROIC for {ticker}: {error_msg}")
+        return
+    
+    fig, mean_roic, std_roic = draw_roic_figure(ticker, years_clean, roic_clean)
+    fig.savefig(f'src/report/{ticker}_roic_analysis.png', dpi=300, bbox_inches='tight')
+    fig.clear()
+    logger.info(f"Plot saved as {ticker}_roic_analysis.png")
+    log_summary_statistics(ticker, roic_clean, mean_roic, std_roic)
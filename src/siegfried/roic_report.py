@@ -0,0 +1,118 @@
+"""
+Batch ROIC chart report
+
+Statements are fetched in the parent with the thread-pool fetch engine,
+then the charts are rendered in a process pool on headless Agg canvases
+and streamed into a single HTML small-multiples page. Each worker draws
+on a fresh Figure that is cleared as soon as its PNG is encoded, and
+results are written as they arrive, so memory stays bounded by the pool
+size rather than the number of tickers.
+"""
+
+import base64
+import html
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import List, Optional, Tuple, Union
+
+import pandas as pd
+from src.siegfried.fetch_engine import map_ordered
+from src.siegfried.fundamentals_cache import FundamentalsCache
+from src.siegfried.roic_calculator import calculate_roic_multi_year
+from src.siegfried.ticker_snapshot import TickerSnapshot
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PlotData = Tuple[str, List[int], List[float]]
+
+PAGE_HEADER = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 1em; }}
+.grid {{ display: grid; grid-template-columns: repeat({columns}, 1fr); gap: 1em; }}
+figure {{ margin: 0; border: 1px solid #ddd; padding: 0.5em; }}
+img {{ width: 100%; }}
+figcaption {{ font-size: 0.9em; }}
+</style></head>
+<body><h1>{title}</h1><div class="grid">
+"""
+PAGE_FOOTER = "</div></body></html>\n"
+
+
+def fetch_plot_data(tickers: List[str], years: int = 4, workers: int = 8,
+                    cache: Optional[FundamentalsCache] = None) -> List[PlotData]:
+    """ROIC series per ticker, in input order, skipping tickers without data"""
+    from src.siegfried.roic_plot import prepare_plot_data
+
+    def fetch(ticker):
+        result = calculate_roic_multi_year(ticker, years, TickerSnapshot(ticker, cache))
+        years_clean, roic_clean = prepare_plot_data(result)
+        if not years_clean:
+            logger.warning(f"No ROIC data to chart for {ticker}")
+            return None
+        return ticker, years_clean, roic_clean
+
+    return [data for data in map_ordered(fetch, tickers, workers) if data is not None]
+
+
+def render_roic_png(data: PlotData, dpi: int = 100) -> Tuple[str, bytes, float, float]:
+    """Render one chart to PNG bytes on a headless Agg canvas"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from src.siegfried.roic_plot import draw_roic_figure
+
+    ticker, years_clean, roic_clean = data
+    fig, mean_roic, std_roic = draw_roic_figure(ticker, years_clean, roic_clean)
+    FigureCanvasAgg(fig)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    fig.clear()
+    return ticker, buffer.getvalue(), float(mean_roic), float(std_roic)
+
+
+def render_card(ticker: str, png: bytes, mean_roic: float, std_roic: float) -> str:
+    encoded = base64.b64encode(png).decode('ascii')
+    return (f'<figure><img alt="{html.escape(ticker)} ROIC" src="data:image/png;base64,{encoded}">'
+            f'<figcaption><b>{html.escape(ticker)}</b> mean {mean_roic:.2f}%, σ {std_roic:.2f}%</figcaption></figure>\n')
+
+
+def render_roic_report(tickers: Union[List[str], pd.DataFrame], output_path: Optional[str] = None,
+                       years: int = 4, top: int = 100, processes: Optional[int] = None,
+                       fetch_workers: int = 8, cache: Optional[FundamentalsCache] = None,
+                       dpi: int = 100, columns: int = 3) -> str:
+    """
+    Render ROIC charts for many tickers into one HTML report.
+
+    Args:
+        tickers: Symbols, or a main_roic_analysis result whose first `top`
+            rows are charted in ranked order
+        output_path (str): Defaults to src/report/roic_report_YYYYMMDD.html
+        years (int): Years of ROIC per chart
+        top (int): Rows taken from a DataFrame input
+        processes (int): Render processes, defaults to the CPU count
+        fetch_workers (int): Threads used to fetch statements
+        cache (FundamentalsCache): Optional on-disk cache for statements
+        dpi (int): PNG resolution
+        columns (int): Charts per row in the page grid
+
+    Returns:
+        str: Path of the written report
+    """
+    if isinstance(tickers, pd.DataFrame):
+        tickers = tickers['Symbol'].head(top).tolist()
+    output_path = output_path or os.path.join('src', 'report', f"roic_report_{date.today().strftime('%Y%m%d')}.html")
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+    plot_data = fetch_plot_data(tickers, years, fetch_workers, cache)
+    title = f'ROIC time series ({len(plot_data)} tickers, {date.today().isoformat()})'
+    with open(output_path, 'w', encoding='utf-8') as report, ProcessPoolExecutor(max_workers=processes) as pool:
+        report.write(PAGE_HEADER.format(title=html.escape(title), columns=columns))
+        for ticker, png, mean_roic, std_roic in pool.map(render_roic_png, plot_data, [dpi] * len(plot_data)):
+            report.write(render_card(ticker, png, mean_roic, std_roic))
+        report.write(PAGE_FOOTER)
+
+    logger.info(f"ROIC report with {len(plot_data)} charts written to {output_path}")
+    return output_path
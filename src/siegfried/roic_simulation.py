@@ -0,0 +1,291 @@
+"""
+Monte Carlo paths for ROIC and the book plus discounted earnings value
+
+plot_roic_time_series treats ROIC as a stochastic process but only reports
+its mean, spread and trend. Here a simple process is fitted per ticker:
+
+    ar1        x_t = mean + phi * (x_{t-1} - mean) + sigma * e_t, from the
+               last observed ROIC
+    bootstrap  x_t drawn with replacement from the ticker's own history
+
+Many paths are simulated per ticker. Earnings on each path scale with ROIC
+relative to the last observed year (the same invested capital earning a
+different return), and are discounted with the dcf_calculator factors:
+
+    value = book_value + eps * sum_t (roic_t / roic_last) / (1 + r)^t
+
+Tickers are stacked and simulated as one (tickers x paths x horizon)
+array, in blocks of at most chunk_paths ticker-paths, so the recursion,
+discounting and summaries run once per block instead of once per ticker.
+Only the per-path summaries are kept until each ticker's quantiles are
+taken, and memory stays at one block plus a few floats per path. Each
+ticker still draws from its own SeedSequence keyed by the seed and the
+symbol. A ticker's results do not depend on the shortlist it is part of,
+the block it lands in or the chunk size.
+"""
+
+import logging
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from src.siegfried.dcf_calculator import DEFAULT_HORIZON, discount_factors
+from src.siegfried.fetch_engine import map_ordered
+from src.siegfried.fundamentals_cache import FundamentalsCache
+from src.siegfried.roic_calculator import calculate_roic_multi_year
+from src.siegfried.ticker_snapshot import TickerSnapshot
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATHS = 100_000
+DEFAULT_CHUNK_PATHS = 20_000
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+MAX_PHI = 0.99
+MODELS = ('ar1', 'bootstrap')
+
+
+class RoicProcess(NamedTuple):
+    model: str
+    mean: float
+    phi: float
+    sigma: float
+    last: float
+    history: np.ndarray
+
+
+def clean_history(roic_values: Sequence[Optional[float]]) -> np.ndarray:
+    """Oldest-first ROIC values without the undefined years"""
+    return np.array([v for v in roic_values if v is not None and np.isfinite(v)], dtype=float)
+
+
+def fit_ar1(history: np.ndarray) -> RoicProcess:
+    """
+    Least-squares AR(1) fit. phi is clipped to keep the process stationary,
+    and with fewer than three years it falls back to phi = 0 (independent
+    draws around the mean).
+    """
+    mean = float(history.mean())
+    phi = 0.0
+    sigma = float(history.std(ddof=1)) if len(history) > 1 else 0.0
+    if len(history) >= 3:
+        previous, current = history[:-1] - mean, history[1:] - mean
+        denominator = float(previous @ previous)
+        if denominator > 0:
+            phi = float(np.clip((previous @ current) / denominator, -MAX_PHI, MAX_PHI))
+        residuals = current - phi * previous
+        sigma = float(np.sqrt(residuals @ residuals / max(len(residuals) - 1, 1)))
+    return RoicProcess('ar1', mean, phi, sigma, float(history[-1]), history)
+
+
+def fit_bootstrap(history: np.ndarray) -> RoicProcess:
+    sigma = float(history.std(ddof=1)) if len(history) > 1 else 0.0
+    return RoicProcess('bootstrap', float(history.mean()), 0.0, sigma, float(history[-1]), history)
+
+
+def simulate_batch_paths(processes: Sequence[RoicProcess], n_paths: int, horizon: int,
+                         rngs: Sequence[np.random.Generator]) -> np.ndarray:
+    """
+    ROIC for years 1..horizon on n_paths paths per process. Each process
+    draws from its own rng. Time-major, shape (horizon, len(processes),
+    n_paths), so every year of the recursion is one contiguous slab.
+
+    Raises:
+        ValueError: If the processes mix models
+    """
+    models = {process.model for process in processes}
+    if len(models) > 1:
+        raise ValueError(f"Cannot simulate mixed models {sorted(models)} in one batch")
+    paths = np.empty((horizon, len(processes), n_paths))
+    if models == {'bootstrap'}:
+        for i, (process, rng) in enumerate(zip(processes, rngs)):
+            paths[:, i, :] = process.history[rng.integers(0, len(process.history), size=(n_paths, horizon))].T
+        return paths
+
+    draws = np.empty((n_paths, horizon))
+    for i, rng in enumerate(rngs):
+        rng.standard_normal(out=draws)
+        paths[:, i, :] = draws.T
+    mean = np.array([process.mean for process in processes])[:, None]
+    phi = np.array([process.phi for process in processes])[:, None]
+    paths *= np.array([process.sigma for process in processes])[:, None]
+    deviation = np.array([process.last for process in processes])[:, None] - mean
+    for t in range(horizon):
+        deviation = phi * deviation + paths[t]
+        paths[t] = deviation
+    paths += mean
+    return paths
+
+
+def simulate_paths(process: RoicProcess, n_paths: int, horizon: int, rng: np.random.Generator) -> np.ndarray:
+    """ROIC for years 1..horizon on n_paths paths, shape (n_paths, horizon)"""
+    return simulate_batch_paths([process], n_paths, horizon, [rng])[:, 0, :].T
+
+
+def ticker_rng(symbol: str, seed: int) -> np.random.Generator:
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(zlib.crc32(symbol.encode()),)))
+
+
+def simulate_batch(symbols: Sequence[str], processes: Sequence[RoicProcess], eps: Sequence[float],
+                   book_value: Sequence[float], treasury_yield_pct: float, n_paths: int = DEFAULT_PATHS,
+                   horizon: int = DEFAULT_HORIZON, seed: int = 0,
+                   chunk_paths: int = DEFAULT_CHUNK_PATHS) -> Dict[str, np.ndarray]:
+    """
+    Per-path summaries for a batch of tickers, simulated together.
+
+    Returns:
+        Dict with arrays of shape (len(symbols), n_paths): 'roic_terminal'
+        (ROIC in the last year), 'roic_average' (mean ROIC over the horizon)
+        and 'value' (NaN when the last ROIC is not positive or inputs are
+        missing)
+    """
+    rngs = [ticker_rng(symbol, seed) for symbol in symbols]
+    weights = discount_factors(treasury_yield_pct / 100, horizon)
+    eps = np.asarray(eps, dtype=float)[:, None]
+    book_value = np.asarray(book_value, dtype=float)[:, None]
+    last = np.array([process.last for process in processes])[:, None]
+    can_value = (last > 0) & np.isfinite(eps) & np.isfinite(book_value)
+    n = len(symbols)
+    summaries = {name: np.empty((n, n_paths)) for name in ('roic_terminal', 'roic_average', 'value')}
+    for start in range(0, n_paths, chunk_paths):
+        stop = min(start + chunk_paths, n_paths)
+        paths = simulate_batch_paths(processes, stop - start, horizon, rngs)
+        summaries['roic_terminal'][:, start:stop] = paths[-1]
+        summaries['roic_average'][:, start:stop] = paths.mean(axis=0)
+        discounted = np.tensordot(weights, paths, axes=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            summaries['value'][:, start:stop] = np.where(can_value, book_value + eps * discounted / last, np.nan)
+    return summaries
+
+
+def simulate_ticker(symbol: str, process: RoicProcess, eps: float, book_value: float, treasury_yield_pct: float,
+                    n_paths: int = DEFAULT_PATHS, horizon: int = DEFAULT_HORIZON, seed: int = 0,
+                    chunk_paths: int = DEFAULT_CHUNK_PATHS) -> Dict[str, np.ndarray]:
+    """Per-path summaries for one ticker, arrays of length n_paths as in simulate_batch"""
+    summaries = simulate_batch([symbol], [process], [eps], [book_value], treasury_yield_pct,
+                               n_paths, horizon, seed, chunk_paths)
+    return {name: values[0] for name, values in summaries.items()}
+
+
+def summary_columns(name: str, values: np.ndarray, quantiles: Sequence[float]) -> Dict[str, float]:
+    finite = values[np.isfinite(values)]
+    columns = {f'{name}_Mean': float(finite.mean()) if len(finite) else np.nan}
+    levels = np.quantile(finite, quantiles) if len(finite) else np.full(len(quantiles), np.nan)
+    columns.update({f'{name}_P{round(q * 100):02d}': float(level) for q, level in zip(quantiles, levels)})
+    return columns
+
+
+def summary_block(name: str, values: np.ndarray, quantiles: Sequence[float]) -> List[Dict[str, float]]:
+    """summary_columns for each row of values, with one quantile pass over the fully finite rows"""
+    columns: List[Dict[str, float]] = [{} for _ in range(len(values))]
+    finite = np.isfinite(values).all(axis=1)
+    if finite.any():
+        means = values[finite].mean(axis=1)
+        levels = np.quantile(values[finite], quantiles, axis=1).T
+        for i, mean, row_levels in zip(np.flatnonzero(finite), means, levels):
+            columns[i] = {f'{name}_Mean': float(mean)}
+            columns[i].update({f'{name}_P{round(q * 100):02d}': float(level)
+                               for q, level in zip(quantiles, row_levels)})
+    for i in np.flatnonzero(~finite):
+        columns[i] = summary_columns(name, values[i], quantiles)
+    return columns
+
+
+def simulate_universe(inputs: pd.DataFrame, treasury_yield_pct: float, model: str = 'ar1',
+                      n_paths: int = DEFAULT_PATHS, horizon: int = DEFAULT_HORIZON, seed: int = 0,
+                      chunk_paths: int = DEFAULT_CHUNK_PATHS,
+                      quantiles: Sequence[float] = DEFAULT_QUANTILES) -> pd.DataFrame:
+    """
+    Simulated ROIC and value distributions for every ticker.
+
+    Args:
+        inputs (pd.DataFrame): Symbol, ROIC_History (oldest-first list),
+            EPS, Book_Value and optionally Price
+        treasury_yield_pct (float): Discount rate in percent
+        model (str): 'ar1' or 'bootstrap'
+        n_paths (int): Paths per ticker
+        horizon (int): Years per path
+        seed (int): Root seed, combined with each symbol
+        chunk_paths (int): Ticker-paths simulated at once; tickers are
+            stacked when n_paths is smaller
+        quantiles: Quantile levels reported per distribution
+
+    Returns:
+        pd.DataFrame: One row per symbol with the fitted process, mean and
+        quantiles of terminal ROIC, horizon-average ROIC and value, and
+        Prob_Value_Above_Price when prices are given. Tickers with fewer
+        than two ROIC years get NaN results.
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown model {model!r}, expected one of {MODELS}")
+    fit = fit_ar1 if model == 'ar1' else fit_bootstrap
+
+    records = inputs.to_dict('records')
+    rows: List[Dict[str, Any]] = []
+    fitted: List[int] = []
+    processes: List[RoicProcess] = []
+    for record in records:
+        history = clean_history(record['ROIC_History'])
+        row: Dict[str, Any] = {'Symbol': record['Symbol'], 'ROIC_Observations': len(history)}
+        if len(history) >= 2:
+            process = fit(history)
+            row.update({'Model': model, 'ROIC_Mean_Fit': process.mean, 'ROIC_Phi': process.phi,
+                        'ROIC_Sigma': process.sigma, 'ROIC_Last': process.last})
+            fitted.append(len(rows))
+            processes.append(process)
+        rows.append(row)
+
+    path_chunk = min(n_paths, chunk_paths)
+    block = max(1, chunk_paths // max(path_chunk, 1))
+    for start in range(0, len(fitted), block):
+        batch = fitted[start:start + block]
+        summaries = simulate_batch([records[i]['Symbol'] for i in batch], processes[start:start + block],
+                                   [float(records[i]['EPS']) for i in batch],
+                                   [float(records[i]['Book_Value']) for i in batch],
+                                   treasury_yield_pct, n_paths, horizon, seed, path_chunk)
+        terminal = summary_block('ROIC_Terminal', summaries['roic_terminal'], quantiles)
+        average = summary_block('ROIC_Average', summaries['roic_average'], quantiles)
+        value = summary_block('Value', summaries['value'], quantiles)
+        for j, i in enumerate(batch):
+            row, values = rows[i], summaries['value'][j]
+            row.update(terminal[j])
+            row.update(average[j])
+            row.update(value[j])
+            price = records[i].get('Price')
+            if price is not None and np.isfinite(price) and np.isfinite(values).any():
+                row['Prob_Value_Above_Price'] = float(np.mean(values > price))
+    return pd.DataFrame(rows)
+
+
+def load_simulation_inputs(symbols: List[str], years: int = 10, workers: int = 1,
+                           cache: Optional[FundamentalsCache] = None, snapshots: Optional[Dict[str, Any]] = None
+                           ) -> pd.DataFrame:
+    """
+    ROIC history, EPS, book value and price per symbol.
+
+    Args:
+        years (int): ROIC years to fit on
+        snapshots (Dict[str, Any]): Optional statement snapshots per symbol,
+            e.g. from SecFactsStore for histories longer than yfinance's
+    """
+    def fetch(symbol):
+        snapshot = TickerSnapshot(symbol, cache)
+        statements = (snapshots or {}).get(symbol, snapshot)
+        result = calculate_roic_multi_year(symbol, years, statements)
+        try:
+            info = snapshot.info
+        except Exception as e:
+            logger.warning(f"Failed to load info for {symbol}: {e}")
+            info = {}
+        return {
+            'Symbol': symbol,
+            'ROIC_History': [d['roic'] for d in result['roic_data']],
+            'EPS': info.get('trailingEps'),
+            'Book_Value': info.get('bookValue'),
+            'Price': info.get('currentPrice') or info.get('regularMarketPrice'),
+        }
+
+    df = pd.DataFrame(map_ordered(fetch, symbols, workers))
+    df[['EPS', 'Book_Value', 'Price']] = df[['EPS', 'Book_Value', 'Price']].apply(pd.to_numeric, errors='coerce')
+    return df
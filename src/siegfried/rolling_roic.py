@@ -0,0 +1,353 @@
+"""
+Incremental trailing-twelve-month ROIC with a rolling geometric mean
+
+compute_geometric_average rebuilds the product over its window on every
+call and quietly drops non-positive years. This module keeps a small state
+per ticker that is updated once per new quarterly filing, in O(1), without
+touching history:
+
+- the last four quarters of income, giving TTM NOPAT over the latest
+  quarter's invested capital
+- four phase accumulators, one per calendar quarter. Each holds a ring
+  buffer of the last `window` TTM ROIC values taken one year apart, with
+  running log-sums and counts per sign. A new quarter updates only its
+  own phase.
+
+How non-positive years enter the mean is an explicit policy:
+
+    skip     ignore non-positive years, as compute_geometric_average does
+    include  compound them in as log(1 + roic); a year at -100% or worse
+             makes the mean undefined
+    reject   any non-positive year in the window makes the mean undefined
+
+All three are answered from the same running sums, so the policy can be
+chosen at query time. Undefined years (zero invested capital or missing
+data) never count towards the mean. States persist in SQLite, so a rerun
+only applies quarters filed since the last one.
+
+Warm-up: a phase gains one TTM value per year, so n defined years take 4n
+consecutive quarters. yfinance returns only ~5 quarters, so a fresh state
+has one year in its window and no mean until min_years * 4 quarters have
+been applied: two more years of filings at the default min_years of 2,
+and four years for a full window. Warm_Up_Years_Left in the output counts
+the years still missing. Passing a longer quarterly history as backfill
+to refresh_rolling_roic fills the window on the first run.
+"""
+
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from src.siegfried.fetch_engine import map_ordered
+from src.siegfried.fundamentals_cache import DEFAULT_CACHE_DIR, FundamentalsCache
+from src.siegfried.roic_calculator import calculate_invested_capital, calculate_nopat, derive_roic
+from src.siegfried.roic_panel import build_ticker_frame
+from src.siegfried.ticker_snapshot import TickerSnapshot
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+NONPOSITIVE_POLICIES = ('skip', 'include', 'reject')
+DEFAULT_WINDOW = 4
+DEFAULT_MIN_YEARS = 2
+INCOME_FIELDS = ('operating_income', 'tax_expense', 'pretax_income')
+BALANCE_FIELDS = ('total_assets', 'cash', 'current_liabilities')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS states (
+    symbol TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+def quarter_index(period_end: date) -> int:
+    """
+    Consecutive quarters map to consecutive integers. A period end is
+    snapped to the nearest calendar quarter end, so 52/53-week quarters
+    (Apple's 2023-04-01, a retailer's late January) land in the quarter
+    they close rather than the one they spill into.
+    """
+    snapped = period_end + timedelta(days=45)
+    return snapped.year * 4 + (snapped.month - 1) // 3 - 1
+
+
+class RoicWindow:
+    """
+    The last `size` ROIC values of one phase with running sums.
+
+    Values are bucketed as positive, non-positive above -100%, total loss
+    (-100% or worse) and undefined (None). The sums are rebuilt from the
+    buffer each time it wraps, which bounds floating point drift at
+    amortized O(1) cost.
+    """
+
+    def __init__(self, size: int = DEFAULT_WINDOW):
+        self.size = size
+        self.values: List[Optional[float]] = []
+        self.head = 0
+        self._reset_sums()
+
+    def _reset_sums(self) -> None:
+        self.positive = 0
+        self.positive_log_sum = 0.0
+        self.nonpositive = 0
+        self.nonpositive_log_sum = 0.0
+        self.total_loss = 0
+        self.undefined = 0
+
+    def _count(self, value: Optional[float], sign: int) -> None:
+        if value is None:
+            self.undefined += sign
+        elif value > 0:
+            self.positive += sign
+            self.positive_log_sum += sign * math.log1p(value)
+        elif value > -1:
+            self.nonpositive += sign
+            self.nonpositive_log_sum += sign * math.log1p(value)
+        else:
+            self.total_loss += sign
+
+    def push(self, value: Optional[float]) -> None:
+        """Add the newest value, evicting the oldest once the window is full"""
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            self._count(self.values[self.head], -1)
+            self.values[self.head] = value
+        self._count(value, 1)
+        self.head = (self.head + 1) % self.size
+        if self.head == 0:
+            self._reset_sums()
+            for kept in self.values:
+                self._count(kept, 1)
+
+    @property
+    def defined(self) -> int:
+        return self.positive + self.nonpositive + self.total_loss
+
+    def geometric_mean(self, policy: str = 'skip', min_years: int = DEFAULT_MIN_YEARS) -> Optional[float]:
+        """
+        Geometric mean ROIC over the window under a non-positive policy.
+
+        Returns:
+            None when fewer than min_years are defined or the policy leaves
+            the mean undefined
+
+        Raises:
+            ValueError: For an unknown policy
+        """
+        if policy not in NONPOSITIVE_POLICIES:
+            raise ValueError(f"Unknown non-positive policy {policy!r}, expected one of {NONPOSITIVE_POLICIES}")
+        if self.defined < min_years:
+            return None
+        if policy == 'include':
+            if self.total_loss:
+                return None
+            return math.expm1((self.positive_log_sum + self.nonpositive_log_sum) / self.defined)
+        if policy == 'reject' and (self.nonpositive or self.total_loss):
+            return None
+        if not self.positive:
+            return None
+        return math.expm1(self.positive_log_sum / self.positive)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'size': self.size, 'values': self.values, 'head': self.head}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RoicWindow':
+        window = cls(data['size'])
+        window.values = list(data['values'])
+        window.head = data['head']
+        for value in window.values:
+            window._count(value, 1)
+        return window
+
+
+class RollingRoicState:
+    """TTM ROIC and its rolling geometric mean for one ticker"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self.phases = [RoicWindow(window) for _ in range(4)]
+        self.income: deque = deque(maxlen=4)
+        self.income_sums = [0.0, 0.0, 0.0]
+        self.last_quarter: Optional[int] = None
+        self.last_period: Optional[str] = None
+        self.ttm_roic: Optional[float] = None
+
+    def _push_income(self, income: Tuple[float, float, float]) -> None:
+        # Four terms are re-added rather than kept as a running difference,
+        # so a NaN quarter drops out of the TTM once it leaves the window
+        self.income.append(income)
+        self.income_sums = [sum(column) for column in zip(*self.income)]
+
+    def _skip_missing(self, quarter: int) -> None:
+        """Keep phases one year apart across missing quarters; TTM restarts"""
+        missing = range(max(self.last_quarter + 1, quarter - 4 * self.window), quarter)
+        for skipped in missing:
+            self.phases[skipped % 4].push(None)
+        self.income.clear()
+        self.income_sums = [0.0, 0.0, 0.0]
+
+    def update(self, period_end: date, fields: Dict[str, float]) -> Optional[float]:
+        """
+        Apply one quarter. Quarters at or before the last one applied are
+        ignored, so replaying a statement is harmless.
+
+        Args:
+            period_end (date): Quarter end
+            fields (Dict[str, float]): operating_income, tax_expense,
+                pretax_income for the quarter and total_assets, cash,
+                current_liabilities at its end
+
+        Returns:
+            The new TTM ROIC, or None if it is undefined or the quarter was
+            already applied
+        """
+        quarter = quarter_index(period_end)
+        if self.last_quarter is not None and quarter <= self.last_quarter:
+            return None
+        if self.last_quarter is not None and quarter > self.last_quarter + 1:
+            self._skip_missing(quarter)
+        self._push_income(tuple(float(fields[name]) for name in INCOME_FIELDS))
+
+        ttm = None
+        if len(self.income) == 4:
+            nopat = calculate_nopat(*self.income_sums)
+            invested_capital = calculate_invested_capital(*(float(fields[name]) for name in BALANCE_FIELDS))
+            roic = derive_roic(nopat, invested_capital)
+            ttm = roic if roic is not None and math.isfinite(roic) else None
+        self.phases[quarter % 4].push(ttm)
+        self.last_quarter = quarter
+        self.last_period = period_end.isoformat()
+        self.ttm_roic = ttm
+        return ttm
+
+    def current_window(self) -> Optional[RoicWindow]:
+        return self.phases[self.last_quarter % 4] if self.last_quarter is not None else None
+
+    def geometric_mean(self, policy: str = 'skip', min_years: int = DEFAULT_MIN_YEARS) -> Optional[float]:
+        """Rolling geometric mean of TTM ROIC as of the latest quarter"""
+        window = self.current_window()
+        return window.geometric_mean(policy, min_years) if window is not None else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'window': self.window, 'phases': [phase.to_dict() for phase in self.phases],
+                'income': [list(income) for income in self.income], 'last_quarter': self.last_quarter,
+                'last_period': self.last_period, 'ttm_roic': self.ttm_roic}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RollingRoicState':
+        state = cls(data['window'])
+        state.phases = [RoicWindow.from_dict(phase) for phase in data['phases']]
+        for income in data['income']:
+            state._push_income(tuple(income))
+        state.last_quarter = data['last_quarter']
+        state.last_period = data['last_period']
+        state.ttm_roic = data['ttm_roic']
+        return state
+
+
+def quarterly_rows(ticker: str, balance_sheet: pd.DataFrame,
+                   income_statement: pd.DataFrame) -> List[Tuple[date, Dict[str, float]]]:
+    """Quarters present in both statements, oldest first, in the panel's fields"""
+    if balance_sheet.empty or income_statement.empty:
+        return []
+    frame = build_ticker_frame(ticker, balance_sheet, income_statement).sort_values('year')
+    return [(pd.Timestamp(row['year']).date(), row) for row in frame.to_dict('records')]
+
+
+def apply_statements(state: RollingRoicState, ticker: str, balance_sheet: pd.DataFrame,
+                     income_statement: pd.DataFrame) -> int:
+    """Apply every quarter newer than the state's last one; returns how many"""
+    applied = 0
+    for period_end, fields in quarterly_rows(ticker, balance_sheet, income_statement):
+        if state.last_quarter is None or quarter_index(period_end) > state.last_quarter:
+            state.update(period_end, fields)
+            applied += 1
+    return applied
+
+
+class RollingRoicStore:
+    """SQLite store of one RollingRoicState per ticker"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, 'rolling_roic.sqlite')
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, symbol: str) -> Optional[RollingRoicState]:
+        with self._lock:
+            record = self._conn.execute("SELECT state FROM states WHERE symbol = ?", (symbol,)).fetchone()
+        return RollingRoicState.from_dict(json.loads(record[0])) if record else None
+
+    def put(self, symbol: str, state: RollingRoicState) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO states VALUES (?, ?, ?)",
+                               (symbol, json.dumps(state.to_dict()), time.time()))
+
+
+def refresh_rolling_roic(symbols: List[str], store: RollingRoicStore, workers: int = 1,
+                         cache: Optional[FundamentalsCache] = None, window: int = DEFAULT_WINDOW,
+                         policy: str = 'skip', min_years: int = DEFAULT_MIN_YEARS,
+                         backfill: Optional[Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]] = None) -> pd.DataFrame:
+    """
+    Apply newly filed quarters for every symbol and report the TTM signals.
+
+    Args:
+        backfill (Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]): Symbol ->
+            (quarterly balance sheet, quarterly income statement) reaching
+            further back than yfinance, applied first so a new state does not
+            have to warm up over years of filings
+
+    Returns:
+        pd.DataFrame: Symbol, Last_Quarter, TTM_ROIC, TTM_Geometric_Avg_ROIC,
+        Years_In_Window, Warm_Up_Years_Left, Nonpositive_Years, New_Quarters,
+        Status
+    """
+    backfill = backfill or {}
+
+    def refresh(symbol):
+        state = store.get(symbol) or RollingRoicState(window)
+        snapshot = TickerSnapshot(symbol, cache)
+        try:
+            applied = apply_statements(state, symbol, *backfill[symbol]) if symbol in backfill else 0
+            applied += apply_statements(state, symbol, snapshot.quarterly_balance_sheet, snapshot.quarterly_financials)
+            status = 'Success'
+        except Exception as e:
+            logger.warning(f"Failed to update rolling ROIC for {symbol}: {e}")
+            applied, status = 0, f'Error: {e}'
+        if applied:
+            store.put(symbol, state)
+        current = state.current_window()
+        defined = current.defined if current else 0
+        return {
+            'Symbol': symbol,
+            'Last_Quarter': state.last_period,
+            'TTM_ROIC': state.ttm_roic,
+            'TTM_Geometric_Avg_ROIC': state.geometric_mean(policy, min_years),
+            'Years_In_Window': defined,
+            'Warm_Up_Years_Left': max(min_years - defined, 0),
+            'Nonpositive_Years': current.nonpositive + current.total_loss if current else 0,
+            'New_Quarters': applied,
+            'Status': status,
+        }
+
+    return pd.DataFrame(map_ordered(refresh, symbols, workers))
@@ -0,0 +1,340 @@
+"""
+Long-running screening service
+
+Keeps the latest screen in memory, with each ticker's ROIC series, ranked
+row and P/B. A background thread refreshes the data on a schedule, and a
+small JSON API answers questions from memory only:
+
+    GET  /top?n=20&min_roic=0.15&max_pb=3   ranked like sort_by_pb_and_roic
+    GET  /ticker/DECK                       row, P/B, ROIC series, freshness
+    GET  /roic/DECK                         ROIC series only
+    GET  /pb/UNH                            P/B only
+    GET  /freshness                         refresh times and last failures
+    GET  /health                            service status
+    POST /refresh                           start a refresh now
+
+A refresh updates tickers one by one as their data arrives, so queries
+during a refresh see a mix of old and new entries and never wait on the
+network. With a FundamentalsCache the service starts warm: the first
+refresh serves fresh entries from disk.
+
+A refresh that fails for a ticker keeps serving its last good values,
+field by field: a failed ROIC row keeps the previous row and series, and
+a missing P/B keeps the previous P/B. A ROIC failure, its time and the
+age of the kept entry show up in /freshness and /ticker until a later
+refresh succeeds.
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+from src.siegfried.fetch_engine import RateLimiter, imap_ordered
+from src.siegfried.find_hidden_cheap_goods_in_rubbish import (
+    analyze_symbol_roic_with_series, calculate_pb_or_none, load_all_symbols, sort_by_pb_and_roic, status_category)
+from src.siegfried.fundamentals_cache import FundamentalsCache
+from src.siegfried.ticker_snapshot import TickerSnapshot
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_INTERVAL = timedelta(hours=12)
+DEFAULT_PORT = 8765
+
+
+class TickerEntry(NamedTuple):
+    row: Dict[str, Any]
+    pb_ratio: Optional[float]
+    roic_series: List[Dict[str, Any]]
+    refreshed_at: float
+
+
+def fetch_entry(ticker: str, limiter: Optional[RateLimiter] = None, retries: int = 3,
+                cache: Optional[FundamentalsCache] = None) -> TickerEntry:
+    """Screen one ticker; statements are fetched once and shared by all stages"""
+    snapshot = TickerSnapshot(ticker, cache, limiter)
+    row, roic_data = analyze_symbol_roic_with_series(ticker, limiter, retries, snapshot)
+    pb_ratio = calculate_pb_or_none(ticker, limiter, retries, snapshot)
+    series = [{'year': d['year'].date().isoformat(), 'roic': d['roic']} for d in roic_data]
+    return TickerEntry(row, pb_ratio, series, time.time())
+
+
+def merge_entry(previous: Optional[TickerEntry], entry: TickerEntry) -> TickerEntry:
+    """
+    Keep the last good value of each field: the previous row, series and
+    refresh time when the new row is an error, and the previous P/B when
+    the new one is missing.
+    """
+    if previous is None:
+        return entry
+    if status_category(entry.row['Status']) == 'Error' and status_category(previous.row['Status']) != 'Error':
+        entry = entry._replace(row=previous.row, roic_series=previous.roic_series, refreshed_at=previous.refreshed_at)
+    if entry.pb_ratio is None and previous.pb_ratio is not None:
+        entry = entry._replace(pb_ratio=previous.pb_ratio)
+    return entry
+
+
+def jsonable(value: Any) -> Any:
+    """NaN and missing values as null, NumPy scalars as Python numbers"""
+    if isinstance(value, dict):
+        return {key: jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+class ScreenService:
+    """
+    In-memory screen kept current by a background refresh thread.
+
+    Args:
+        symbols (List[str]): Fixed symbol list; by default the first k
+            symbols of universe are reloaded at every refresh
+        k (int): Number of universe symbols
+        universe (str): Universe name, as in load_all_symbols
+        refresh_interval (timedelta): Time between refreshes
+        workers (int): Fetch threads during a refresh
+        calls_per_second (float): Remote call budget during a refresh
+        retries (int): Retries with backoff for rate-limited calls
+        cache (FundamentalsCache): Optional on-disk cache for a warm start
+    """
+
+    def __init__(self, symbols: Optional[List[str]] = None, k: int = 499, universe: str = 'sp500',
+                 refresh_interval: timedelta = DEFAULT_REFRESH_INTERVAL, workers: int = 8,
+                 calls_per_second: Optional[float] = 4, retries: int = 3,
+                 cache: Optional[FundamentalsCache] = None):
+        self.symbols = symbols
+        self.k = k
+        self.universe = universe
+        self.refresh_interval = refresh_interval
+        self.workers = workers
+        self.calls_per_second = calls_per_second
+        self.retries = retries
+        self.cache = cache
+        self._entries: Dict[str, TickerEntry] = {}
+        self._failures: Dict[str, Tuple[str, float]] = {}
+        self._order: List[str] = []
+        self._table: Optional[pd.DataFrame] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresh_requested = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refresh_started_at: Optional[float] = None
+        self.refresh_completed_at: Optional[float] = None
+
+    def refresh(self) -> int:
+        """
+        Re-screen every symbol, publishing each ticker as it completes.
+        Fields that failed keep their last good values (see merge_entry),
+        and an error row is recorded as the ticker's last failure.
+        Concurrent calls run one at a time.
+
+        Returns:
+            int: Number of tickers refreshed
+        """
+        with self._refresh_lock:
+            self.refresh_started_at = time.time()
+            symbols = self.symbols if self.symbols is not None else load_all_symbols(self.k, self.universe)
+            with self._lock:
+                self._order = list(symbols)
+                self._table = None
+            limiter = RateLimiter(self.calls_per_second, burst=self.workers)
+
+            def fetch(ticker):
+                return ticker, fetch_entry(ticker, limiter, self.retries, self.cache)
+
+            kept = 0
+            for ticker, entry in imap_ordered(fetch, symbols, self.workers):
+                failed = status_category(entry.row['Status']) == 'Error'
+                with self._lock:
+                    previous = self._entries.get(ticker)
+                    if failed:
+                        self._failures[ticker] = (entry.row['Status'], entry.refreshed_at)
+                    else:
+                        self._failures.pop(ticker, None)
+                    merged = merge_entry(previous, entry)
+                    if merged is not entry:
+                        kept += 1
+                    if merged != previous:
+                        self._entries[ticker] = merged
+                        self._table = None
+            self.refresh_completed_at = time.time()
+            logger.info(f"Refreshed {len(symbols)} tickers in {self.refresh_completed_at - self.refresh_started_at:.1f}s")
+            if kept:
+                logger.warning(f"{kept} tickers failed to refresh some fields and keep their previous values")
+            return len(symbols)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Background refresh failed: {e}")
+            self._refresh_requested.wait(self.refresh_interval.total_seconds())
+            self._refresh_requested.clear()
+
+    def start(self) -> None:
+        """Start the background refresh loop; the first refresh runs right away"""
+        self._thread = threading.Thread(target=self._run, name='screen-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._refresh_requested.set()
+
+    def request_refresh(self) -> None:
+        """Wake the background loop for an immediate refresh"""
+        self._refresh_requested.set()
+
+    def is_refreshing(self) -> bool:
+        return self._refresh_lock.locked()
+
+    def table(self) -> pd.DataFrame:
+        """The screen table in the same shape as screen_symbols, ranked"""
+        with self._lock:
+            if self._table is None:
+                present = [ticker for ticker in self._order if ticker in self._entries]
+                rows = [dict(self._entries[ticker].row, PB_Ratio=self._entries[ticker].pb_ratio)
+                        for ticker in present]
+                table = pd.DataFrame(rows, columns=['Symbol', '4Y_Geometric_Avg_ROIC', 'Status',
+                                                    'Years_Available', 'PB_Ratio'])
+                for column in ('4Y_Geometric_Avg_ROIC', 'Years_Available', 'PB_Ratio'):
+                    table[column] = pd.to_numeric(table[column], errors='coerce')
+                self._table = sort_by_pb_and_roic(table)
+            return self._table
+
+    def top(self, n: int = 20, min_roic: Optional[float] = None, max_pb: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Best n successful rows, optionally with ROIC above min_roic and P/B at most max_pb"""
+        table = self.table()
+        table = table[table['Status'] == 'Success']
+        if min_roic is not None:
+            table = table[table['4Y_Geometric_Avg_ROIC'] > min_roic]
+        if max_pb is not None:
+            table = table[table['PB_Ratio'] <= max_pb]
+        return jsonable(table.head(n).to_dict('records'))
+
+    def entry(self, ticker: str) -> Optional[TickerEntry]:
+        with self._lock:
+            return self._entries.get(ticker)
+
+    def ticker(self, ticker: str) -> Optional[Dict[str, Any]]:
+        entry = self.entry(ticker)
+        if entry is None:
+            return None
+        with self._lock:
+            failure = self._failures.get(ticker)
+        return jsonable({**entry.row, 'PB_Ratio': entry.pb_ratio, 'ROIC_Series': entry.roic_series,
+                         **self.freshness_of(entry, failure)})
+
+    def freshness_of(self, entry: Optional[TickerEntry],
+                     failure: Optional[Tuple[str, float]] = None) -> Dict[str, Any]:
+        """Age of the served entry and the last failed refresh since it, if any"""
+        now = time.time()
+        return {'Refreshed_At': entry.refreshed_at if entry else None,
+                'Age_Seconds': round(now - entry.refreshed_at, 3) if entry else None,
+                'Last_Error': failure[0] if failure else None,
+                'Last_Error_At': failure[1] if failure else None,
+                'Last_Error_Age_Seconds': round(now - failure[1], 3) if failure else None}
+
+    def freshness(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = [(ticker, self._entries.get(ticker), self._failures.get(ticker)) for ticker in self._order]
+        return [{'Symbol': ticker, **self.freshness_of(entry, failure)} for ticker, entry, failure in entries]
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            loaded, total, failing = len(self._entries), len(self._order), len(self._failures)
+        return {'tickers_loaded': loaded, 'tickers_total': total, 'tickers_failing': failing,
+                'refreshing': self.is_refreshing(),
+                'refresh_started_at': self.refresh_started_at, 'refresh_completed_at': self.refresh_completed_at,
+                'refresh_interval_seconds': self.refresh_interval.total_seconds()}
+
+
+def optional_float(query: Dict[str, List[str]], name: str) -> Optional[float]:
+    return float(query[name][0]) if name in query else None
+
+
+def route(service: ScreenService, method: str, url: str) -> Tuple[int, Any]:
+    """Answer one API request from memory; returns (status, JSON body)"""
+    parsed = urlparse(url)
+    parts = [part for part in parsed.path.split('/') if part]
+    query = parse_qs(parsed.query)
+    try:
+        if method == 'POST' and parts == ['refresh']:
+            service.request_refresh()
+            return 202, {'refresh': 'requested'}
+        if method != 'GET':
+            return 405, {'error': f'{method} not allowed'}
+        if parts == ['top']:
+            n = int(query['n'][0]) if 'n' in query else 20
+            return 200, service.top(n, optional_float(query, 'min_roic'), optional_float(query, 'max_pb'))
+        if parts == ['freshness']:
+            return 200, service.freshness()
+        if parts == ['health']:
+            return 200, service.health()
+        if len(parts) == 2 and parts[0] in ('ticker', 'roic', 'pb'):
+            ticker = parts[1].upper()
+            result = service.ticker(ticker)
+            if result is None:
+                return 404, {'error': f'{ticker} is not loaded'}
+            if parts[0] == 'roic':
+                result = {'Symbol': ticker, 'ROIC_Series': result['ROIC_Series']}
+            elif parts[0] == 'pb':
+                result = {'Symbol': ticker, 'PB_Ratio': result['PB_Ratio']}
+            return 200, result
+    except ValueError as e:
+        return 400, {'error': str(e)}
+    return 404, {'error': f'no route for {parsed.path}'}
+
+
+def make_handler(service: ScreenService) -> type:
+    class ScreenRequestHandler(BaseHTTPRequestHandler):
+        def _respond(self, method: str) -> None:
+            status, body = route(service, method, self.path)
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self) -> None:
+            self._respond('GET')
+
+        def do_POST(self) -> None:
+            self._respond('POST')
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logger.debug(format % args)
+
+    return ScreenRequestHandler
+
+
+def make_server(service: ScreenService, host: str = '127.0.0.1', port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    return ThreadingHTTPServer((host, port), make_handler(service))
+
+
+def serve(service: ScreenService, host: str = '127.0.0.1', port: int = DEFAULT_PORT) -> None:
+    """Run the refresh loop and the API until interrupted"""
+    server = make_server(service, host, port)
+    service.start()
+    logger.info(f"Screen service listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
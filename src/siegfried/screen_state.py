@@ -0,0 +1,91 @@
+"""
+Persisted per-ticker state for incremental screening
+
+For every symbol the previous run's ROIC inputs, its result row and the
+latest fiscal period it was computed from are kept in SQLite. The next run
+only re-fetches statements for symbols whose period moved or whose entry
+went stale, and reuses the stored row for everything else.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from src.siegfried.fundamentals_cache import DEFAULT_CACHE_DIR
+
+DEFAULT_MAX_AGE = timedelta(days=30)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickers (
+    symbol TEXT PRIMARY KEY,
+    latest_period TEXT,
+    roic_values TEXT NOT NULL,
+    row TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+)
+"""
+
+
+class TickerState(NamedTuple):
+    symbol: str
+    latest_period: Optional[str]
+    roic_values: List[float]
+    row: Dict[str, Any]
+    fetched_at: float
+
+
+def latest_fiscal_period(info: Dict[str, Any]) -> Optional[str]:
+    """Latest fiscal year end reported in yfinance info, as an ISO date"""
+    epoch = info.get('lastFiscalYearEnd') if info else None
+    if not epoch:
+        return None
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).date().isoformat()
+
+
+class ScreenState:
+    """SQLite store of the last screened inputs and results per ticker"""
+
+    def __init__(self, path: Optional[str] = None, max_age: timedelta = DEFAULT_MAX_AGE):
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, 'screen_state.sqlite')
+        self.max_age = max_age
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, symbol: str) -> Optional[TickerState]:
+        with self._lock:
+            record = self._conn.execute(
+                "SELECT symbol, latest_period, roic_values, row, fetched_at FROM tickers WHERE symbol = ?",
+                (symbol,)).fetchone()
+        if record is None:
+            return None
+        return TickerState(record[0], record[1], json.loads(record[2]), json.loads(record[3]), record[4])
+
+    def put(self, symbol: str, latest_period: Optional[str], roic_values: List[float],
+            row: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO tickers VALUES (?, ?, ?, ?, ?)",
+                               (symbol, latest_period, json.dumps(roic_values), json.dumps(row), time.time()))
+
+    def needs_refetch(self, entry: Optional[TickerState], latest_period: Optional[str]) -> bool:
+        """
+        Whether a symbol's statements must be downloaded again.
+
+        True when there is no entry, the last attempt failed, the reported
+        fiscal period moved, or the entry is older than max_age.
+        """
+        if entry is None or entry.row.get('Status', '').startswith('Error'):
+            return True
+        if latest_period is not None and latest_period != entry.latest_period:
+            return True
+        return time.time() - entry.fetched_at > self.max_age.total_seconds()
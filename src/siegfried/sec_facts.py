@@ -0,0 +1,280 @@
+"""
+Annual fundamentals from the SEC EDGAR companyfacts bulk file
+
+yfinance returns only about four annual periods, too few for a 10-year
+rolling ROIC. EDGAR publishes every filer's XBRL facts as one zip
+(companyfacts.zip, one CIK##########.json member per company). This module
+reads that file member by member across a process pool, maps the XBRL tags
+onto the fields extract_financial_variables_multi_year reads, and writes a
+columnar ticker x fiscal-year store as a compressed .npz. A store snapshot
+exposes balance_sheet and financials frames in the yfinance layout, so
+
+    calculate_roic_multi_year(ticker, years=10, snapshot=store.snapshot(ticker))
+
+works unchanged. Stockholders' equity and shares outstanding are kept as
+well, for a book value per share history longer than yfinance's quarters.
+
+A period reported more than once (comparatives, restatements) keeps its
+latest value by default, which is what a screen wants. A store ingested
+with as_filed keeps the value as first filed instead, so a backtest does
+not see restatements before they were made.
+
+CIKs are mapped to tickers with the SEC's company_tickers.json; without it
+the store is keyed by zero-padded CIK.
+"""
+
+import json
+import logging
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from src.siegfried.fundamentals_cache import DEFAULT_CACHE_DIR
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join(DEFAULT_CACHE_DIR, 'sec_companyfacts.npz')
+MEMBERS_PER_TASK = 256
+
+# Statement row label -> us-gaap tags, most specific first. The first tag
+# with a value for a fiscal year wins.
+INCOME_TAGS: Dict[str, Tuple[str, ...]] = {
+    'Operating Income': ('OperatingIncomeLoss',),
+    'Tax Provision': ('IncomeTaxExpenseBenefit',),
+    'Pretax Income': (
+        'IncomeLossFromContinuingOperationsBeforeIncomeTaxesExtraordinaryItemsNoncontrollingInterest',
+        'IncomeLossFromContinuingOperationsBeforeIncomeTaxesMinorityInterestAndIncomeLossFromEquityMethodInvestments',
+    ),
+}
+BALANCE_TAGS: Dict[str, Tuple[str, ...]] = {
+    'Total Assets': ('Assets',),
+    'Cash And Cash Equivalents': (
+        'CashAndCashEquivalentsAtCarryingValue',
+        'CashCashEquivalentsRestrictedCashAndRestrictedCashEquivalents',
+        'Cash',
+    ),
+    'Current Liabilities': ('LiabilitiesCurrent',),
+    'Stockholders Equity': ('StockholdersEquity',),
+}
+# Reported in shares rather than USD; read with the balance sheet
+SHARE_TAGS: Dict[str, Tuple[str, ...]] = {
+    'Ordinary Shares Number': ('CommonStockSharesOutstanding',),
+}
+FIELDS = list(INCOME_TAGS) + list(BALANCE_TAGS) + list(SHARE_TAGS)
+
+ANNUAL_FORMS = ('10-K', '10-K/A', '20-F', '20-F/A', '40-F', '40-F/A')
+ANNUAL_DAYS = (350, 380)
+
+AnnualSeries = Dict[str, float]
+
+
+def annual_values(facts: Dict, tags: Tuple[str, ...], duration: bool, unit: str = 'USD',
+                  as_filed: bool = False) -> AnnualSeries:
+    """
+    Fiscal-year values for one field, keyed by period end (YYYY-MM-DD).
+
+    Only annual filings are read. Duration facts must span roughly a year,
+    so quarters reported in a 10-K are skipped. When a period was reported
+    more than once (comparatives, restatements) the latest filing wins, or
+    the first one with as_filed.
+    """
+    us_gaap = facts.get('us-gaap', {})
+    series: AnnualSeries = {}
+    for tag in tags:
+        entries = us_gaap.get(tag, {}).get('units', {}).get(unit, [])
+        latest: Dict[str, Tuple[str, float]] = {}
+        for entry in entries:
+            if entry.get('form') not in ANNUAL_FORMS or entry.get('fp') != 'FY':
+                continue
+            end = entry['end']
+            if duration:
+                if 'start' not in entry:
+                    continue
+                days = (date.fromisoformat(end) - date.fromisoformat(entry['start'])).days
+                if not ANNUAL_DAYS[0] <= days <= ANNUAL_DAYS[1]:
+                    continue
+            filed = entry.get('filed', '')
+            if end not in latest or (filed < latest[end][0] if as_filed else filed >= latest[end][0]):
+                latest[end] = (filed, float(entry['val']))
+        for end, (_, value) in latest.items():
+            series.setdefault(end, value)
+    return series
+
+
+def parse_company(document: Dict, as_filed: bool = False) -> Dict[str, AnnualSeries]:
+    """Map one companyfacts document onto the statement row labels"""
+    facts = document.get('facts', {})
+    parsed = {label: annual_values(facts, tags, duration=True, as_filed=as_filed)
+              for label, tags in INCOME_TAGS.items()}
+    parsed.update({label: annual_values(facts, tags, duration=False, as_filed=as_filed)
+                   for label, tags in BALANCE_TAGS.items()})
+    parsed.update({label: annual_values(facts, tags, duration=False, unit='shares', as_filed=as_filed)
+                   for label, tags in SHARE_TAGS.items()})
+    return parsed
+
+
+def parse_members(zip_path: str, names: List[str], as_filed: bool = False) -> List[Tuple[str, Dict[str, AnnualSeries]]]:
+    """Worker task: parse a batch of members, opening the archive once"""
+    parsed = []
+    with zipfile.ZipFile(zip_path) as archive:
+        for name in names:
+            try:
+                with archive.open(name) as member:
+                    document = json.load(member)
+            except (ValueError, KeyError) as e:
+                logger.warning(f"Skipping unreadable companyfacts member {name}: {e}")
+                continue
+            cik = f"{int(document.get('cik', 0)):010d}"
+            parsed.append((cik, parse_company(document, as_filed)))
+    return parsed
+
+
+def load_ticker_map(path: str) -> Dict[str, str]:
+    """CIK -> ticker from the SEC company_tickers.json, first listed class wins"""
+    with open(path) as f:
+        entries = json.load(f)
+    entries = entries.values() if isinstance(entries, dict) else entries
+    cik_to_ticker: Dict[str, str] = {}
+    for entry in entries:
+        cik_to_ticker.setdefault(f"{int(entry['cik_str']):010d}", str(entry['ticker']).upper().replace('.', '-'))
+    return cik_to_ticker
+
+
+def fiscal_years(company: Dict[str, AnnualSeries]) -> Dict[int, str]:
+    """Fiscal year -> period end; the latest end wins if the year end moved"""
+    years: Dict[int, str] = {}
+    for series in company.values():
+        for end in series:
+            year = int(end[:4])
+            if end > years.get(year, ''):
+                years[year] = end
+    return years
+
+
+def build_store(companies: List[Tuple[str, Dict[str, AnnualSeries]]],
+                as_filed: bool = False) -> Dict[str, np.ndarray]:
+    """Assemble parsed companies into ticker x year arrays"""
+    spans = [fiscal_years(company) for _, company in companies]
+    all_years = sorted({year for span in spans for year in span})
+    year_index = {year: i for i, year in enumerate(all_years)}
+
+    shape = (len(companies), len(all_years))
+    arrays = {label: np.full(shape, np.nan) for label in FIELDS}
+    period_end = np.full(shape, np.datetime64('NaT'), dtype='datetime64[D]')
+    for row, ((_, company), span) in enumerate(zip(companies, spans)):
+        for year, end in span.items():
+            column = year_index[year]
+            period_end[row, column] = np.datetime64(end)
+            for label in FIELDS:
+                value = company[label].get(end)
+                if value is not None:
+                    arrays[label][row, column] = value
+
+    store = {f'field_{i}': arrays[label] for i, label in enumerate(FIELDS)}
+    store.update({
+        'symbols': np.array([symbol for symbol, _ in companies], dtype=str),
+        'years': np.array(all_years, dtype=np.int32),
+        'period_end': period_end,
+        'fields': np.array(FIELDS, dtype=str),
+        'as_filed': np.array(as_filed),
+    })
+    return store
+
+
+def ingest_companyfacts(zip_path: str, output_path: str = DEFAULT_STORE_PATH,
+                        tickers_path: Optional[str] = None, processes: Optional[int] = None,
+                        members_per_task: int = MEMBERS_PER_TASK, as_filed: bool = False) -> str:
+    """
+    Parse a companyfacts.zip into a ticker x year fundamentals store.
+
+    Args:
+        zip_path (str): Local copy of companyfacts.zip
+        output_path (str): .npz store to write
+        tickers_path (str): Optional company_tickers.json; filers without a
+            ticker are dropped when it is given
+        processes (int): Parser processes, defaults to the CPU count
+        members_per_task (int): Members each worker parses per task
+        as_filed (bool): Keep each period's first filed value rather than
+            its latest restatement, for point-in-time backtests
+
+    Returns:
+        str: Path of the written store
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        names = [name for name in archive.namelist() if name.endswith('.json')]
+    batches = [names[i:i + members_per_task] for i in range(0, len(names), members_per_task)]
+    logger.info(f"Parsing {len(names)} companyfacts members in {len(batches)} batches")
+
+    cik_to_ticker = load_ticker_map(tickers_path) if tickers_path else None
+    companies = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for parsed in pool.map(partial(parse_members, zip_path, as_filed=as_filed), batches):
+            for cik, company in parsed:
+                if cik_to_ticker is None:
+                    companies.append((cik, company))
+                elif cik in cik_to_ticker:
+                    companies.append((cik_to_ticker[cik], company))
+
+    store = build_store(companies, as_filed)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tmp_path = output_path + '.tmp.npz'
+    np.savez_compressed(tmp_path, **store)
+    os.replace(tmp_path, output_path)
+    logger.info(f"SEC store with {len(companies)} filers x {len(store['years'])} years written to {output_path}")
+    return output_path
+
+
+class SecFactsSnapshot:
+    """Statement frames for one ticker, shaped like TickerSnapshot's"""
+
+    def __init__(self, balance_sheet: pd.DataFrame, financials: pd.DataFrame):
+        self.balance_sheet = balance_sheet
+        self.financials = financials
+
+
+class SecFactsStore:
+    """Read side of the ticker x year store written by ingest_companyfacts"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        with np.load(path) as data:
+            self.symbols = data['symbols']
+            self.years = data['years']
+            self.period_end = data['period_end']
+            self.values = {str(label): data[f'field_{i}'] for i, label in enumerate(data['fields'])}
+            self.as_filed = bool(data['as_filed']) if 'as_filed' in data.files else False
+        self._rows = {str(symbol): row for row, symbol in enumerate(self.symbols)}
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._rows
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def statement(self, symbol: str, labels: List[str]) -> pd.DataFrame:
+        """
+        One statement in the yfinance layout: row labels as index, fiscal
+        period ends as columns, newest first. Labels and periods with no
+        data at all are left out, as yfinance does, and so are labels the
+        store predates.
+        """
+        labels = [label for label in labels if label in self.values]
+        row = self._rows[symbol]
+        mask = ~np.isnat(self.period_end[row])
+        columns = pd.DatetimeIndex(self.period_end[row, mask])
+        frame = pd.DataFrame([self.values[label][row, mask] for label in labels], index=labels, columns=columns)
+        frame = frame.dropna(how='all').dropna(axis=1, how='all')
+        return frame.iloc[:, ::-1]
+
+    def snapshot(self, symbol: str) -> SecFactsSnapshot:
+        """
+        Raises:
+            KeyError: If the symbol is not in the store
+        """
+        return SecFactsSnapshot(self.statement(symbol, list(BALANCE_TAGS) + list(SHARE_TAGS)),
+                                self.statement(symbol, list(INCOME_TAGS)))
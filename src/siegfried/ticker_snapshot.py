@@ -0,0 +1,86 @@
+"""
+Per-ticker snapshot of yfinance data
+
+Every statement is fetched at most once, on first access, and then shared
+by the ROIC and P/B calculators so both stages see the same data. With a
+FundamentalsCache attached, fetches go through the on-disk cache first.
+A RateLimiter attached to the snapshot is charged once per remote call,
+so cache and memo hits cost nothing.
+"""
+
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from src.siegfried import metrics
+
+if TYPE_CHECKING:
+    from src.siegfried.fetch_engine import RateLimiter
+    from src.siegfried.fundamentals_cache import FundamentalsCache
+
+
+def make_yf_ticker(symbol: str) -> Any:
+    import yfinance as yf
+    return yf.Ticker(symbol)
+
+
+class TickerSnapshot:
+    """Lazily fetched, memoized view of one ticker's statements and info"""
+
+    def __init__(self, symbol: str, cache: Optional['FundamentalsCache'] = None,
+                 limiter: Optional['RateLimiter'] = None):
+        self.symbol = symbol
+        self.cache = cache
+        self.limiter = limiter
+        self._ticker = None
+        self._data: Dict[str, Any] = {}
+
+    @property
+    def ticker(self) -> Any:
+        if self._ticker is None:
+            self._ticker = make_yf_ticker(self.symbol)
+        return self._ticker
+
+    def _fetch(self, kind: str) -> Any:
+        if self.limiter is not None:
+            self.limiter.acquire()
+        if not metrics.is_enabled():
+            return getattr(self.ticker, kind)
+        start = time.perf_counter()
+        try:
+            return getattr(self.ticker, kind)
+        finally:
+            metrics.increment('remote_calls_total', kind=kind)
+            metrics.observe('remote_call_seconds', time.perf_counter() - start, kind=kind)
+
+    def _get(self, kind: str) -> Any:
+        if kind not in self._data:
+            if self.cache is not None:
+                self._data[kind] = self.cache.get_or_fetch(self.symbol, kind, lambda: self._fetch(kind))
+            else:
+                self._data[kind] = self._fetch(kind)
+        return self._data[kind]
+
+    @property
+    def balance_sheet(self) -> Any:
+        return self._get('balance_sheet')
+
+    @property
+    def financials(self) -> Any:
+        return self._get('financials')
+
+    @property
+    def quarterly_balance_sheet(self) -> Any:
+        return self._get('quarterly_balance_sheet')
+
+    @property
+    def quarterly_financials(self) -> Any:
+        return self._get('quarterly_financials')
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        return self._get('info')
+
+    @property
+    def splits(self) -> Any:
+        """Split ratios by ex-date, e.g. 4.0 for a 4-for-1 split"""
+        return self._get('splits')
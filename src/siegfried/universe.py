@@ -0,0 +1,156 @@
+"""
+Versioned, on-disk universe of ticker symbols
+
+Constituent lists are snapshotted as dated CSV files under
+src/cache/universe/<name>/<YYYY-MM-DD>.csv. A fresh snapshot is reused
+instead of scraping Wikipedia on every run, local CSV/Parquet lists can be
+imported as extra universes, and the stored snapshots answer which symbols
+were in a universe on a given date.
+"""
+
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+from src.siegfried import metrics
+from src.siegfried.fundamentals_cache import DEFAULT_CACHE_DIR
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_UNIVERSE_DIR = os.path.join(DEFAULT_CACHE_DIR, 'universe')
+DEFAULT_MAX_AGE = timedelta(days=1)
+
+SP500_URL = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+def normalize_symbols(symbols: List[str]) -> List[str]:
+    """yfinance spells share classes with a dash, e.g. BRK.B -> BRK-B"""
+    return [str(symbol).strip().replace('.', '-') for symbol in symbols]
+
+
+def scrape_sp500() -> List[str]:
+    import requests
+    metrics.increment('remote_calls_total', kind='universe')
+    response = requests.get(SP500_URL, headers=HEADERS)
+    sp500 = pd.read_html(response.content)[0]
+    return normalize_symbols(sp500['Symbol'].tolist())
+
+
+SOURCES: Dict[str, Callable[[], List[str]]] = {
+    'sp500': scrape_sp500,
+}
+
+
+def universe_dir(name: str, root: Optional[str] = None) -> str:
+    return os.path.join(root or DEFAULT_UNIVERSE_DIR, name)
+
+
+def list_snapshots(name: str, root: Optional[str] = None) -> List[date]:
+    """Dates of all stored snapshots for a universe, oldest first"""
+    directory = universe_dir(name, root)
+    if not os.path.isdir(directory):
+        return []
+    dates = []
+    for filename in os.listdir(directory):
+        stem, ext = os.path.splitext(filename)
+        if ext == '.csv':
+            try:
+                dates.append(datetime.strptime(stem, '%Y-%m-%d').date())
+            except ValueError:
+                continue
+    return sorted(dates)
+
+
+def read_snapshot(name: str, snapshot_date: date, root: Optional[str] = None) -> List[str]:
+    path = os.path.join(universe_dir(name, root), f'{snapshot_date.isoformat()}.csv')
+    return pd.read_csv(path, dtype=str)['Symbol'].tolist()
+
+
+def save_snapshot(name: str, symbols: List[str], snapshot_date: Optional[date] = None,
+                  root: Optional[str] = None) -> str:
+    snapshot_date = snapshot_date or date.today()
+    directory = universe_dir(name, root)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{snapshot_date.isoformat()}.csv')
+    tmp_path = path + '.tmp'
+    pd.DataFrame({'Symbol': symbols}).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_universe_file(path: str, symbol_column: str = 'Symbol') -> pd.DataFrame:
+    """Read a local CSV or Parquet constituent list"""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype={symbol_column: str})
+
+
+def import_universe_file(name: str, path: str, as_of: Optional[date] = None,
+                         symbol_column: str = 'Symbol', date_column: str = 'Date',
+                         root: Optional[str] = None) -> List[date]:
+    """
+    Store a local constituent list (e.g. S&P 400, Russell 2000) as snapshots.
+
+    Files with a date column are treated as constituent history and produce
+    one snapshot per distinct date; otherwise the whole file becomes a
+    single snapshot dated as_of (default today).
+
+    Returns:
+        List[date]: Dates of the snapshots written
+    """
+    table = read_universe_file(path, symbol_column)
+    if date_column in table.columns:
+        written = []
+        for snapshot_date, group in table.groupby(pd.to_datetime(table[date_column]).dt.date):
+            save_snapshot(name, normalize_symbols(group[symbol_column].tolist()), snapshot_date, root)
+            written.append(snapshot_date)
+        return written
+    snapshot_date = as_of or date.today()
+    save_snapshot(name, normalize_symbols(table[symbol_column].tolist()), snapshot_date, root)
+    return [snapshot_date]
+
+
+def constituents_as_of(name: str, as_of: date, root: Optional[str] = None) -> List[str]:
+    """
+    Symbols in a universe on a given date, from the latest snapshot on or
+    before that date.
+
+    Raises:
+        LookupError: If no snapshot exists on or before as_of
+    """
+    dates = [d for d in list_snapshots(name, root) if d <= as_of]
+    if not dates:
+        raise LookupError(f"No {name} snapshot on or before {as_of.isoformat()}")
+    return read_snapshot(name, dates[-1], root)
+
+
+def load_universe(name: str = 'sp500', max_age: timedelta = DEFAULT_MAX_AGE,
+                  root: Optional[str] = None) -> List[str]:
+    """
+    Current constituents of a universe, scraping only when no snapshot is
+    younger than max_age. Universes without a registered source (imported
+    files) always come from their latest snapshot. If a refresh fails, the
+    latest stale snapshot is used instead.
+    """
+    dates = list_snapshots(name, root)
+    if dates and (name not in SOURCES or date.today() - dates[-1] < max_age):
+        return read_snapshot(name, dates[-1], root)
+    if name not in SOURCES:
+        raise LookupError(f"Unknown universe {name} and no stored snapshot")
+
+    try:
+        symbols = SOURCES[name]()
+    except Exception as e:
+        if not dates:
+            raise
+        logger.warning(f"Failed to refresh universe {name}, using snapshot from {dates[-1]}: {e}")
+        return read_snapshot(name, dates[-1], root)
+
+    save_snapshot(name, symbols, root=root)
+    return symbols
@@ -0,0 +1,128 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+import pytest
+from src.siegfried import backtest as bt
+from src.siegfried.pb_history import PriceMatrix
+from src.siegfried.roic_panel import build_panel
+from src.siegfried.universe import save_snapshot
+
+
+def statements(roic_by_year):
+    years = pd.to_datetime([f'{year}-12-31' for year in roic_by_year])
+    income = pd.DataFrame([[r * 100 for r in roic_by_year.values()], [0.0] * len(years), [1.0] * len(years)],
+                          index=['Operating Income', 'Tax Provision', 'Pretax Income'], columns=years)
+    balance = pd.DataFrame([[100.0] * len(years), [0.0] * len(years), [0.0] * len(years)],
+                           index=['Total Assets', 'Cash And Cash Equivalents', 'Current Liabilities'], columns=years)
+    return balance, income
+
+
+@pytest.fixture
+def data(tmp_path):
+    symbols = ['AAA', 'BBB', 'CCC']
+    matrix = PriceMatrix.create(str(tmp_path / 'prices'), symbols, date(2021, 1, 1), date(2021, 12, 31))
+    days = np.arange(len(matrix.dates))
+    matrix.write('AAA', pd.Series(10 * 1.001 ** days, index=matrix.dates))
+    matrix.write('BBB', pd.Series(20 * 0.999 ** days, index=matrix.dates))
+    matrix.write('CCC', pd.Series(30.0, index=matrix.dates))
+    matrix.flush()
+    book = pd.DataFrame({'Symbol': symbols, 'Available_Date': pd.Timestamp('2020-01-01'),
+                         'Book_Value_Per_Share': [10.0, 10.0, 10.0]})
+    panel = build_panel({'AAA': statements({2019: 0.1, 2020: 0.2}),
+                         'BBB': statements({2018: 0.3, 2019: 0.3}),
+                         'CCC': statements({2019: 0.5, 2020: -0.1})})
+    return bt.prepare_backtest_data(PriceMatrix(matrix.directory), book, panel, windows=(2, 4))
+
+
+def test_screen_uses_only_data_known_on_each_date(data):
+    assert len(data.dates) == 12 and data.dates[0] == pd.Timestamp('2021-01-29')
+    january, april = data.roic[4][0], data.roic[4][3]
+    # FY2020 is filed 90 days after year end, so January only knows FY2019
+    assert np.isnan(january[0]) and january[1] == pytest.approx(0.3) and np.isnan(january[2])
+    assert april[0] == pytest.approx((1.1 * 1.2) ** 0.5 - 1) and april[2] == pytest.approx(0.5)
+
+    result = bt.run_backtest(data, top_n=1, window=4)
+    assert result.weights[1].tolist() == [0, 1, 0]
+    assert result.weights[2].tolist() == [1, 0, 0]
+    assert result.turnover.iloc[0] == 0.5 and result.turnover.iloc[2] == 1.0 and result.turnover.iloc[5] == 0.0
+    expected = data.prices[1:, 1] / data.prices[:-1, 1] - 1
+    assert result.returns.iloc[0] == pytest.approx(expected[0])
+    assert result.summary['max_drawdown'] < 0
+    assert result.equity.iloc[-1] == pytest.approx(np.prod(1 + result.returns))
+
+
+def test_sweep_matches_single_runs(data):
+    grid = bt.parameter_grid(top_n=(1, 2), window=(2, 4), pb_cutoff=(None, 1.5))
+    sweep = bt.run_sweep(data, grid, processes=2)
+    assert len(sweep) == 8
+    for params, total_return in zip(grid, sweep['total_return']):
+        assert total_return == pytest.approx(bt.run_backtest(data, **params).summary['total_return'])
+    with pytest.raises(KeyError):
+        bt.run_sweep(data, bt.parameter_grid(window=(10,)), processes=1)
+
+
+def test_adjusted_returns_and_book_coverage(tmp_path, caplog):
+    symbols = ['AAA', 'BBB']
+    raw = PriceMatrix.create(str(tmp_path / 'prices'), symbols, date(2021, 1, 1), date(2021, 12, 31))
+    adjusted = PriceMatrix.create(str(tmp_path / 'adjusted'), symbols, date(2021, 1, 1), date(2021, 12, 31))
+    days = np.arange(len(raw.dates))
+    for symbol in symbols:
+        raw.write(symbol, pd.Series(10.0, index=raw.dates))
+        adjusted.write(symbol, pd.Series(10 * 1.001 ** days, index=raw.dates))
+    raw.flush()
+    adjusted.flush()
+    book = pd.DataFrame({'Symbol': symbols, 'Available_Date': pd.Timestamp('2021-06-15'),
+                         'Book_Value_Per_Share': [10.0, 5.0]})
+    panel = build_panel({'AAA': statements({2019: 0.1, 2020: 0.2})})
+
+    with caplog.at_level('WARNING', logger=bt.__name__):
+        data = bt.prepare_backtest_data(raw, book, panel, return_matrix=adjusted)
+    assert data.returns[0, 0] == pytest.approx(1.001 ** (np.flatnonzero(raw.dates == data.dates[1])[0] -
+                                                          np.flatnonzero(raw.dates == data.dates[0])[0]) - 1)
+    assert np.isnan(data.pb[:5]).all() and data.pb[5].tolist() == [1.0, 2.0]
+    assert 'only from 2021-06-30' in caplog.text and 'raw closes' not in caplog.text
+
+    caplog.clear()
+    with caplog.at_level('WARNING', logger=bt.__name__):
+        bt.prepare_backtest_data(raw, book, panel)
+    assert 'raw closes' in caplog.text
+    with pytest.raises(ValueError):
+        bt.prepare_backtest_data(raw, book, panel, return_matrix=PriceMatrix.create(
+            str(tmp_path / 'short'), symbols, date(2021, 1, 1), date(2021, 6, 30)))
+
+
+def test_rebalance_skips_month_ends_that_are_market_holidays(tmp_path):
+    symbols = ['AAA', 'BBB']
+    matrix = PriceMatrix.create(str(tmp_path / 'prices'), symbols, date(2024, 1, 1), date(2024, 6, 28))
+    closes = pd.Series(10 * 1.001 ** np.arange(len(matrix.dates)), index=matrix.dates)
+    holidays = pd.DatetimeIndex(['2024-01-01', '2024-03-29', '2024-05-27'])
+    for symbol in symbols:
+        matrix.write(symbol, closes.drop(holidays))
+    matrix.flush()
+    book = pd.DataFrame({'Symbol': symbols, 'Available_Date': pd.Timestamp('2023-01-01'),
+                         'Book_Value_Per_Share': [10.0, 5.0]})
+    data = bt.prepare_backtest_data(PriceMatrix(matrix.directory), book, build_panel({}), windows=(4,))
+
+    assert data.dates[2] == pd.Timestamp('2024-03-28')
+    assert np.isfinite(data.prices).all() and np.isfinite(data.pb).all()
+    assert np.isfinite(data.returns[:-1]).all()
+    assert data.returns[1, 0] == pytest.approx(closes['2024-03-28'] / closes['2024-02-29'] - 1)
+
+
+def test_universe_snapshots_limit_each_date_to_its_constituents(tmp_path, caplog):
+    root = str(tmp_path / 'universe')
+    save_snapshot('idx', ['AAA', 'DDD'], date(2021, 1, 1), root)
+    save_snapshot('idx', ['AAA', 'BBB'], date(2021, 6, 15), root)
+    symbols = ['AAA', 'BBB', 'CCC']
+    members = bt.universe_membership('idx', symbols, pd.DatetimeIndex(['2020-12-31', '2021-03-31', '2021-06-30']),
+                                     root)
+    assert members.tolist() == [[False, False, False], [True, False, False], [True, True, False]]
+    assert 'precede the first idx snapshot' in caplog.text and '1 past idx constituents' in caplog.text
+    matrix = PriceMatrix.create(str(tmp_path / 'prices'), symbols, date(2021, 1, 1), date(2021, 12, 31))
+    for symbol in symbols:
+        matrix.write(symbol, pd.Series(10.0, index=matrix.dates))
+    matrix.flush()
+    book = pd.DataFrame({'Symbol': symbols, 'Available_Date': pd.Timestamp('2020-01-01'),
+                         'Book_Value_Per_Share': [10.0, 10.0, 10.0]})
+    data = bt.prepare_backtest_data(matrix, book, build_panel({}), universe='idx', universe_root=root)
+    assert np.isfinite(data.pb).tolist() == [[True, month >= 5, False] for month in range(12)]
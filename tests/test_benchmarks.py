@@ -0,0 +1,21 @@
+import pytest
+from benchmarks import run_benchmarks as rb
+from benchmarks.fake_yfinance import FakeMarket, synthetic_info
+
+
+def test_fake_market_is_deterministic_and_injects_faults():
+    assert synthetic_info('S00001') == synthetic_info('S00001')
+    market = FakeMarket(rate_limit_rate=1.0)
+    with pytest.raises(Exception, match='Too Many Requests'):
+        market.ticker('S00001').info
+    assert market.calls['info'] == 1
+
+
+def test_run_case_reports_throughput(monkeypatch):
+    monkeypatch.setenv('TQDM_DISABLE', '1')
+    options = {'latency': 0.0, 'error_rate': 0.0, 'rate_limit_rate': 0.0, 'workers': 2}
+    result = rb.run_case('main_roic_analysis', 20, options)
+    assert result['n'] == 20
+    assert result['remote_calls'] >= 20 * 3
+    assert result['calls_per_s'] == pytest.approx(result['remote_calls'] / result['wall_s'], rel=0.01)
+    assert result['tickers_per_s'] == pytest.approx(20 / result['wall_s'], rel=0.01)
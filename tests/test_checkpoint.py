@@ -0,0 +1,53 @@
+import pandas as pd
+from unittest.mock import patch
+from src.siegfried import ticker_snapshot as ts
+from src.siegfried import find_hidden_cheap_goods_in_rubbish as fhc
+from src.siegfried.checkpoint import ScreenCheckpoint
+from benchmarks.fake_yfinance import FakeMarket, synthetic_symbols
+
+
+def test_rerun_resumes_from_checkpoint(tmp_path):
+    path = str(tmp_path / 'checkpoint_20250101.csv')
+    symbols = synthetic_symbols(10)
+    market = FakeMarket()
+    with patch.object(ts, 'make_yf_ticker', market.ticker):
+        fhc.screen_symbols(symbols[:6], checkpoint=ScreenCheckpoint(path))
+        calls_after_crash = market.calls['info']
+        resumed = fhc.screen_symbols(symbols, workers=3, checkpoint=ScreenCheckpoint(path))
+        in_memory = fhc.screen_symbols(symbols)
+
+    assert market.calls['info'] - calls_after_crash == 4 + 10
+    assert list(resumed['Symbol']) == symbols
+    pd.testing.assert_frame_equal(resumed, in_memory[resumed.columns], check_dtype=False)
+
+
+def test_partial_last_line_is_dropped(tmp_path):
+    path = tmp_path / 'checkpoint.csv'
+    path.write_text('Symbol,4Y_Geometric_Avg_ROIC,Status,Years_Available,PB_Ratio\n'
+                    'AAA,0.1,Success,4,1.5\n'
+                    'BBB,0.2,Succ')
+    checkpoint = ScreenCheckpoint(str(path))
+    assert checkpoint.completed_symbols() == {'AAA'}
+    checkpoint.append({'Symbol': 'BBB', 'Status': 'Error/No Data'})
+    checkpoint.close()
+    assert list(checkpoint.read()['Status']) == ['Success', 'Error/No Data']
+
+
+def test_failed_symbols_are_retried_on_resume(tmp_path):
+    path = tmp_path / 'checkpoint.csv'
+    path.write_text('Symbol,4Y_Geometric_Avg_ROIC,Status,Years_Available,PB_Ratio\n'
+                    'AAA,0.1,Success,4,1.5\n'
+                    'BBB,,Error: Too Many Requests. Rate limited.,,\n'
+                    'CCC,,Error: timeout,,\n'
+                    'CCC,0.2,Success,4,2.0\n'
+                    'DDD,,Insufficient Data (1 years),1,\n')
+    assert ScreenCheckpoint(str(path)).completed_symbols() == {'AAA', 'CCC', 'DDD'}
+
+    symbols = synthetic_symbols(3)
+    market = FakeMarket()
+    path.write_text('Symbol,4Y_Geometric_Avg_ROIC,Status,Years_Available,PB_Ratio\n'
+                    f'{symbols[1]},,Error: Too Many Requests. Rate limited.,,\n')
+    with patch.object(ts, 'make_yf_ticker', market.ticker):
+        resumed = fhc.screen_symbols(symbols, checkpoint=ScreenCheckpoint(str(path)))
+    assert market.calls['info'] == 3
+    assert not resumed['Status'].str.startswith('Error: Too Many').any()
@@ -0,0 +1,62 @@
+import subprocess
+import sys
+from decimal import Decimal, ROUND_DOWN, getcontext
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+from src.siegfried import dcf_calculator as dcf
+from src.siegfried import ticker_snapshot as ts
+from benchmarks.fake_yfinance import FakeMarket, synthetic_info
+
+getcontext().prec = 60
+SCALE = Decimal('1e-10')
+
+
+def bc_dcf(eps, book_value, treasury_yield, years=30):
+    """calculatedcf.sh step by step, truncating to scale=10 like bc does"""
+    r = (Decimal(treasury_yield) / 100).quantize(SCALE, rounding=ROUND_DOWN)
+    pv_factor = Decimal(0)
+    for t in range(1, years + 1):
+        denominator = ((1 + r) ** t).quantize(SCALE, rounding=ROUND_DOWN)
+        pv_factor += (1 / denominator).quantize(SCALE, rounding=ROUND_DOWN)
+    eps_present_value = (Decimal(eps) * pv_factor).quantize(SCALE, rounding=ROUND_DOWN)
+    return float(Decimal(book_value) + eps_present_value)
+
+
+def test_matches_shell_script_to_the_cent():
+    cases = [('5.12', '23.40', '4.35'), ('0.87', '3.10', '1.2'), ('15', '120.5', '5'),
+             ('-2.3', '18', '3.9'), ('31.07', '250', '0.5')]
+    for eps, book_value, treasury_yield in cases:
+        value = dcf.dcf_value(float(eps), float(book_value), float(treasury_yield))
+        assert round(float(value), 2) == round(bc_dcf(eps, book_value, treasury_yield), 2)
+
+
+def test_grid_broadcasts_tickers_yields_and_horizons():
+    eps = np.array([1.0, 2.0, 3.0])
+    book = np.array([10.0, 20.0, 30.0])
+    yields = np.array([0.0, 2.5, 5.0, 7.5])
+    horizons = np.array([10, 30])
+    grid = dcf.dcf_grid(eps, book, yields, horizons)
+
+    assert grid.shape == (3, 4, 2)
+    assert grid[1, 0, 1] == 20.0 + 2.0 * 30
+    assert np.isclose(grid[2, 2, 0], dcf.dcf_value(3.0, 30.0, 5.0, 10))
+
+
+def test_values_universe_from_snapshot_info():
+    with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker):
+        inputs = dcf.load_dcf_inputs(['S00001', 'S00002'])
+    assert inputs['EPS'].iloc[0] == synthetic_info('S00001')['trailingEps']
+
+    table = dcf.value_universe(inputs, [4.0, 5.0], [30])
+    assert list(table.columns) == ['Symbol', 'Treasury_Yield_Pct', 'Horizon', 'DCF_Value']
+    assert len(table) == 4
+    expected = dcf.dcf_value(inputs['EPS'].iloc[1], inputs['Book_Value'].iloc[1], 5.0)
+    assert table['DCF_Value'].iloc[3] == expected
+
+
+def test_dcf_module_imports_without_pandas():
+    code = ("import sys, src.siegfried.dcf_calculator as dcf; dcf.dcf_value(1.0, 10.0, 4.0); "
+            "print(','.join(m for m in ('pandas', 'yfinance', 'sqlite3') if m in sys.modules))")
+    loaded = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert loaded.strip() == ''
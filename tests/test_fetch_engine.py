@@ -0,0 +1,78 @@
+import time
+import pandas as pd
+from unittest.mock import patch
+import pytest
+from src.siegfried import fetch_engine as fe
+from src.siegfried import find_hidden_cheap_goods_in_rubbish as fhc
+from src.siegfried import roic_calculator as rc
+
+
+class YFRateLimitError(Exception):
+    pass
+
+
+def test_imap_ordered_keeps_input_order():
+    def slow_square(x):
+        time.sleep(0.01 * (5 - x % 5))
+        return x * x
+
+    assert fe.map_ordered(slow_square, range(20), workers=4) == [x * x for x in range(20)]
+
+
+def test_call_with_retry_retries_only_rate_limits():
+    calls = []
+
+    def flaky(x):
+        calls.append(x)
+        if len(calls) < 3:
+            raise YFRateLimitError("Too Many Requests. Rate limited.")
+        return x
+
+    with patch.object(fe, 'compute_backoff', return_value=0):
+        assert fe.call_with_retry(flaky, 7, retries=3) == 7
+    assert len(calls) == 3
+
+    def broken(x):
+        calls.append(x)
+        raise ValueError("bad data")
+
+    calls.clear()
+    with pytest.raises(ValueError):
+        fe.call_with_retry(broken, 1, retries=3)
+    assert len(calls) == 1
+
+
+def test_rate_limits_propagate_from_calculators():
+    # A rate limit must reach call_with_retry, so calculate_roic raises it
+    # instead of folding it into an error dict like other failures
+    class Throttled:
+        @property
+        def balance_sheet(self):
+            raise YFRateLimitError("Too Many Requests. Rate limited.")
+
+    with pytest.raises(YFRateLimitError):
+        rc.calculate_roic('UNH', Throttled())
+
+    class Broken:
+        @property
+        def balance_sheet(self):
+            raise ValueError("bad data")
+
+    assert rc.calculate_roic('UNH', Broken()) == {"ticker": 'UNH', "roic": None, "error": "bad data"}
+
+
+def test_parallel_table_matches_serial():
+    def fake_roic(ticker, snapshot=None):
+        if ticker == 'BAD':
+            return {"ticker": ticker, "roic_data": [], "error": "No financial data available"}
+        if ticker == 'BOOM':
+            raise ValueError("boom")
+        return {"ticker": ticker, "roic_data": [{'roic': 0.1}, {'roic': 0.2}, {'roic': None}]}
+
+    symbols = ['AAPL', 'BAD', 'MSFT', 'BOOM', 'UNH'] * 4
+    with patch.object(fhc, 'calculate_four_year_rolling_roic', side_effect=fake_roic):
+        serial = fhc.process_all_symbols_and_build_table(symbols)
+        parallel = fhc.process_all_symbols_and_build_table(symbols, workers=4,
+                                                           limiter=fe.RateLimiter(1000, burst=4))
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert list(parallel['Status'][:4]) == ['Success', 'Error/No Data', 'Success', 'Error: boom']
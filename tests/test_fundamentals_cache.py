@@ -0,0 +1,94 @@
+import time
+from datetime import timedelta
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from benchmarks.fake_yfinance import FakeMarket, synthetic_symbols
+from src.siegfried import fetch_engine
+from src.siegfried import find_hidden_cheap_goods_in_rubbish as fhc
+from src.siegfried import fundamentals_cache as fc
+from src.siegfried import ticker_snapshot as ts
+
+
+def make_statement():
+    years = pd.to_datetime(['2024-12-31', '2023-12-31'])
+    return pd.DataFrame({years[0]: [1000.0, float('nan')], years[1]: [900.0, 50.0]},
+                        index=['Total Assets', 'Cash And Cash Equivalents'])
+
+
+def test_statement_round_trip(tmp_path):
+    cache = fc.FundamentalsCache(str(tmp_path / 'cache.sqlite'))
+    statement = make_statement()
+    cache.put('UNH', 'balance_sheet', statement)
+    cache.put('UNH', 'info', {'currentPrice': 500.0, 'priceToBook': 3.1})
+    cache.put('EMPTY', 'financials', pd.DataFrame())
+
+    pd.testing.assert_frame_equal(cache.get('UNH', 'balance_sheet'), statement, check_freq=False)
+    assert cache.get('UNH', 'info') == {'currentPrice': 500.0, 'priceToBook': 3.1}
+    assert cache.get('EMPTY', 'financials').empty
+    assert cache.get('MISSING', 'financials') is None
+
+    splits = pd.Series([4.0], index=pd.DatetimeIndex(['2020-08-31']).tz_localize('America/New_York'))
+    cache.put('AAPL', 'splits', splits)
+    cache.put('UNH', 'splits', pd.Series(dtype=float))
+    assert cache.get('AAPL', 'splits').to_dict() == {pd.Timestamp('2020-08-31'): 4.0}
+    assert cache.get('UNH', 'splits').empty
+
+
+def test_ttl_and_offline_mode(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = fc.FundamentalsCache(path, ttl={'info': timedelta(seconds=0)})
+    cache.put('UNH', 'info', {'currentPrice': 500.0})
+    assert cache.get('UNH', 'info') is None
+
+    fetched = []
+    assert cache.get_or_fetch('UNH', 'info', lambda: fetched.append(1) or {'currentPrice': 1.0})
+    assert fetched == [1]
+
+    offline = fc.FundamentalsCache(path, offline=True)
+    assert offline.get('UNH', 'info') == {'currentPrice': 1.0}
+    with pytest.raises(fc.OfflineCacheMiss):
+        offline.get_or_fetch('MSFT', 'info', lambda: pytest.fail("offline mode must not fetch"))
+
+
+def test_empty_statement_uses_negative_ttl(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = fc.FundamentalsCache(path, negative_ttl=timedelta(seconds=0))
+    cache.put('EMPTY', 'financials', pd.DataFrame())
+    cache.put('UNH', 'financials', make_statement())
+    cache.put('UNH', 'splits', pd.Series(dtype=float))
+
+    assert cache.get('EMPTY', 'financials') is None
+    assert cache.get('UNH', 'financials') is not None
+    assert cache.get('UNH', 'splits').empty
+    assert fc.FundamentalsCache(path, offline=True).get('EMPTY', 'financials').empty
+
+
+def test_warm_run_makes_no_remote_calls_or_limiter_waits(tmp_path, monkeypatch):
+    monkeypatch.setenv('TQDM_DISABLE', '1')
+    market = FakeMarket()
+    cache = fc.FundamentalsCache(str(tmp_path / 'cache.sqlite'))
+    symbols = synthetic_symbols(5)
+    with patch.object(ts, 'make_yf_ticker', market.ticker):
+        fhc.screen_symbols(symbols, 2, fetch_engine.RateLimiter(1000, burst=2), cache=cache)
+        cold_calls = market.total_calls()
+        limiter = fetch_engine.RateLimiter(1000, burst=2)
+        with patch.object(limiter, 'acquire') as acquire:
+            warm = fhc.screen_symbols(symbols, 2, limiter, cache=cache)
+
+    assert cold_calls > 0
+    assert acquire.call_count == 0
+    assert market.total_calls() == cold_calls
+    assert list(warm['Symbol']) == symbols
+
+
+def test_evict_by_size_drops_oldest(tmp_path):
+    cache = fc.FundamentalsCache(str(tmp_path / 'cache.sqlite'))
+    for ticker in ['OLD', 'MID', 'NEW']:
+        cache.put(ticker, 'balance_sheet', make_statement())
+        time.sleep(0.01)
+    per_entry = cache.size() // 3
+
+    assert cache.evict(max_bytes=per_entry * 2) == 1
+    assert cache.get('OLD', 'balance_sheet') is None
+    assert cache.get('NEW', 'balance_sheet') is not None
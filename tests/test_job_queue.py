@@ -0,0 +1,112 @@
+import threading
+import time
+from datetime import date
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from src.siegfried import job_queue as jq
+from src.siegfried import metrics
+from src.siegfried import ticker_snapshot as ts
+from src.siegfried import find_hidden_cheap_goods_in_rubbish as fhc
+from src.siegfried.screen_state import ScreenState
+from benchmarks.fake_yfinance import FakeMarket, synthetic_symbols
+
+
+def test_leases_expire_and_failures_retry(tmp_path):
+    queue = jq.JobQueue(str(tmp_path / 'jobs.sqlite'), lease_seconds=0.05, max_attempts=2)
+    assert queue.enqueue(['A', 'B', 'C'], unit_size=2) == 2
+    assert queue.enqueue(['A', 'B', 'C'], unit_size=2) == 0
+
+    first = queue.claim('w1')
+    second = queue.claim('w2')
+    assert (first.symbols, second.symbols) == (['A', 'B'], ['C'])
+    assert queue.claim('w3') is None and not queue.is_finished()
+
+    time.sleep(0.1)
+    assert not queue.renew(first.id, 'w3')
+    retried = queue.claim('w3')
+    assert retried.id == first.id and retried.attempts == 2
+    queue.complete(retried.id, [{'Symbol': 'A', 'Status': 'Success'}, {'Symbol': 'B', 'Status': 'Success'}])
+
+    queue.fail(second.id, 'w1', 'not the owner')
+    assert queue.counts() == {'done': 1, 'leased': 1}
+    queue.fail(second.id, 'w2', 'boom')
+    queue.fail(queue.claim('w2').id, 'w2', 'boom again')
+    assert queue.counts() == {'done': 1, 'failed': 1} and queue.is_finished()
+
+    results = queue.results(['C', 'A', 'B'])
+    assert results['Symbol'].tolist() == ['C', 'A', 'B']
+    assert results['Status'].tolist() == ['Error/No Data', 'Success', 'Success']
+
+
+def test_sharded_workers_merge_to_the_single_process_table(tmp_path):
+    symbols = synthetic_symbols(12)
+    path = str(tmp_path / 'jobs.sqlite')
+    with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker):
+        expected = fhc.screen_symbols(symbols, workers=2)
+        jq.JobQueue(path).enqueue(symbols, unit_size=5)
+        done = []
+        workers = [threading.Thread(target=lambda i=i: done.append(
+            jq.run_worker(path, workers=2, owner=f'w{i}', poll_seconds=0.01))) for i in range(2)]
+        for worker in workers:
+            worker.start()
+        merged = jq.run_sharded_screen(symbols, processes=0, queue_path=path, poll_seconds=0.01)
+        for worker in workers:
+            worker.join()
+
+    assert sum(done) == 3
+    pd.testing.assert_frame_equal(merged[expected.columns], expected, check_dtype=False)
+
+
+def test_units_with_error_rows_are_retried_without_losing_good_rows(tmp_path):
+    queue = jq.JobQueue(str(tmp_path / 'jobs.sqlite'), max_attempts=3)
+    queue.enqueue(['A', 'B'], unit_size=2)
+
+    unit = queue.claim('w1')
+    queue.complete(unit.id, [{'Symbol': 'A', 'Status': 'Success'}, {'Symbol': 'B', 'Status': 'Error: 429 Too Many Requests'}])
+    assert queue.counts() == {'pending': 1}
+
+    unit = queue.claim('w1')
+    queue.complete(unit.id, [{'Symbol': 'A', 'Status': 'Error/No Data'}, {'Symbol': 'B', 'Status': 'Success'}])
+    assert queue.counts() == {'pending': 1}
+    assert queue.results(['A', 'B'])['Status'].tolist() == ['Success', 'Success']
+
+    unit = queue.claim('w1')
+    queue.complete(unit.id, [{'Symbol': 'A', 'Status': 'Error: 429'}, {'Symbol': 'B', 'Status': 'Error: 429'}])
+    assert unit.attempts == 3 and queue.counts() == {'done': 1}
+    assert queue.results(['A', 'B'])['Status'].tolist() == ['Success', 'Success']
+
+
+def test_worker_process_metrics_are_merged(tmp_path):
+    symbols = synthetic_symbols(6)
+    metrics.reset()
+    metrics.enable()
+    try:
+        with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker):
+            jq.run_sharded_screen(symbols, processes=1, queue_path=str(tmp_path / 'jobs.sqlite'),
+                                  unit_size=3, workers=2, poll_seconds=0.01)
+        statuses = metrics.summary()['counters']['ticker_status_total']
+    finally:
+        metrics.disable()
+        metrics.reset()
+    assert sum(c['value'] for c in statuses) == 6
+
+
+def test_queue_rejects_a_different_symbol_list(tmp_path):
+    queue = jq.JobQueue(str(tmp_path / 'jobs.sqlite'))
+    assert queue.enqueue(['A', 'B', 'C'], unit_size=2) == 2
+    assert queue.enqueue(['A', 'B', 'C'], unit_size=3) == 0
+    with pytest.raises(ValueError):
+        queue.enqueue(['A', 'B', 'D'], unit_size=2)
+    assert queue.counts() == {'pending': 2}
+
+    day = date(2025, 1, 2)
+    assert jq.default_queue_path(day, symbols=['A', 'B']) == jq.default_queue_path(day, symbols=['A', 'B'])
+    assert jq.default_queue_path(day, symbols=['A', 'B']) != jq.default_queue_path(day, symbols=['A', 'B', 'C'])
+
+
+def test_sharded_screen_refuses_state_and_checkpoint(tmp_path):
+    with pytest.raises(ValueError):
+        fhc.main_roic_analysis(5, processes=2, checkpoint_path=str(tmp_path / 'checkpoint.csv'))
+    with pytest.raises(ValueError):
+        fhc.main_roic_analysis(5, queue_path=str(tmp_path / 'jobs.sqlite'), state=ScreenState(str(tmp_path / 'state')))
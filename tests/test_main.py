@@ -0,0 +1,54 @@
+import subprocess
+import sys
+from unittest.mock import patch
+import pandas as pd
+import main
+from src.siegfried import ticker_snapshot as ts
+from benchmarks.fake_yfinance import FakeMarket
+
+
+def test_cheap_imports_skip_heavy_dependencies():
+    code = ("import sys, main, src.siegfried.roic_calculator as rc; "
+            "assert rc.calculate_nopat(100, 20, 80) == 75.0; "
+            "print(','.join(m for m in ('matplotlib', 'yfinance', 'numpy') if m in sys.modules))")
+    loaded = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert loaded.strip() == ''
+
+
+def test_roic_module_still_exposes_plotting():
+    from src.siegfried import roic_calculator as rc
+    from src.siegfried import roic_plot
+    assert rc.plot_roic_time_series is roic_plot.plot_roic_time_series
+
+
+def test_pb_command(caplog):
+    caplog.set_level('INFO')
+    with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker):
+        main.main(['--no-cache', 'pb', 'S00001'])
+    assert 'S00001 P/B:' in caplog.text
+
+
+def test_screen_arguments():
+    args = main.build_parser().parse_args(['--offline', 'screen', '--k', '10', '--incremental'])
+    assert args.func is main.run_screen
+    assert (args.k, args.incremental, args.offline, args.workers) == (10, True, True, 8)
+
+
+def test_history_arguments():
+    args = main.build_parser().parse_args(['screen', '--history'])
+    assert args.history == 'src/report/history'
+    args = main.build_parser().parse_args(['history', 'drift', '--start', '2025-01-01', '--symbols', 'UNH'])
+    assert args.func is main.run_history and args.action == 'drift'
+
+
+def test_pb_history_writes_a_new_file(tmp_path):
+    symbols = ['S00001', 'S00002']
+    source = tmp_path / 'high_roic_company_20250101.csv'
+    pd.DataFrame({'Symbol': symbols, 'PB_Ratio': [1.0, 2.0]}).to_csv(source)
+    original = source.read_text()
+    with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker):
+        main.main(['--no-cache', 'pb-history', str(source), '--price-dir', str(tmp_path / 'prices'),
+                   '--years', '2', '--workers', '2'])
+    assert source.read_text() == original
+    written = pd.read_csv(tmp_path / 'high_roic_company_20250101_pb_history.csv', index_col=0)
+    assert written['Symbol'].tolist() == symbols and 'PB_First_Date' in written
@@ -0,0 +1,56 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+import pandas as pd
+from src.siegfried import metrics
+from src.siegfried import pb_calculator as pc
+from src.siegfried import ticker_snapshot as ts
+from src.siegfried import find_hidden_cheap_goods_in_rubbish as fhc
+from benchmarks.fake_yfinance import FakeMarket, synthetic_symbols
+
+
+def test_hooks_are_noops_when_disabled():
+    metrics.disable()
+    metrics.reset()
+    metrics.increment('remote_calls_total', kind='info')
+    metrics.observe('ticker_seconds', 0.2)
+    with metrics.timer('universe'):
+        pass
+    assert metrics.summary() == {'stages': {}, 'counters': {}, 'histograms': {}, 'cache_hit_ratio': None}
+
+
+def test_run_dumps_json_and_prometheus(tmp_path):
+    market = FakeMarket()
+    symbols = synthetic_symbols(10)
+    metrics.enable()
+    metrics.increment('remote_calls_total', 99, kind='info')
+    with patch.object(ts, 'make_yf_ticker', market.ticker), \
+            patch.object(fhc, 'load_all_symbols', lambda k, *args: symbols[:k]):
+        fhc.main_roic_analysis(10, metrics_dir=str(tmp_path))
+    assert not metrics.is_enabled()
+
+    json_file = next(tmp_path.glob('metrics_*.json'))
+    summary = json.loads(json_file.read_text())
+    assert set(summary['stages']) >= {'universe', 'fetch_and_compute', 'post_processing'}
+    remote_calls = sum(c['value'] for c in summary['counters']['remote_calls_total'])
+    assert remote_calls == market.total_calls()
+    assert summary['histograms']['ticker_seconds'][0]['count'] == 10
+
+    prom = next(tmp_path.glob('metrics_*.prom')).read_text()
+    assert 'siegfried_remote_calls_total{kind="info"} 10' in prom
+    assert 'siegfried_ticker_seconds_bucket{mode="full",le="+Inf"} 10' in prom
+
+
+def test_pb_path_counts_only_the_path_that_returned():
+    metrics.reset()
+    metrics.enable()
+    try:
+        info = {'currentPrice': 50.0, 'sharesOutstanding': 10.0}
+        pc.calculate_pb('NONE', SimpleNamespace(info=info, quarterly_balance_sheet=pd.DataFrame()))
+        sheet = pd.DataFrame({pd.Timestamp('2025-03-31'): {'Common Stock Equity': 100.0}})
+        assert pc.calculate_pb('QBS', SimpleNamespace(info=info, quarterly_balance_sheet=sheet)) == 5.0
+        counters = {c['labels']['path']: c['value'] for c in metrics.summary()['counters']['pb_path_total']}
+    finally:
+        metrics.disable()
+        metrics.reset()
+    assert counters == {'none': 1, 'quarterly_balance_sheet': 1}
@@ -0,0 +1,94 @@
+from datetime import date
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import pytest
+from src.siegfried import pb_history as ph
+from src.siegfried import ticker_snapshot as ts
+from benchmarks.fake_yfinance import FakeMarket, synthetic_symbols
+
+
+def small_matrix(tmp_path):
+    matrix = ph.PriceMatrix.create(str(tmp_path / 'prices'), ['AAA', 'BBB', 'CCC'], date(2024, 1, 1), date(2024, 1, 12))
+    matrix.write('AAA', pd.Series(np.arange(10, 20, dtype=float), index=matrix.dates))
+    matrix.write('BBB', pd.Series([50.0, 40.0], index=pd.to_datetime(['2024-01-02', '2024-01-10']).tz_localize('UTC')))
+    matrix.flush()
+    return ph.PriceMatrix(str(tmp_path / 'prices'))
+
+
+def test_asof_join_uses_book_value_known_on_each_day(tmp_path):
+    matrix = small_matrix(tmp_path)
+    book = pd.DataFrame({'Symbol': ['AAA', 'AAA', 'BBB', 'ZZZ'],
+                         'Available_Date': pd.to_datetime(['2024-01-05', '2023-06-30', '2024-01-01', '2024-01-01']),
+                         'Book_Value_Per_Share': [5.0, 10.0, -1.0, 1.0]})
+
+    pb = ph.daily_pb(matrix, book, 'AAA')
+    assert pb.iloc[0] == 1.0 and pb.loc['2024-01-04'] == 1.3 and pb.loc['2024-01-05'] == 14 / 5
+    assert ph.daily_pb(matrix, book, 'BBB').empty
+
+    history = ph.pb_history(matrix, book, block=2)
+    aaa = history.set_index('Symbol').loc['AAA']
+    assert aaa['PB_Latest'] == 19 / 5 and aaa['PB_Percentile'] == 100.0 and aaa['PB_Observations'] == 10
+    assert aaa['PB_ZScore'] == pytest.approx((pb.iloc[-1] - pb.mean()) / pb.std(ddof=0))
+    assert history['PB_Observations'].tolist() == [10, 0, 0]
+
+
+def test_history_columns_sit_next_to_pb_ratio(tmp_path):
+    symbols = synthetic_symbols(5)
+    with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker):
+        matrix = ph.build_price_matrix(symbols, str(tmp_path / 'prices'), years=2, workers=2)
+        book = ph.load_book_values(symbols, workers=2)
+    history = ph.pb_history(ph.PriceMatrix(matrix.directory), book, symbols[::-1])
+    assert history['Symbol'].tolist() == symbols[::-1]
+    assert (history['PB_Observations'] > 0).all()
+    assert history['PB_Percentile'].between(0, 100).all()
+
+    results = pd.DataFrame({'Symbol': symbols, 'PB_Ratio': 1.0, 'Status': 'Success'})
+    merged = ph.attach_pb_history(results, history)
+    assert list(merged.columns[:3]) == ['Symbol', 'PB_Ratio', 'PB_Latest']
+    assert merged['Symbol'].tolist() == symbols
+
+
+def test_sec_store_extends_book_value_coverage(tmp_path):
+    class Store:
+        def __contains__(self, symbol):
+            return symbol == 'AAA'
+
+        def snapshot(self, symbol):
+            years = pd.to_datetime(['2023-12-31', '2022-12-31'])
+            balance = pd.DataFrame([[200.0, 100.0], [10.0, 10.0]], index=['Stockholders Equity', 'Ordinary Shares Number'],
+                                   columns=years)
+            return type('Snapshot', (), {'balance_sheet': balance})()
+
+    with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker):
+        quarterly = ph.load_book_values(['AAA'])
+        book = ph.load_book_values(['AAA'], sec_store=Store())
+    assert len(book) == len(quarterly) + 2
+    assert book['Available_Date'].iloc[0] == pd.Timestamp('2022-12-31') + ph.ANNUAL_REPORTING_LAG
+    assert book['Book_Value_Per_Share'].iloc[0] == 10.0
+
+    matrix = ph.PriceMatrix.create(str(tmp_path / 'prices'), ['AAA'], date(2023, 1, 2), date(2025, 6, 30))
+    matrix.write('AAA', pd.Series(20.0, index=matrix.dates))
+    matrix.flush()
+    short = ph.pb_history(matrix, quarterly).iloc[0]
+    long = ph.pb_history(matrix, book).iloc[0]
+    assert long['PB_First_Date'] == pd.Timestamp('2023-03-31')
+    assert short['PB_First_Date'] > pd.Timestamp('2024-06-01')
+    assert long['PB_Observations'] > short['PB_Observations']
+
+
+def test_book_values_are_restated_for_later_splits():
+    symbols = synthetic_symbols(2)
+    split = pd.Series([4.0], index=pd.DatetimeIndex(['2025-01-15']).tz_localize('America/New_York'))
+    with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker):
+        plain = ph.load_book_values(symbols)
+    with patch.object(ts, 'make_yf_ticker', FakeMarket(splits={symbols[0]: split}).ticker):
+        restated = ph.load_book_values(symbols)
+
+    ratio = restated['Book_Value_Per_Share'] / plain['Book_Value_Per_Share']
+    before_split = (restated['Symbol'] == symbols[0]) & (restated['Available_Date'] < pd.Timestamp('2025-03-01'))
+    assert before_split.sum() == 3
+    assert ratio[before_split].tolist() == pytest.approx([0.25] * 3)
+    assert ratio[~before_split].tolist() == pytest.approx([1.0] * (~before_split).sum())
+    assert ph.split_factors(pd.Series([2.0, 3.0], index=pd.to_datetime(['2020-06-01', '2022-06-01'])),
+                            pd.to_datetime(['2019-12-31', '2021-12-31', '2022-06-01'])).tolist() == [6.0, 3.0, 1.0]
@@ -0,0 +1,84 @@
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import pytest
+from src.siegfried import ranking as rk
+from src.siegfried import ticker_snapshot as ts
+from src.siegfried.find_hidden_cheap_goods_in_rubbish import sort_by_pb_and_roic
+from benchmarks.fake_yfinance import FakeMarket, synthetic_symbols
+
+
+def brute_force_layers(pb, roic):
+    layers = np.full(len(pb), -1)
+    remaining = {i for i in range(len(pb)) if np.isfinite(pb[i]) and np.isfinite(roic[i])}
+    layer = 0
+    while remaining:
+        front = {i for i in remaining
+                 if not any(pb[j] <= pb[i] and roic[j] >= roic[i] and (pb[j], roic[j]) != (pb[i], roic[i])
+                            for j in remaining)}
+        for i in front:
+            layers[i] = layer
+        remaining -= front
+        layer += 1
+    return layers
+
+
+def screen_table(n, seed=0):
+    rng = np.random.default_rng(seed)
+    pb = np.round(rng.uniform(0.5, 5, n), 1)
+    roic = np.round(rng.uniform(-0.1, 0.4, n), 2)
+    pb[::17] = np.nan
+    return pd.DataFrame({'Symbol': [f'S{i}' for i in range(n)], 'PB_Ratio': pb,
+                         '4Y_Geometric_Avg_ROIC': roic, 'Status': 'Success'})
+
+
+def test_pareto_layers_match_brute_force_with_ties():
+    df = screen_table(300)
+    pb, roic = df['PB_Ratio'].to_numpy(), df['4Y_Geometric_Avg_ROIC'].to_numpy()
+    assert (rk.pareto_layers(pb, roic) == brute_force_layers(pb, roic)).all()
+    assert rk.pareto_layers([1.0, 1.0, 2.0], [0.2, 0.2, 0.2]).tolist() == [0, 0, 1]
+
+
+def test_top_n_and_composite_score():
+    values = np.array([3.0, np.nan, 9.0, 1.0, 7.0])
+    assert rk.top_n(values, 2).tolist() == [2, 4]
+    assert rk.top_n(values, 2, ascending=True).tolist() == [3, 0]
+    assert rk.top_n(values, 10).tolist() == [2, 4, 0, 3]
+
+    df = pd.DataFrame({'PB_Ratio': [1.0, 2.0, 3.0, np.nan], '4Y_Geometric_Avg_ROIC': [0.1, 0.3, 0.2, 0.5]})
+    score = rk.composite_score(df)
+    assert score.iloc[0] == pytest.approx((1.0 + 1 / 3) / 2)
+    assert np.isnan(score.iloc[3])
+
+
+def test_ranking_index_queries_match_full_sorts():
+    df = screen_table(500, seed=1)
+    index = rk.RankingIndex(df)
+    legacy = sort_by_pb_and_roic(df)
+    assert index.query()['Symbol'].tolist() == legacy['Symbol'].tolist()
+
+    expected = legacy[(legacy['PB_Ratio'] <= 2.0) & (legacy['4Y_Geometric_Avg_ROIC'] > 0.15)]
+    assert index.query(max_pb=2.0, min_roic=0.15)['Symbol'].tolist() == expected['Symbol'].tolist()
+
+    by_roic = df.sort_values(['4Y_Geometric_Avg_ROIC', 'PB_Ratio'], ascending=[False, True], kind='stable')
+    by_roic = by_roic[(by_roic['4Y_Geometric_Avg_ROIC'] > 0.2) & (by_roic['PB_Ratio'] <= 3.0)]
+    assert index.query(max_pb=3.0, min_roic=0.2, order='roic')['Symbol'].tolist() == by_roic['Symbol'].tolist()
+
+    frontier = index.frontier()
+    assert (frontier['Pareto_Layer'] == 0).all() and frontier['PB_Ratio'].is_monotonic_increasing
+    assert frontier['4Y_Geometric_Avg_ROIC'].is_monotonic_increasing
+    assert index.query(n=5, order='pareto')['Pareto_Layer'].tolist()[0] == 0
+    with pytest.raises(ValueError):
+        index.query(order='alpha')
+
+
+def test_sector_top_n_uses_info_sectors():
+    symbols = synthetic_symbols(12)
+    with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker):
+        sectors = rk.load_sectors(symbols, workers=3)
+    df = pd.DataFrame({'Symbol': symbols, 'Sector': [sectors[s] for s in symbols],
+                       'Composite_Score': np.linspace(0, 1, len(symbols))})
+    best = rk.sector_top_n(df, 'Composite_Score', 1)
+    assert best['Sector'].tolist() == sorted(set(sectors.values()))
+    for _, row in best.iterrows():
+        assert row['Composite_Score'] == df[df['Sector'] == row['Sector']]['Composite_Score'].max()
@@ -0,0 +1,88 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+import pytest
+from src.siegfried import report_history as rh
+from src.siegfried.find_hidden_cheap_goods_in_rubbish import format_geometric_mean_roic_to_percentage
+
+
+def result_table(pb, roic, symbols=('AAA', 'BBB', 'CCC', 'DDD')):
+    return pd.DataFrame({'Symbol': list(symbols), '4Y_Geometric_Avg_ROIC': roic, 'Status': 'Success',
+                         'Years_Available': 4, 'PB_Ratio': pb})
+
+
+def test_parse_pct():
+    assert rh.parse_pct('12.5%') == pytest.approx(0.125)
+    assert rh.parse_pct('-3.00%') == pytest.approx(-0.03)
+    for missing in ('N/A', 'nan%', '', None, float('nan')):
+        assert np.isnan(rh.parse_pct(missing))
+
+
+def test_append_scan_and_drift(tmp_path):
+    history = rh.ReportHistory(str(tmp_path / 'history'))
+    day1 = result_table([1.0, 2.0, 3.0, 4.0], [0.1, 0.2, 0.3, 0.4])
+    day2 = result_table([3.5, 2.0, 1.0, np.nan], [0.1, 0.25, 0.3, None])
+    day2.loc[3, 'Status'] = 'Error/No Data'
+    day3 = result_table([1.5, 0.5, 0.8], [0.1, 0.2, 0.3], symbols=('EEE', 'BBB', 'CCC'))
+    history.append(day1, date(2025, 1, 2))
+    history.append(day2, date(2025, 1, 3))
+    history.append(day3, date(2025, 1, 6))
+
+    reopened = rh.ReportHistory(str(tmp_path / 'history'))
+    assert reopened.dates() == [date(2025, 1, 2), date(2025, 1, 3), date(2025, 1, 6)]
+    assert reopened.symbols == ['AAA', 'BBB', 'CCC', 'DDD', 'EEE']
+
+    bbb = reopened.series('BBB', ('rank', 'pb', 'status'))
+    assert bbb['Rank'].tolist() == [2, 2, 1]
+    assert bbb['Status'].tolist() == ['Success'] * 3
+    assert bbb['PB_Ratio'].dtype == np.float32
+
+    pruned = reopened.scan(('roic',), start=date(2025, 1, 3), end=date(2025, 1, 3))
+    assert list(pruned.columns) == ['Date', 'Symbol', '4Y_Geometric_Avg_ROIC']
+    assert pruned['Symbol'].astype(str).tolist() == ['AAA', 'BBB', 'CCC', 'DDD']
+    assert np.isnan(reopened.scan(('rank',), symbols=['DDD'])['Rank'].iloc[-1])
+    with pytest.raises(ValueError):
+        reopened.scan(('symbol',))
+
+    drift = reopened.rank_drift().set_index('Symbol')
+    assert drift.loc['AAA', 'Rank_Change'] == 2 and drift.loc['CCC', 'Rank_Change'] == -1
+    assert drift.loc['CCC', 'Best_Rank'] == 1 and drift.loc['EEE', 'First_Rank'] == 3
+
+    changes = reopened.top_n_changes(2)
+    assert changes[['Symbol', 'Event']].values.tolist() == [['CCC', 'entered'], ['AAA', 'exited']]
+    assert changes['Rank'].tolist() == [1, 3]
+
+
+def test_import_csv_reports_reads_pct_strings(tmp_path):
+    report_dir = tmp_path / 'report'
+    report_dir.mkdir()
+    table = format_geometric_mean_roic_to_percentage(result_table([1.0, 2.0, 3.0, 4.0], [0.1234, None, np.nan, 0.2]))
+    table.drop(columns='4Y_Geometric_Avg_ROIC').to_csv(report_dir / 'high_roic_company_20250102.csv')
+    table.to_csv(report_dir / 'high_roic_company_20250103.csv')
+    (report_dir / 'checkpoint_20250103.csv').write_text('Symbol\n')
+
+    history = rh.ReportHistory(str(tmp_path / 'history'))
+    assert rh.import_csv_reports(history, str(report_dir)) == [date(2025, 1, 2), date(2025, 1, 3)]
+    assert rh.import_csv_reports(history, str(report_dir)) == []
+    roic = history.scan(('roic',), end=date(2025, 1, 2))['4Y_Geometric_Avg_ROIC'].to_numpy()
+    assert roic[0] == pytest.approx(0.1234) and np.isnan(roic[1:3]).all() and roic[3] == pytest.approx(0.2)
+
+
+def test_many_distinct_error_statuses(tmp_path):
+    symbols = [f'S{i:03d}' for i in range(300)]
+    table = result_table(np.arange(300.0), np.full(300, 0.1), symbols=symbols)
+    table['Status'] = ['Success'] * 50 + ['Insufficient Data (1 years)'] * 50 + \
+                      [f'Error: timeout fetching {symbol}' for symbol in symbols[100:]]
+    history = rh.ReportHistory(str(tmp_path / 'history'))
+    history.append(table, date(2025, 1, 2))
+
+    stored = rh.ReportHistory(str(tmp_path / 'history')).scan(('status', 'category', 'rank'))
+    assert stored['Status'].astype(str).tolist() == table['Status'].tolist()
+    assert stored['Status_Category'].value_counts().to_dict() == {'Error': 200, 'Success': 50, 'Insufficient Data': 50}
+    assert stored['Rank'].notna().sum() == 50
+
+    capped = rh.ReportHistory(str(tmp_path / 'capped'), max_statuses=150)
+    capped.append(table, date(2025, 1, 2))
+    statuses = capped.scan(('status',))['Status'].astype(str).tolist()
+    assert len(capped.statuses) == 151 and statuses[:248] == table['Status'].tolist()[:248]
+    assert statuses[248:] == ['Error'] * 52
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+from src.siegfried import roic_panel as rp
+from src.siegfried import roic_calculator as rc
+from src.siegfried import find_hidden_cheap_goods_in_rubbish as fhc
+
+
+class StatementSnapshot:
+    def __init__(self, balance_sheet, financials):
+        self.balance_sheet = balance_sheet
+        self.financials = financials
+
+
+def random_statements(rng, n_tickers=40):
+    statements = {}
+    for i in range(n_tickers):
+        years = pd.to_datetime([f'{2024 - y}-12-31' for y in range(rng.integers(0, 6))])
+        values = lambda: rng.normal(1000, 400, len(years)).round(2)
+        income = pd.DataFrame([values(), values() / 5, values()], columns=years,
+                              index=['Operating Income', 'Tax Provision', 'Pretax Income'])
+        balance = pd.DataFrame([values() * 5, values(), values()], columns=years,
+                               index=['Total Assets', 'Cash And Cash Equivalents', 'Current Liabilities'])
+        if len(years) and i % 7 == 1:
+            income.iloc[2, 0] = 0.0
+            balance.iloc[0, -1] = balance.iloc[1, -1] + balance.iloc[2, -1]
+        if len(years) and i % 7 == 2:
+            income = income.drop(index='Pretax Income')
+            balance.iloc[1, 0] = np.nan
+        statements[f'T{i:03d}'] = (balance, income)
+    return statements
+
+
+def test_panel_matches_scalar_path_exactly():
+    statements = random_statements(np.random.default_rng(7))
+    panel = rp.build_panel(statements)
+    batch = rp.screen_panel(panel, window=4, symbols=list(statements))
+
+    for _, row in batch.iterrows():
+        snapshot = StatementSnapshot(*statements[row['Symbol']])
+        result = rc.calculate_roic_multi_year(row['Symbol'], 4, snapshot)
+        if 'error' in result or not result['roic_data']:
+            assert row['Status'] == 'Error/No Data'
+            continue
+        roic_values = [d['roic'] for d in result['roic_data'] if d['roic'] is not None]
+        expected = fhc.build_geometric_mean_roic_row(row['Symbol'], roic_values)
+        assert row['Status'] == expected['Status']
+        if expected['Status'] == 'Success':
+            assert row['Years_Available'] == expected['Years_Available']
+            if expected['4Y_Geometric_Avg_ROIC'] is None:
+                assert np.isnan(row['4Y_Geometric_Avg_ROIC'])
+            else:
+                assert row['4Y_Geometric_Avg_ROIC'] == expected['4Y_Geometric_Avg_ROIC']
+
+
+def test_compute_roic_panel_masks_zero_denominators():
+    panel = pd.DataFrame({
+        'ticker': ['A', 'A'], 'year': pd.to_datetime(['2023-12-31', '2024-12-31']),
+        'operating_income': [100.0, 100.0], 'tax_expense': [20.0, 20.0], 'pretax_income': [0.0, 80.0],
+        'total_assets': [500.0, 500.0], 'cash': [100.0, 200.0], 'current_liabilities': [0.0, 300.0],
+    })
+    result = rp.compute_roic_panel(panel)
+    assert list(result['tax_rate']) == [0.25, 0.25]
+    assert list(result['roic_defined']) == [True, False]
+    assert result['roic'].iloc[0] == rc.derive_roic(75.0, 400.0)
+    assert np.isnan(result['roic'].iloc[1])
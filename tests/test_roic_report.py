@@ -0,0 +1,25 @@
+from unittest.mock import patch
+import pandas as pd
+from src.siegfried import ticker_snapshot as ts
+from src.siegfried import roic_report
+from benchmarks.fake_yfinance import FakeMarket, synthetic_symbols
+
+
+def test_report_renders_one_card_per_ticker_in_rank_order(tmp_path):
+    ranked = synthetic_symbols(8)[::-1]
+    output = tmp_path / 'report.html'
+    with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker):
+        charted = [data[0] for data in roic_report.fetch_plot_data(ranked[:6], workers=2)]
+        path = roic_report.render_roic_report(pd.DataFrame({'Symbol': ranked}), str(output), top=6,
+                                              processes=2, fetch_workers=2, dpi=30)
+
+    page = open(path, encoding='utf-8').read()
+    assert charted and page.count('<img ') == len(charted)
+    positions = [page.index(f'<b>{symbol}</b>') for symbol in charted]
+    assert positions == sorted(positions)
+    assert ranked[6] not in page
+
+
+def test_render_png_is_standalone():
+    ticker, png, mean_roic, _ = roic_report.render_roic_png(('ABC', [2021, 2022], [10.0, 14.0]), dpi=20)
+    assert ticker == 'ABC' and png.startswith(b'\x89PNG') and mean_roic == 12.0
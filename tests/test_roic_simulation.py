@@ -0,0 +1,74 @@
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import pytest
+from src.siegfried import roic_simulation as sim
+from src.siegfried import ticker_snapshot as ts
+from src.siegfried.dcf_calculator import annuity_factor, dcf_value, discount_factors
+from benchmarks.fake_yfinance import FakeMarket, synthetic_symbols
+
+
+def test_discount_factors_sum_to_annuity_factor():
+    assert discount_factors(0.0435, 30).sum() == pytest.approx(float(annuity_factor(0.0435, 30)))
+
+
+def test_ar1_fit_recovers_parameters():
+    rng = np.random.default_rng(3)
+    x = [0.12]
+    for _ in range(5000):
+        x.append(0.12 + 0.6 * (x[-1] - 0.12) + 0.02 * rng.standard_normal())
+    process = sim.fit_ar1(np.array(x))
+    assert process.phi == pytest.approx(0.6, abs=0.03)
+    assert process.sigma == pytest.approx(0.02, rel=0.05)
+    assert process.mean == pytest.approx(0.12, abs=0.005)
+
+
+def test_constant_roic_reproduces_the_dcf_value():
+    process = sim.RoicProcess('ar1', 0.15, 0.5, 0.0, 0.15, np.array([0.15, 0.15]))
+    summaries = sim.simulate_ticker('AAA', process, 5.0, 40.0, 4.35, n_paths=10, horizon=30)
+    assert summaries['value'] == pytest.approx(float(dcf_value(5.0, 40.0, 4.35, 30)))
+
+
+def test_results_are_reproducible_and_independent_of_chunking_and_shortlist():
+    inputs = pd.DataFrame({'Symbol': ['AAA', 'BBB', 'CCC'],
+                           'ROIC_History': [[0.1, 0.14, None, 0.12, 0.18], [0.3, 0.25], [0.2]],
+                           'EPS': [4.0, 2.0, 1.0], 'Book_Value': [30.0, 10.0, 5.0], 'Price': [50.0, 80.0, 9.0]})
+    first = sim.simulate_universe(inputs, 4.35, n_paths=5000, horizon=10, seed=7, chunk_paths=1000)
+    second = sim.simulate_universe(inputs.iloc[[1, 0]], 4.35, n_paths=5000, horizon=10, seed=7, chunk_paths=5000)
+    pd.testing.assert_frame_equal(first.iloc[[1, 0]].reset_index(drop=True)[second.columns], second)
+
+    aaa = first.iloc[0]
+    assert aaa['ROIC_Observations'] == 4 and aaa['Value_P05'] < aaa['Value_P50'] < aaa['Value_P95']
+    assert 0 <= aaa['Prob_Value_Above_Price'] <= 1
+    assert first.iloc[2]['ROIC_Observations'] == 1 and np.isnan(first.iloc[2]['Value_P50'])
+
+    bootstrap = sim.simulate_universe(inputs.iloc[:1], 4.35, model='bootstrap', n_paths=2000, horizon=5)
+    assert set(np.round([bootstrap.iloc[0]['ROIC_Terminal_P05'], bootstrap.iloc[0]['ROIC_Terminal_P95']], 6)) <= \
+        {0.1, 0.12, 0.14, 0.18}
+    with pytest.raises(ValueError):
+        sim.simulate_universe(inputs, 4.35, model='garch')
+
+
+@pytest.mark.parametrize('model', sim.MODELS)
+def test_stacked_tickers_match_one_ticker_at_a_time(model):
+    inputs = pd.DataFrame({'Symbol': ['AAA', 'BBB', 'CCC', 'DDD'],
+                           'ROIC_History': [[0.1, 0.14, 0.12, 0.18], [0.3, 0.25], [-0.02, 0.05, 0.01], [0.2, 0.22, 0.19]],
+                           'EPS': [4.0, 2.0, 1.0, np.nan], 'Book_Value': [30.0, 10.0, 5.0, 8.0],
+                           'Price': [50.0, 80.0, 9.0, 12.0]})
+    stacked = sim.simulate_universe(inputs, 4.35, model=model, n_paths=300, horizon=8, seed=5, chunk_paths=1200)
+    single = sim.simulate_universe(inputs, 4.35, model=model, n_paths=300, horizon=8, seed=5, chunk_paths=300)
+    pd.testing.assert_frame_equal(stacked, single)
+
+    fit = sim.fit_ar1 if model == 'ar1' else sim.fit_bootstrap
+    process = fit(sim.clean_history(inputs['ROIC_History'][0]))
+    alone = sim.simulate_ticker('AAA', process, 4.0, 30.0, 4.35, n_paths=300, horizon=8, seed=5)
+    assert stacked.iloc[0]['Value_P50'] == pytest.approx(np.quantile(alone['value'], 0.5))
+
+
+def test_inputs_come_from_statements_and_info():
+    symbols = synthetic_symbols(3)
+    with patch.object(ts, 'make_yf_ticker', FakeMarket(years=6).ticker):
+        inputs = sim.load_simulation_inputs(symbols, years=10, workers=2)
+    assert inputs['Symbol'].tolist() == symbols
+    assert all(len(history) == 6 for history in inputs['ROIC_History'])
+    assert inputs[['EPS', 'Book_Value', 'Price']].notna().all().all()
@@ -0,0 +1,131 @@
+import random
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from src.siegfried import rolling_roic as rr
+from src.siegfried import ticker_snapshot as ts
+from src.siegfried.find_hidden_cheap_goods_in_rubbish import compute_geometric_average
+from src.siegfried.roic_calculator import calculate_invested_capital, calculate_nopat, derive_roic
+from benchmarks.fake_yfinance import FakeMarket, synthetic_statements, synthetic_symbols
+
+
+def quarter_end(year, quarter):
+    return pd.Timestamp(year=year, month=quarter * 3, day=1).to_period('M').to_timestamp('M').date()
+
+
+def fields(operating_income, total_assets=1000.0):
+    return {'operating_income': operating_income, 'tax_expense': operating_income * 0.2,
+            'pretax_income': operating_income, 'total_assets': total_assets, 'cash': 100.0,
+            'current_liabilities': 100.0}
+
+
+def test_window_running_sums_match_full_recomputation():
+    rng = random.Random(7)
+    window = rr.RoicWindow(4)
+    history = []
+    for _ in range(50):
+        value = rng.choice([None, rng.uniform(-1.5, 0.6)])
+        window.push(value)
+        history = (history + [value])[-4:]
+        valid = [v for v in history if v is not None]
+        if len(valid) >= 2 and any(v > 0 for v in valid):
+            assert window.geometric_mean('skip') == pytest.approx(compute_geometric_average(valid))
+        if len(valid) >= 2 and all(v > -1 for v in valid):
+            product = 1.0
+            for v in valid:
+                product *= 1 + v
+            assert window.geometric_mean('include') == pytest.approx(product ** (1 / len(valid)) - 1)
+
+
+def test_nonpositive_policies():
+    window = rr.RoicWindow(4)
+    for value in (0.2, -0.1, 0.3, 0.0):
+        window.push(value)
+    assert window.geometric_mean('skip') == pytest.approx((1.2 * 1.3) ** 0.5 - 1)
+    assert window.geometric_mean('include') == pytest.approx((1.2 * 0.9 * 1.3) ** 0.25 - 1)
+    assert window.geometric_mean('reject') is None
+    window.push(-1.2)
+    assert window.geometric_mean('include') is None
+    with pytest.raises(ValueError):
+        window.geometric_mean('drop')
+
+
+def test_ttm_roic_and_phase_windows():
+    state = rr.RollingRoicState(window=4)
+    for year in (2021, 2022, 2023):
+        for quarter in range(1, 5):
+            state.update(quarter_end(year, quarter), fields(10.0 * year - 20200 + quarter))
+    incomes = [10.0 * 2023 - 20200 + q for q in range(1, 5)]
+    expected = derive_roic(calculate_nopat(sum(incomes), sum(incomes) * 0.2, sum(incomes)),
+                           calculate_invested_capital(1000.0, 100.0, 100.0))
+    assert state.ttm_roic == pytest.approx(expected)
+    assert state.last_period == '2023-12-31'
+    assert state.current_window().defined == 3
+    assert state.update(quarter_end(2023, 2), fields(1e9)) is None
+    assert state.ttm_roic == pytest.approx(expected)
+
+
+def test_missing_quarter_restarts_ttm_and_keeps_phases_aligned():
+    state = rr.RollingRoicState(window=4)
+    for quarter in range(1, 5):
+        state.update(quarter_end(2022, quarter), fields(10.0))
+    state.update(quarter_end(2023, 3), fields(10.0))
+    assert state.ttm_roic is None
+    by_quarter = {q: state.phases[rr.quarter_index(quarter_end(2023, q)) % 4] for q in range(1, 5)}
+    assert [len(by_quarter[q].values) for q in range(1, 5)] == [2, 2, 2, 1]
+    assert by_quarter[1].values[-1] is None and by_quarter[2].values[-1] is None
+    assert by_quarter[4].defined == 1
+
+
+def test_store_round_trip_and_refresh_applies_only_new_quarters(tmp_path):
+    store = rr.RollingRoicStore(str(tmp_path / 'rolling.sqlite'))
+    state = rr.RollingRoicState(window=3)
+    for quarter in range(1, 5):
+        state.update(quarter_end(2024, quarter), fields(5.0 * quarter))
+    store.put('AAA', state)
+    loaded = store.get('AAA')
+    assert loaded.to_dict() == state.to_dict()
+    assert store.get('BBB') is None
+
+    symbols = synthetic_symbols(4)
+    with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker):
+        first = rr.refresh_rolling_roic(symbols, store, workers=2)
+        second = rr.refresh_rolling_roic(symbols, store, workers=2)
+    assert first['Symbol'].tolist() == symbols
+    assert (first['New_Quarters'] == 5).all() and (second['New_Quarters'] == 0).all()
+    assert first['Last_Quarter'].eq('2025-06-30').all()
+    assert first['TTM_ROIC'].tolist() == second['TTM_ROIC'].tolist()
+
+
+def test_backfill_fills_the_window_on_the_first_run(tmp_path):
+    symbols = synthetic_symbols(3)
+    periods = pd.date_range('2020-03-31', '2024-03-31', freq='QE')
+    backfill = {symbol: (statements['balance_sheet'], statements['financials'])
+                for symbol in symbols for statements in [synthetic_statements(symbol, periods)]}
+    with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker):
+        cold = rr.refresh_rolling_roic(symbols, rr.RollingRoicStore(str(tmp_path / 'cold.sqlite')))
+        warm = rr.refresh_rolling_roic(symbols, rr.RollingRoicStore(str(tmp_path / 'warm.sqlite')),
+                                       backfill=backfill)
+
+    assert cold['TTM_Geometric_Avg_ROIC'].isna().all()
+    assert (cold['Years_In_Window'] == 1).all() and (cold['Warm_Up_Years_Left'] == 1).all()
+    assert warm['Last_Quarter'].eq('2025-06-30').all() and (warm['New_Quarters'] == len(periods) + 5).all()
+    assert (warm['Years_In_Window'] == 4).all() and (warm['Warm_Up_Years_Left'] == 0).all()
+    assert warm['TTM_Geometric_Avg_ROIC'].notna().all()
+    assert warm['TTM_ROIC'].tolist() == pytest.approx(cold['TTM_ROIC'].tolist())
+
+
+@pytest.mark.parametrize('period_ends', [
+    ['2022-04-02', '2022-07-02', '2022-09-24', '2022-12-31', '2023-04-01', '2023-07-01', '2023-09-30', '2023-12-30'],
+    ['2022-01-29', '2022-04-30', '2022-07-30', '2022-10-29', '2023-01-28', '2023-04-29', '2023-07-29', '2023-10-28'],
+    ['2022-02-28', '2022-05-31', '2022-08-31', '2022-11-30', '2023-02-28', '2023-05-31', '2023-08-31', '2023-11-30'],
+])
+def test_fiscal_quarter_ends_are_consecutive(period_ends):
+    ends = [pd.Timestamp(end).date() for end in period_ends]
+    assert [rr.quarter_index(end) - rr.quarter_index(ends[0]) for end in ends] == list(range(8))
+
+    state = rr.RollingRoicState(window=4)
+    ttms = [state.update(end, fields(10.0)) for end in ends]
+    assert ttms[:3] == [None] * 3 and all(ttm is not None for ttm in ttms[3:])
+    assert state.current_window().defined == 2 and state.current_window().undefined == 0
+    assert state.geometric_mean() == pytest.approx(ttms[-1])
@@ -0,0 +1,102 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+import pytest
+from src.siegfried import screen_service as ss
+from src.siegfried import ticker_snapshot as ts
+from benchmarks.fake_yfinance import FakeMarket, synthetic_symbols
+
+
+@pytest.fixture
+def server():
+    market = FakeMarket()
+    service = ss.ScreenService(synthetic_symbols(15), workers=2, calls_per_second=None)
+    with patch.object(ts, 'make_yf_ticker', market.ticker):
+        service.refresh()
+    httpd = ss.make_server(service, port=0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}', service, market
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(url):
+    with urllib.request.urlopen(url) as response:
+        return json.load(response)
+
+
+def test_queries_are_answered_from_memory(server):
+    base, service, market = server
+    calls = market.total_calls()
+
+    top = get(f'{base}/top?n=5&min_roic=0.05')
+    assert 0 < len(top) <= 5
+    assert all(row['Status'] == 'Success' and row['4Y_Geometric_Avg_ROIC'] > 0.05 for row in top)
+    pbs = [row['PB_Ratio'] for row in top if row['PB_Ratio'] is not None]
+    assert pbs == sorted(pbs)
+
+    symbol = top[0]['Symbol']
+    detail = get(f'{base}/ticker/{symbol.lower()}')
+    assert detail['Symbol'] == symbol and len(detail['ROIC_Series']) == 4 and detail['Age_Seconds'] >= 0
+    assert get(f'{base}/pb/{symbol}') == {'Symbol': symbol, 'PB_Ratio': detail['PB_Ratio']}
+    assert [row['Symbol'] for row in get(f'{base}/freshness')] == service.symbols
+    assert get(f'{base}/health')['tickers_loaded'] == 15
+    assert market.total_calls() == calls
+
+    with pytest.raises(urllib.error.HTTPError) as missing:
+        get(f'{base}/roic/NOPE')
+    assert missing.value.code == 404
+
+
+def test_route_rejects_bad_requests():
+    service = ss.ScreenService([])
+    assert ss.route(service, 'GET', '/top?n=abc')[0] == 400
+    assert ss.route(service, 'DELETE', '/top')[0] == 405
+    assert ss.route(service, 'POST', '/refresh')[0] == 202
+    assert ss.route(service, 'GET', '/top') == (200, [])
+
+
+def test_failed_refresh_keeps_the_last_good_entry():
+    symbols = synthetic_symbols(4)
+    service = ss.ScreenService(symbols, workers=2, calls_per_second=None, retries=0)
+    with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker):
+        service.refresh()
+    good = {ticker: service.entry(ticker) for ticker in symbols}
+    assert all(row['Last_Error'] is None for row in service.freshness())
+
+    with patch.object(ts, 'make_yf_ticker', FakeMarket(error_rate=1.0).ticker):
+        service.refresh()
+    assert {ticker: service.entry(ticker) for ticker in symbols} == good
+    freshness = {row['Symbol']: row for row in service.freshness()}
+    for ticker in symbols:
+        assert freshness[ticker]['Last_Error'].startswith('Error')
+        assert freshness[ticker]['Last_Error_At'] > freshness[ticker]['Refreshed_At']
+        assert freshness[ticker]['Age_Seconds'] >= freshness[ticker]['Last_Error_Age_Seconds']
+    assert service.ticker(symbols[0])['Status'] == good[symbols[0]].row['Status']
+    assert service.health()['tickers_failing'] == 4
+
+    with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker):
+        service.refresh()
+    assert service.entry(symbols[0]).refreshed_at > good[symbols[0]].refreshed_at
+    assert service.health()['tickers_failing'] == 0
+
+
+def test_missing_pb_keeps_the_last_good_pb_but_takes_the_new_roic():
+    symbols = synthetic_symbols(3)
+    service = ss.ScreenService(symbols, workers=1, calls_per_second=None, retries=0)
+    with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker):
+        service.refresh()
+    good = {ticker: service.entry(ticker) for ticker in symbols}
+
+    with patch.object(ts, 'make_yf_ticker', FakeMarket().ticker), \
+            patch.object(ss, 'calculate_pb_or_none', lambda *args: None):
+        service.refresh()
+    for ticker in symbols:
+        entry = service.entry(ticker)
+        assert entry.pb_ratio == good[ticker].pb_ratio is not None
+        assert entry.row == good[ticker].row and entry.roic_series == good[ticker].roic_series != []
+        assert entry.refreshed_at > good[ticker].refreshed_at
+    assert service.health()['tickers_failing'] == 0
@@ -0,0 +1,59 @@
+from collections import Counter
+import pandas as pd
+from unittest.mock import patch
+from src.siegfried import ticker_snapshot as ts
+from src.siegfried import find_hidden_cheap_goods_in_rubbish as fhc
+from src.siegfried.screen_state import ScreenState
+
+FISCAL_YEAR_END = {'AAA': 1735603200, 'BBB': 1735603200}
+FETCHES = Counter()
+
+
+class FakeTicker:
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def _fetch(self, kind):
+        FETCHES[(self.symbol, kind)] += 1
+        years = pd.to_datetime(['2024-12-31', '2023-12-31'])
+        if kind == 'balance_sheet':
+            return pd.DataFrame({y: {'Total Assets': 1000.0, 'Cash And Cash Equivalents': 100.0,
+                                     'Current Liabilities': 300.0} for y in years})
+        return pd.DataFrame({y: {'Operating Income': 120.0, 'Tax Provision': 20.0,
+                                 'Pretax Income': 100.0} for y in years})
+
+    @property
+    def balance_sheet(self):
+        return self._fetch('balance_sheet')
+
+    @property
+    def financials(self):
+        return self._fetch('financials')
+
+    @property
+    def info(self):
+        FETCHES[(self.symbol, 'info')] += 1
+        return {'currentPrice': 50.0, 'priceToBook': 2.0, 'lastFiscalYearEnd': FISCAL_YEAR_END[self.symbol]}
+
+
+def statement_fetches():
+    return sum(n for (_, kind), n in FETCHES.items() if kind != 'info')
+
+
+def test_incremental_screen_only_refetches_new_filings(tmp_path):
+    state = ScreenState(str(tmp_path / 'state.sqlite'))
+    FETCHES.clear()
+    with patch.object(ts, 'make_yf_ticker', FakeTicker):
+        first = fhc.screen_symbols(['AAA', 'BBB'], state=state)
+        assert statement_fetches() == 4
+
+        second = fhc.screen_symbols(['AAA', 'BBB'], state=state)
+        assert statement_fetches() == 4
+        assert FETCHES[('AAA', 'info')] == 2
+
+        FISCAL_YEAR_END['BBB'] += 365 * 24 * 3600
+        fhc.screen_symbols(['AAA', 'BBB'], state=state)
+        assert FETCHES[('BBB', 'balance_sheet')] == 2
+        assert FETCHES[('AAA', 'balance_sheet')] == 1
+
+    pd.testing.assert_frame_equal(first, second)
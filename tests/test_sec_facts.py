@@ -0,0 +1,84 @@
+import json
+import zipfile
+import pandas as pd
+import pytest
+from src.siegfried import sec_facts
+from src.siegfried.roic_calculator import calculate_roic_multi_year
+
+
+def fact(val, end, start=None, form='10-K', fp='FY', filed=None):
+    entry = {'val': val, 'end': end, 'form': form, 'fp': fp, 'filed': filed or f'{int(end[:4]) + 1}-02-15'}
+    if start:
+        entry['start'] = start
+    return entry
+
+
+def company_document(cik, years):
+    tags = {name: [] for name in ('OperatingIncomeLoss', 'IncomeTaxExpenseBenefit', 'Assets',
+                                  'CashAndCashEquivalentsAtCarryingValue', 'LiabilitiesCurrent',
+                                  'IncomeLossFromContinuingOperationsBeforeIncomeTaxesExtraordinaryItemsNoncontrollingInterest')}
+    for year in years:
+        start, end = f'{year}-01-01', f'{year}-12-31'
+        tags['OperatingIncomeLoss'].append(fact(100 + year - 2010, end, start))
+        tags['OperatingIncomeLoss'].append(fact(999, f'{year}-03-31', start, form='10-K'))
+        tags['IncomeTaxExpenseBenefit'].append(fact(20, end, start))
+        tags['IncomeLossFromContinuingOperationsBeforeIncomeTaxesExtraordinaryItemsNoncontrollingInterest'].append(
+            fact(80, end, start))
+        tags['Assets'].append(fact(1000, end))
+        tags['Assets'].append(fact(5000, f'{year}-06-30', form='10-Q', fp='Q2'))
+        tags['CashAndCashEquivalentsAtCarryingValue'].append(fact(100, end))
+        tags['LiabilitiesCurrent'].append(fact(200, end))
+    tags['Assets'].append(fact(1100, f'{years[-1]}-12-31', filed=f'{years[-1] + 2}-02-15'))
+    tags['StockholdersEquity'] = [fact(500 + 10 * (year - 2010), f'{year}-12-31') for year in years]
+    facts = {tag: {'units': {'USD': entries}} for tag, entries in tags.items()}
+    facts['CommonStockSharesOutstanding'] = {'units': {'shares': [fact(50, f'{year}-12-31') for year in years]}}
+    return {'cik': cik, 'entityName': f'Company {cik}', 'facts': {'us-gaap': facts}}
+
+
+@pytest.fixture
+def companyfacts(tmp_path):
+    zip_path = tmp_path / 'companyfacts.zip'
+    with zipfile.ZipFile(zip_path, 'w') as archive:
+        archive.writestr('CIK0000000001.json', json.dumps(company_document(1, list(range(2010, 2024)))))
+        archive.writestr('CIK0000000002.json', json.dumps(company_document(2, [2021, 2022])))
+        archive.writestr('CIK0000000003.json', json.dumps(company_document(3, [2022])))
+    tickers_path = tmp_path / 'company_tickers.json'
+    tickers_path.write_text(json.dumps({'0': {'cik_str': 1, 'ticker': 'AAA', 'title': 'A'},
+                                        '1': {'cik_str': 2, 'ticker': 'BRK.B', 'title': 'B'}}))
+    return str(zip_path), str(tickers_path)
+
+
+def test_ingest_supports_ten_year_roic(companyfacts, tmp_path):
+    zip_path, tickers_path = companyfacts
+    output = sec_facts.ingest_companyfacts(zip_path, str(tmp_path / 'store.npz'), tickers_path,
+                                           processes=2, members_per_task=1)
+    store = sec_facts.SecFactsStore(output)
+    assert len(store) == 2 and 'BRK-B' in store
+
+    result = calculate_roic_multi_year('AAA', years=10, snapshot=store.snapshot('AAA'))
+    roic = result['roic_data']
+    assert [d['year'] for d in roic] == list(pd.to_datetime([f'{y}-12-31' for y in range(2014, 2024)]))
+    assert roic[0]['roic'] == pytest.approx((104 * 0.75) / 700)
+    assert roic[-1]['invested_capital'] == 800
+
+    balance = store.snapshot('AAA').balance_sheet
+    assert balance.loc['Stockholders Equity'].iloc[0] == 630
+    assert balance.loc['Ordinary Shares Number'].iloc[-1] == 50
+
+
+def test_unmapped_filers_are_keyed_by_cik(companyfacts, tmp_path):
+    zip_path, _ = companyfacts
+    store = sec_facts.SecFactsStore(sec_facts.ingest_companyfacts(zip_path, str(tmp_path / 'store.npz'), processes=1))
+    assert '0000000003' in store
+    assert store.snapshot('0000000002').balance_sheet.columns[0] == pd.Timestamp('2022-12-31')
+
+
+def test_as_filed_store_ignores_later_restatements(companyfacts, tmp_path):
+    zip_path, tickers_path = companyfacts
+    restated = sec_facts.SecFactsStore(sec_facts.ingest_companyfacts(
+        zip_path, str(tmp_path / 'restated.npz'), tickers_path, processes=1))
+    as_filed = sec_facts.SecFactsStore(sec_facts.ingest_companyfacts(
+        zip_path, str(tmp_path / 'as_filed.npz'), tickers_path, processes=1, as_filed=True))
+    assert not restated.as_filed and as_filed.as_filed
+    assert restated.snapshot('AAA').balance_sheet.loc['Total Assets'].iloc[0] == 1100
+    assert as_filed.snapshot('AAA').balance_sheet.loc['Total Assets'].iloc[0] == 1000
@@ -0,0 +1,55 @@
+from collections import Counter
+import pandas as pd
+from unittest.mock import patch
+from src.siegfried import ticker_snapshot as ts
+from src.siegfried import find_hidden_cheap_goods_in_rubbish as fhc
+
+
+class CountingTicker:
+    fetches = Counter()
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        years = pd.to_datetime(['2024-12-31', '2023-12-31', '2022-12-31'])
+        self._statements = {
+            'balance_sheet': pd.DataFrame({y: {'Total Assets': 1000.0, 'Cash And Cash Equivalents': 100.0,
+                                               'Current Liabilities': 300.0} for y in years}),
+            'financials': pd.DataFrame({y: {'Operating Income': 120.0, 'Tax Provision': 20.0,
+                                            'Pretax Income': 100.0} for y in years}),
+            'quarterly_balance_sheet': pd.DataFrame(),
+            'info': {'currentPrice': 50.0, 'priceToBook': 2.5},
+        }
+
+    def __getattr__(self, kind):
+        if kind.startswith('_') or kind not in self._statements:
+            raise AttributeError(kind)
+        CountingTicker.fetches[(self.symbol, kind)] += 1
+        return self._statements[kind]
+
+
+def test_snapshot_fetches_each_statement_once():
+    CountingTicker.fetches.clear()
+    with patch.object(ts, 'make_yf_ticker', CountingTicker):
+        df = fhc.screen_symbols(['AAA', 'BBB'])
+
+    assert list(df['Status']) == ['Success', 'Success']
+    assert list(df['PB_Ratio']) == [2.5, 2.5]
+    assert set(CountingTicker.fetches.values()) == {1}
+    assert ('AAA', 'quarterly_balance_sheet') not in CountingTicker.fetches
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+
+
+def test_limiter_is_charged_once_per_remote_fetch():
+    CountingTicker.fetches.clear()
+    limiter = CountingLimiter()
+    with patch.object(ts, 'make_yf_ticker', CountingTicker):
+        fhc.screen_symbols(['AAA', 'BBB'], 1, limiter)
+
+    assert limiter.acquired == sum(CountingTicker.fetches.values())
@@ -0,0 +1,41 @@
+from datetime import date, timedelta
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from src.siegfried import universe as uv
+
+
+def test_load_universe_reuses_fresh_snapshot(tmp_path):
+    root = str(tmp_path)
+    scrape = lambda: ['AAPL', 'BRK-B']
+    with patch.dict(uv.SOURCES, {'sp500': scrape}):
+        assert uv.load_universe('sp500', root=root) == ['AAPL', 'BRK-B']
+    with patch.dict(uv.SOURCES, {'sp500': lambda: pytest.fail("fresh snapshot must be reused")}):
+        assert uv.load_universe('sp500', root=root) == ['AAPL', 'BRK-B']
+
+
+def test_stale_snapshot_used_when_refresh_fails(tmp_path):
+    root = str(tmp_path)
+    uv.save_snapshot('sp500', ['OLD'], date.today() - timedelta(days=10), root)
+
+    def broken():
+        raise ConnectionError("offline")
+
+    with patch.dict(uv.SOURCES, {'sp500': broken}):
+        assert uv.load_universe('sp500', root=root) == ['OLD']
+
+
+def test_import_file_and_point_in_time_lookup(tmp_path):
+    root = str(tmp_path / 'universe')
+    history = tmp_path / 'sp400.csv'
+    pd.DataFrame({
+        'Date': ['2024-01-02', '2024-01-02', '2024-07-01', '2024-07-01'],
+        'Symbol': ['AAA', 'BF.B', 'AAA', 'CCC'],
+    }).to_csv(history, index=False)
+
+    assert uv.import_universe_file('sp400', str(history), root=root) == [date(2024, 1, 2), date(2024, 7, 1)]
+    assert uv.constituents_as_of('sp400', date(2024, 3, 15), root) == ['AAA', 'BF-B']
+    assert uv.constituents_as_of('sp400', date(2024, 7, 1), root) == ['AAA', 'CCC']
+    assert uv.load_universe('sp400', root=root) == ['AAA', 'CCC']
+    with pytest.raises(LookupError):
+        uv.constituents_as_of('sp400', date(2023, 12, 31), root)